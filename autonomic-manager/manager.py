@@ -1,56 +1,160 @@
 import argparse
-from datetime import datetime
-import glob
-import joblib
-from kasa_energy import EnergyMonitor
+import asyncio
+from clocks import SYSTEM_CLOCK
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import logging
-import oqs
-import os
+from model_cache import get_model
+from parallel_signing import SigningPool, default_workers, parallel_sign_files
+from payloads import DEFAULT_PAYLOAD_MODE, PAYLOAD_MODES, PayloadGenerator
 from pathlib import Path
+from planning_service import PlanningClient
+from pqc_signing import DEFAULT_SIGNING_MODE, SIGNING_MODES, digest_message, read_message, record_signature
 import random
+from runtime_metrics import registry as metrics
+from signature_store import SignatureStore, content_digest
+from signer_pool import SignerPool
 import time
 
+# Feature columns of the planning models (models/dataset.py feature_names), used when a model does not
+# carry its own feature names
+PLAN_FEATURES = ['Residual_Power', 'Max_Stack_Usage', 'Max_ROM', 'Min_Throughput',
+                 'Min_Security_Level_High', 'Min_Security_Level_Low', 'Min_Security_Level_Medium']
+# The device's resource limits, in the dataset's units. A Raspberry Pi is not constrained by stack or
+# ROM, so those sit at the top of the dataset's range
+DEFAULT_DEVICE_PROFILE = {'Max_Stack_Usage': 600.0, 'Max_ROM': 45.0, 'Min_Throughput': 10.0}
+# dataset_expanded.csv is labelled with NIST lightweight-cryptography finalists; each label selects the
+# signature algorithm signed with in its place. A label that is already a signature algorithm is used as-is
+LABEL_ALGORITHMS = {
+    'ASCON': 'ML-DSA-44',
+    'Xoodyak': 'ML-DSA-44',
+    'GIFT-COFB': 'Falcon-512',
+    'TinyJAMBU': 'Falcon-512',
+    'Grain128-AEAD': 'MAYO-1',
+    'PHOTON-Beetle': 'MAYO-2',
+    'Romulus': 'ML-DSA-65',
+    'SPARKLE': 'ML-DSA-87',
+    'ISAP': 'SPHINCS+-SHA2-128f-simple'
+}
+
+
+def security_level_name(level):
+    """Min_Security_Level category of a 1-5 security level"""
+    return 'Low' if level <= 2 else 'Medium' if level == 3 else 'High'
+
+
+def predict_label(model, names, row):
+    """One prediction from any planning model: compiled models take a plain row, sklearn models a named frame"""
+    if hasattr(model, 'predict_one'):
+        return model.predict_one(row)
+    if getattr(model, 'feature_names_in_', None) is not None:
+        import pandas as pd  # only sklearn models get here, and they already load pandas
+        return model.predict(pd.DataFrame([row], columns=names))[0]
+    return model.predict([row])[0]
 
 
 class AutonomicManager:
 
-    def __init__(self, device_id, algorithm, current, voltage, capacity=2000, security_level=1, interval=5, classifier_filename='dtc.joblib', is_online=False, device_ip=""):
+    def __init__(self, device_id, algorithm, current, voltage, capacity=2000, security_level=1, interval=5, classifier_filename='dtc.joblib', is_online=False, device_ip="", signing_mode=DEFAULT_SIGNING_MODE, max_key_age=None, max_key_signatures=None, parallel_workers=1, parallel_min_capacity=0, energy_index=None, device_model=None, replan_capacity=None, abort_capacity=0, planner_address=None, payload_mode=DEFAULT_PAYLOAD_MODE, payload_size_mb=100, payload_seed=None, payload_manifest=None, payload_distinct=None, signature_store=None, signature_store_max_age=None, clock=None, throughput_estimator=None, device_profile=None, label_algorithms=None):
         self.device_id = device_id
         self.algorithm = algorithm
         self.current = current
         self.voltage = voltage
         self.battery_capacity = capacity
+        self.initial_capacity = capacity
         self.security_level = security_level
         self.interval = interval
         self.classifier = classifier_filename
-        self.loop_time = datetime.now()
+        self.device_profile = dict(DEFAULT_DEVICE_PROFILE, **(device_profile or {}))
+        self.label_algorithms = LABEL_ALGORITHMS if label_algorithms is None else label_algorithms
+        self.security_level_friend = security_level
+        # With a planning service address, plan asks the shared service instead of loading the model here
+        self.planner = PlanningClient(planner_address) if planner_address else None
+        self.signing_mode = signing_mode
+        # Signing workloads come from one preallocated pool; file modes write only the current batch
+        self.payloads = PayloadGenerator(payload_size_mb, payload_mode, payload_seed,
+                                         directory=Path(__file__).parent if payload_mode == "disk" else None,
+                                         manifest_file=payload_manifest, distinct=payload_distinct)
+        # Signatures of content already signed with the current key are reused; rotation expires them
+        self.signature_store = SignatureStore(signature_store, signature_store_max_age) if signature_store else None
+        # Signers and keypairs are reused across loops until rotated; with a store, keypairs also survive restarts
+        self.signer_pool = SignerPool(max_key_age=max_key_age, max_signatures=max_key_signatures,
+                                      on_retire=self.signature_store.expire_key if self.signature_store else None,
+                                      key_store=self.signature_store)
+        # Use several cores for signing only while the battery is above parallel_min_capacity
+        self.parallel_workers = parallel_workers or default_workers()
+        self.signing_pool = SigningPool()  # worker processes are kept until the key or worker count changes
+        self.parallel_min_capacity = parallel_min_capacity
+        # Measured per-algorithm energy costs (energy_index.py), keyed by the device model's socket name
+        self.energy_index = energy_index
+        self.device_model = device_model or device_id
+        # (algorithm, megabytes, files, start, end) of each batch signed since the last monitor, in clock seconds
+        self.batches = deque()
+        # Live throughput and slowdown per algorithm (throughput_estimator.py), probed in the background
+        self.throughput = throughput_estimator
+        if self.throughput:
+            self.throughput.track(algorithm)
+        # The asynchronous loop re-plans mid-batch below replan_capacity and stops signing at abort_capacity
+        self.replan_capacity = replan_capacity
+        self.abort_capacity = abort_capacity
+        self.phase_latency = {phase: deque(maxlen=1000) for phase in ('monitor', 'analyze', 'plan', 'execute', 'cycle')}
+        # Energy accounting and loop pacing follow this clock, so a replay can simulate days of drain in minutes
+        self.clock = clock or SYSTEM_CLOCK
+        self.loop_time = self.clock.now()
+        self.loop_monotonic = self.clock.monotonic()
+        self.started_monotonic = self.loop_monotonic
         self.energy_monitor = False
         if is_online:
-            self.energy_monitor = EnergyMonitor(device_ip=device_ip)
-            self.energy_monitor.start_background_thread()
+            # All managers in the process share one collector thread and event loop.
+            # Imported here so offline managers never load kasa
+            from energy_collector import get_collector
+            from kasa_energy import DEFAULT_STRIP_IP
+            self.energy_monitor = get_collector().subscribe(device_id, device_ip or DEFAULT_STRIP_IP)
         logging.info("Autonomic manager initialized.")
 
     def get_power(self):
-        time_since_last_loop = datetime.now()
+        time_since_last_loop = self.clock.now()
         time_difference = time_since_last_loop - self.loop_time
+        monotonic_now = self.clock.monotonic()
 
         if self.energy_monitor:
-            # Calculate energy consumed since last loop using kasa data
-            start_index = 0
-            for time in self.energy_monitor.timestamps:
-                if time > self.loop_time:
-                    start_index = self.energy_monitor.timestamps.index(time)
-                    break;
-            charge_decrease = sum(self.energy_monitor.power_data[start_index:])
+            # Energy consumed by this device's socket since last loop, integrated from kasa data
+            charge_decrease = self.energy_monitor.energy_wh(self.device_id, self.loop_monotonic, monotonic_now)
+            self.batches.clear()  # the socket already measured them
         else: 
             # Calculate energy consumed using voltage and current data for current algorithm
             # Assume relationship is linear for experimental simplicity
             charge_decrease = self.voltage * self.current * (time_difference.total_seconds() / 3600)
-            
+            # A batch that ends after monotonic_now was queued during this call; it belongs to the next tick
+            while self.batches and self.batches[0][4] <= monotonic_now:
+                (algorithm, megabytes, num_files, start, end) = self.batches.popleft()
+                batch_wh = self.predict_energy_wh(algorithm, megabytes, num_files)
+                if batch_wh is not None:
+                    # Use the measured cost of the batch instead of the flat draw. Every second of the
+                    # batch window was charged the flat draw once, by this tick or earlier ones
+                    # (the asynchronous monitor ticks while a step signs), so refund all of it.
+                    signing_seconds = end - max(start, self.started_monotonic)
+                    charge_decrease += batch_wh - self.voltage * self.current * signing_seconds / 3600
+
         self.battery_capacity -= charge_decrease
+        metrics.counter("energy_consumed_wh_total", "Energy drawn", device=self.device_id).inc(charge_decrease)
+        metrics.gauge("battery_capacity_wh", "Remaining battery capacity", device=self.device_id).set(self.battery_capacity)
         self.loop_time = time_since_last_loop
+        self.loop_monotonic = monotonic_now
         
 
+    def predict_energy_wh(self, algorithm, megabytes=0.0, num_files=0):
+        """Energy in Wh to sign with algorithm on this device, or None without an index entry.
+        The indexed cost was measured offline; with a throughput estimator it is scaled by the
+        algorithm's live slowdown, since a throttled device draws similar power for longer.
+        """
+        if self.energy_index is None:
+            return None
+        wh = self.energy_index.predict_wh(self.device_model, algorithm, megabytes, num_files)
+        if wh is not None and self.throughput:
+            wh *= self.throughput.slowdown(algorithm)
+        return wh
+
     def monitor(self):
         """Monitor remaining battery capacity.
         If capacity is at or below zero, set has_charge flag to False
@@ -70,43 +174,302 @@ class AutonomicManager:
 
     def plan(self):
         """Load classifier and use to choose the algorithm for signing.
+        The classifier comes from the process-wide model cache and is only
+        deserialized again when the file changes on disk. With a planning
+        service, the prediction is batched with other managers' requests instead.
         """
-        model = joblib.load(self.classifier)
-        (self.algorithm, self.current, self.voltage) = model.predict([self.power_level, self.security_level, self.security_level_friend]) # add other vars once I have a model
+        if self.planner:
+            # Sent by name, so the service orders the row for whichever model it holds
+            self.use_label(self.planner.predict(self.plan_features()))
+        else:
+            model = get_model(self.classifier)
+            names = getattr(model, 'feature_names_in_', None)
+            names = PLAN_FEATURES if names is None else [str(name) for name in names]
+            self.use_label(predict_label(model, names, self.plan_row(names)))
         logging.info(f"{self.device_id} PLAN: Use {self.algorithm}")
+        if self.throughput:
+            self.throughput.track(self.algorithm)
+            live = self.throughput.estimate(self.algorithm)
+            if live is not None:
+                logging.info(f"{self.device_id} PLAN: Live slowdown x{live['slowdown']:.2f}, "
+                             f"{live['seconds_per_file'] or 0:.3f} s per file at {live['temperature']} C, {live['cpu_mhz']} MHz")
+        predicted = self.predict_energy_wh(self.algorithm, num_files=1)
+        if predicted is not None:
+            logging.info(f"{self.device_id} PLAN: Predicted cost {predicted * 3600:.3f} J per file")
 
-    def create_random_files(self, num_files, size_in_mb=100, filename="testfile", extension="bin"):
-        for i in range(num_files):
-            with open(f"{Path(__file__).parent / f'{Path(filename).stem}_{i}.{extension}'}", "wb") as f:
-                f.write(os.urandom(size_in_mb * 1024 * 1024))
+    def plan_features(self):
+        """The planning model's features for the current state, by column name.
+        Residual power is the remaining share of the initial capacity, in percent, and the required
+        security level is the higher of this device's and its recipient's.
+        """
+        residual = 100.0 * self.battery_capacity / self.initial_capacity if self.initial_capacity else 0.0
+        features = {'Residual_Power': min(max(residual, 0.0), 100.0)}
+        features.update(self.device_profile)
+        level = security_level_name(max(self.security_level, self.security_level_friend))
+        for name in ('High', 'Low', 'Medium'):
+            features[f'Min_Security_Level_{name}'] = 1.0 if name == level else 0.0
+        return features
+
+    def plan_row(self, names):
+        features = self.plan_features()
+        missing = [name for name in names if name not in features]
+        if missing:
+            raise ValueError(f"The planning model expects features the manager does not provide: {missing}")
+        return [features[name] for name in names]
+
+    def use_label(self, label):
+        """Switch to the signature algorithm a predicted label stands for"""
+        import oqs  # deferred like the signer pool's import; it is loaded by then in any manager that signs
+
+        label = str(label)
+        algorithm = self.label_algorithms.get(label, label)
+        if algorithm not in oqs.get_enabled_sig_mechanisms():
+            logging.warning(f"{self.device_id} PLAN: No signature algorithm for label {label}, keeping {self.algorithm}")
+            return
+        self.algorithm = algorithm
 
-        return glob.glob(f"{Path(__file__).parent}/*.{extension}")
+    def choose_workers(self, num_files):
+        """Trade cores for latency only when the energy budget allows it"""
+        if self.battery_capacity < self.parallel_min_capacity:
+            return 1
+        if self.payloads.mode == "memory":
+            return 1  # worker processes read payloads from files
+        return min(self.parallel_workers, num_files)
 
-    def signing(self, alg, files):
-        # Create signer and verifier
-        with oqs.Signature(alg) as signer, oqs.Signature(alg) as verifier:
-            # Signer generates its keypair
-            signer_public_key = signer.generate_keypair()
+    def signing(self, alg, payloads, mode=None, workers=1):
+        """Sign payloads with alg. Returns (payloads actually signed, clock seconds spent on signature
+        store hits), so hits are neither charged signing energy nor counted as signing throughput.
+        """
+        # "full" signs the whole file, "stream"/"mmap" sign a chunked digest of it
+        mode = mode or self.signing_mode
+        signed = list(payloads)
+        cached_seconds = 0.0
 
-            # Sign each file in the list
-            for filename in files:
-                with open(filename, 'rb') as file:
-                    bytes = file.read()
+        # Borrow the pooled signer and verifier; a keypair is only generated on first use or rotation
+        with self.signer_pool.acquire(alg) as pooled:
+            digests = {}
+            if self.signature_store and workers > 1:
+                # Only payloads the store has not seen with this key go to the process pool
+                misses = []
+                for payload in payloads:
+                    start = self.clock.monotonic()
+                    digests[payload.path] = content_digest(payload.source)
+                    cached = self.signature_store.lookup(digests[payload.path], alg, pooled.public_key, mode)
+                    if cached is None:
+                        misses.append(payload)
+                    else:
+                        self.record_signature(alg, payload, cached[1], source="store")
+                        cached_seconds += self.clock.monotonic() - start
+                payloads = signed = misses
+            if workers > 1 and payloads:
+                # Sign files on a process pool with verification pipelined behind signing
+                pooled.signatures += len(payloads)
+                results = parallel_sign_files(alg, pooled.signer.export_secret_key(), pooled.public_key,
+                                              [payload.path for payload in payloads], mode, workers, verbose=False,
+                                              pool=self.signing_pool)
+                for payload, result in zip(payloads, results):
+                    self.record_signature(alg, payload, result['is_valid'], result['sign_time'], result['verify_time'])
+                    if self.signature_store:
+                        self.signature_store.store(digests[payload.path], alg, pooled.public_key, mode,
+                                                   result['signature'], result['is_valid'])
+            elif self.signature_store and workers == 1:
+                signed = []
+                for payload in payloads:
+                    start = self.clock.monotonic()
+                    if self.sign_cached(pooled, alg, payload, mode)[2]:
+                        cached_seconds += self.clock.monotonic() - start
+                    else:
+                        signed.append(payload)
+            elif workers == 1:
+                # Sign each payload, from its buffer in memory mode or its file otherwise
+                for payload in payloads:
+                    message = read_message(payload.source, mode)
 
                     # Signer signs the message
-                    signature = signer.sign(bytes)
+                    start = time.perf_counter()
+                    signature = pooled.sign(message)
+                    sign_time = time.perf_counter() - start
 
                     # Verifier verifies the signature
-                    is_valid = verifier.verify(bytes, signature, signer_public_key)
-                    print(f"Valid signature ({Path(filename).name})? {is_valid}\t|\t")
+                    start = time.perf_counter()
+                    is_valid = pooled.verify(message, signature)
+                    self.record_signature(alg, payload, is_valid, sign_time, time.perf_counter() - start)
+
+        stats = self.signer_pool.stats()
+        logging.info(f"{self.device_id} EXECUTE: Signer pool keygen time {stats['keygen_time']:.4f} s, saved {stats['time_saved']:.4f} s")
+        if self.signature_store:
+            stats = self.signature_store.stats()
+            logging.info(f"{self.device_id} EXECUTE: Signature store hit rate {stats['hit_rate']:.1%} "
+                         f"({stats['hits']} hits, {stats['misses']} misses, {stats['entries']} entries)")
+        return signed, cached_seconds
+
+    def sign_cached(self, pooled, alg, payload, mode):
+        """Sign and verify through the signature store; a hit costs one hash pass.
+        Returns (signature, is_valid, hit)."""
+        digest = content_digest(payload.source)
+        cached = self.signature_store.lookup(digest, alg, pooled.public_key, mode)
+        if cached is not None:
+            self.record_signature(alg, payload, cached[1], source="store")
+            return cached[0], cached[1], True
+        # In stream/mmap mode the signed message is built from this same digest, so hash only once
+        message = digest_message(digest) if mode in ("stream", "mmap") else read_message(payload.source, mode)
+        start = time.perf_counter()
+        signature = pooled.sign(message)
+        sign_time = time.perf_counter() - start
+        start = time.perf_counter()
+        is_valid = pooled.verify(message, signature)
+        self.record_signature(alg, payload, is_valid, sign_time, time.perf_counter() - start)
+        self.signature_store.store(digest, alg, pooled.public_key, mode, signature, is_valid)
+        return signature, is_valid, False
+
+    def record_signature(self, alg, payload, is_valid, sign_time=None, verify_time=None, source="signed"):
+        """Signature metrics instead of a printed line per file; only invalid signatures are logged"""
+        record_signature(alg, payload.size, is_valid, sign_time, verify_time, source)
+        if not is_valid:
+            logging.warning(f"{self.device_id} EXECUTE: Invalid {alg} signature for {payload.name}")
 
     def execute(self):
         """Execute signing using chosen algorithm
         """
         num_files = random.randint(1, 10)
         logging.info(f"{self.device_id} EXECUTE: Signing {num_files} files")
-        files = self.create_random_files(num_files)
-        self.signing(self.algorithm, files)
+        payloads = self.payloads.generate(num_files)
+        if self.energy_monitor:
+            # Sample energy at the fast rate while the signing burst runs
+            self.energy_monitor.boost()
+        workers = self.choose_workers(len(payloads))
+        if workers > 1:
+            logging.info(f"{self.device_id} EXECUTE: Signing on {workers} processes")
+        start = self.clock.monotonic()
+        signed, cached_seconds = self.signing(self.algorithm, payloads, workers=workers)
+        self.record_batch(self.algorithm, signed, start, self.clock.monotonic(), cached_seconds)
+        if self.energy_monitor:
+            self.energy_monitor.boost()
+
+    def record_batch(self, alg, payloads, start, end, cached_seconds=0.0):
+        """Queue a signed batch for the next monitor's energy accounting.
+        payloads are the ones actually signed. The cached_seconds spent on signature store hits (a hash
+        pass each) stay on the flat draw, so the batch window is shortened by them and hits are kept out
+        of both the indexed signing cost and the throughput estimate.
+        """
+        if not payloads:
+            return
+        megabytes = sum(payload.size for payload in payloads) / (1024 * 1024)
+        end -= cached_seconds
+        self.batches.append((alg, megabytes, len(payloads), start, end))
+        if self.throughput:
+            self.throughput.observe(alg, megabytes, len(payloads), end - start)
+
+    def record_phase(self, phase, seconds):
+        self.phase_latency[phase].append(seconds)
+        metrics.histogram("mape_phase_seconds", "MAPE phase latency", device=self.device_id, phase=phase).observe(seconds)
+
+    def phase_stats(self):
+        """Median and p95 latency in seconds of each MAPE phase"""
+        stats = {}
+        for phase, samples in self.phase_latency.items():
+            if samples:
+                ordered = sorted(samples)
+                stats[phase] = {'count': len(ordered), 'median': ordered[len(ordered) // 2],
+                                'p95': ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)]}
+        return stats
+
+    async def monitor_forever(self, interval, replan, depleted):
+        """Monitor on a fixed cadence, independent of analyze/plan/execute"""
+        next_tick = self.clock.monotonic()
+        was_above_replan = self.replan_capacity is None or self.battery_capacity > self.replan_capacity
+        while True:
+            start = time.monotonic()
+            self.monitor()
+            self.record_phase('monitor', time.monotonic() - start)
+            if self.replan_capacity is not None:
+                is_above_replan = self.battery_capacity > self.replan_capacity
+                if was_above_replan and not is_above_replan:
+                    replan.set()
+                was_above_replan = is_above_replan
+            if not self.has_charge or self.battery_capacity <= self.abort_capacity:
+                depleted.set()
+            next_tick += interval
+            now = self.clock.monotonic()
+            if next_tick < now:
+                next_tick = now  # skip ticks missed while the loop was busy
+            await self.clock.async_sleep(next_tick - now)
+
+    async def execute_async(self, executor, replan, depleted):
+        """Sign a batch in the executor one step at a time, so the batch can be
+        aborted when capacity runs low or switched to a newly planned algorithm
+        """
+        loop = asyncio.get_running_loop()
+        num_files = random.randint(1, 10)
+        logging.info(f"{self.device_id} EXECUTE: Signing {num_files} files")
+        payloads = await loop.run_in_executor(executor, self.payloads.generate, num_files)
+        if self.energy_monitor:
+            self.energy_monitor.boost()
+        workers = self.choose_workers(len(payloads))
+        remaining = list(payloads)
+        while remaining:
+            if depleted.is_set():
+                logging.warning(f"{self.device_id} EXECUTE: Capacity {self.battery_capacity} at or below {self.abort_capacity}, "
+                                f"aborting with {len(remaining)} files unsigned")
+                break
+            if replan.is_set():
+                replan.clear()
+                previous = self.algorithm
+                await loop.run_in_executor(None, self.plan)
+                if self.algorithm != previous:
+                    logging.info(f"{self.device_id} EXECUTE: Switching from {previous} to {self.algorithm} "
+                                 f"with {len(remaining)} files left")
+            # One file per step, or one file per worker when signing in parallel
+            step, remaining = remaining[:workers], remaining[workers:]
+            start = self.clock.monotonic()
+            signed, cached_seconds = await loop.run_in_executor(executor, self.signing, self.algorithm, step, None, workers)
+            self.record_batch(self.algorithm, signed, start, self.clock.monotonic(), cached_seconds)
+        if self.energy_monitor:
+            self.energy_monitor.boost()
+
+    async def run(self, monitor_interval=1.0):
+        """Asynchronous MAPE loop: monitoring keeps running while files are signed in an executor"""
+        logging.info(f"Starting asynchronous autonomic loop for {self.device_id}")
+        self.has_charge = self.battery_capacity > 0
+        replan = asyncio.Event()
+        depleted = asyncio.Event()
+        # One signing thread: liboqs releases the GIL, and parallel signing adds its own process pool
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"{self.device_id}-execute")
+        monitor_task = asyncio.create_task(self.monitor_forever(monitor_interval, replan, depleted))
+        loop = asyncio.get_running_loop()
+        try:
+            while not depleted.is_set():
+                cycle_start = time.monotonic()
+                try:
+                    start = time.monotonic()
+                    self.analyze()
+                    self.record_phase('analyze', time.monotonic() - start)
+                    start = time.monotonic()
+                    await loop.run_in_executor(None, self.plan)
+                    replan.clear()
+                    self.record_phase('plan', time.monotonic() - start)
+                    start = time.monotonic()
+                    await self.execute_async(executor, replan, depleted)
+                    self.record_phase('execute', time.monotonic() - start)
+                except Exception as ex:
+                    logging.error(f"An error occurred in the autonomic loop: {ex}")
+                self.record_phase('cycle', time.monotonic() - cycle_start)
+                summary = ", ".join(f"{phase} {stats['median'] * 1000:.1f}/{stats['p95'] * 1000:.1f}"
+                                    for phase, stats in self.phase_stats().items())
+                logging.info(f"{self.device_id} LATENCY (median/p95 ms): {summary}")
+                try:
+                    # Sleep between cycles, but stop at once if capacity runs out
+                    await asyncio.wait_for(depleted.wait(), self.clock.to_real(self.interval))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            monitor_task.cancel()
+            await asyncio.gather(monitor_task, return_exceptions=True)
+            # A file already being signed finishes; nothing queued after it starts
+            executor.shutdown(wait=True, cancel_futures=True)
+            self.signing_pool.close()
+            self.payloads.close()
+        logging.info(f"{self.device_id}: capacity {self.battery_capacity} at or below {self.abort_capacity}, stopping")
 
     def loop(self):
         logging.info("Starting autonomic loop for {self.device_id}")
@@ -118,14 +481,79 @@ class AutonomicManager:
                 self.analyze()
                 self.plan()
                 self.execute()
-                time.sleep(self.interval)
+                self.clock.sleep(self.interval)
             except Exception as ex:
                 logging.error(f"An error occurred in the autonomic loop: {ex}")
+        self.signing_pool.close()
+        self.payloads.close()
 
 if __name__ == "__main__":
+    from energy_index import EnergyIndex
+
     parser = argparse.ArgumentParser()
     parser.add_argument("device_id")
+    parser.add_argument("--max-key-age", type=float, default=None, help="Rotate pooled keys after this many seconds")
+    parser.add_argument("--max-key-signatures", type=int, default=None, help="Rotate pooled keys after this many signatures")
+    parser.add_argument("--workers", type=int, default=1, help="Signing processes, 0 for one per core")
+    parser.add_argument("--parallel-min-capacity", type=float, default=0, help="Only sign in parallel above this battery capacity")
+    parser.add_argument("--signing-mode", choices=SIGNING_MODES, default=DEFAULT_SIGNING_MODE,
+                        help="full: sign whole files in memory, stream/mmap: hash in chunks and sign the digest")
+    parser.add_argument("--energy-index", default=None, help="Per-algorithm energy costs built by energy_index.py")
+    parser.add_argument("--device-model", default=None, help="Device name in the energy index, defaults to device_id")
+    parser.add_argument("--async", dest="use_async", action="store_true", help="Monitor concurrently with signing")
+    parser.add_argument("--monitor-interval", type=float, default=1.0, help="Seconds between monitor steps with --async")
+    parser.add_argument("--replan-capacity", type=float, default=None, help="Re-plan mid-batch when capacity drops below this")
+    parser.add_argument("--abort-capacity", type=float, default=0, help="Abort a batch when capacity drops to this")
+    parser.add_argument("--payload-mode", choices=PAYLOAD_MODES, default=DEFAULT_PAYLOAD_MODE,
+                        help="memory: sign in-memory buffers, tmpfs/disk: write each batch to /dev/shm or next to manager.py")
+    parser.add_argument("--payload-size-mb", type=float, default=100)
+    parser.add_argument("--payload-seed", type=int, default=None, help="Seed for reproducible payloads")
+    parser.add_argument("--payload-distinct", type=int, default=None,
+                        help="Draw payloads from this many fixed offsets, so content repeats across iterations")
+    parser.add_argument("--payload-manifest", default=None, help="Append each iteration's payload set to this JSON-lines file")
+    parser.add_argument("--signature-store", default=None, help="SQLite file of signatures to reuse for unchanged payloads")
+    parser.add_argument("--signature-store-max-age", type=float, default=None, help="Prune store entries unused for this many seconds")
+    parser.add_argument("--metrics-prom", default=None, help="Prometheus text file to export metrics to")
+    parser.add_argument("--metrics-jsonl", default=None, help="JSON-lines file to append metric snapshots to")
+    parser.add_argument("--metrics-interval", type=float, default=10.0, help="Seconds between metric exports")
+    parser.add_argument("--planner", default=None, help="Planning service address (socket path or host:port)")
+    parser.add_argument("--probe-budget", type=float, default=None,
+                        help="Run background throughput probes using at most this fraction of CPU time, e.g. 0.02")
+    parser.add_argument("--probe-interval", type=float, default=5.0, help="Seconds between throughput probes")
+    parser.add_argument("--probe-algorithms", default="", help="Comma-separated algorithms to probe besides the planned ones")
+    parser.add_argument("--classifier", default="dtc.joblib", 
+                        help="Model over the models/dataset.py features; a .npz from models/export_tree.py or a .knn.npz "
+                             "from models/knn_benchmark.py loads without sklearn")
     args = parser.parse_args()
 
-    am = AutonomicManager(args.device_id, algorithm="ML-DSA-44", current=0.037, voltage=117.5)
-    am.loop()
+    throughput = None
+    if args.probe_budget:
+        from throughput_estimator import ThroughputEstimator
+        throughput = ThroughputEstimator(filter(None, args.probe_algorithms.split(",")), budget=args.probe_budget,
+                                         interval=args.probe_interval)
+    am = AutonomicManager(args.device_id, algorithm="ML-DSA-44", current=0.037, voltage=117.5, signing_mode=args.signing_mode,
+                          max_key_age=args.max_key_age, max_key_signatures=args.max_key_signatures,
+                          parallel_workers=args.workers, parallel_min_capacity=args.parallel_min_capacity,
+                          energy_index=EnergyIndex.load(args.energy_index) if args.energy_index else None,
+                          device_model=args.device_model, replan_capacity=args.replan_capacity,
+                          abort_capacity=args.abort_capacity, planner_address=args.planner,
+                          payload_mode=args.payload_mode, payload_size_mb=args.payload_size_mb, payload_seed=args.payload_seed,
+                          payload_manifest=args.payload_manifest, payload_distinct=args.payload_distinct,
+                          signature_store=args.signature_store,
+                          signature_store_max_age=args.signature_store_max_age, classifier_filename=args.classifier,
+                          throughput_estimator=throughput)
+    metrics.start_exporter(args.metrics_interval, args.metrics_prom, args.metrics_jsonl)
+    if throughput:
+        throughput.start()
+    try:
+        if args.use_async:
+            asyncio.run(am.run(args.monitor_interval))
+        else:
+            am.loop()
+    finally:
+        if throughput:
+            throughput.stop()
+            stats = throughput.stats()
+            logging.info(f"THROUGHPUT: {stats['probes']} probes, {stats['skipped']} skipped over budget, "
+                         f"{stats['cpu_fraction']:.2%} of CPU time")
+        metrics.stop_exporter()
@@ -0,0 +1,133 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+
+
+class ModelCache:
+    """Process-wide cache of deserialized classifiers.
+
+    Each model file is loaded once and shared by every AutonomicManager in the
+    process. When the file changes on disk (mtime/size, or content hash when
+    use_content_hash is set) the new model is loaded outside the lock and swapped
+    in atomically, so a plan that already holds the old model is never blocked.
+    """
+
+    def __init__(self, use_content_hash=False):
+        self.use_content_hash = use_content_hash
+        self._entries = {}  # path -> {'model', 'signature'}
+        self._lock = threading.Lock()
+        self._load_locks = {}
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.reloads = 0
+        self.total_load_time = 0.0
+        self.last_load_time = 0.0
+
+    def _file_signature(self, path):
+        """Cheap fingerprint of the model file used to detect changes"""
+        stat = os.stat(path)
+        if not self.use_content_hash:
+            return (stat.st_mtime_ns, stat.st_size)
+        hasher = hashlib.sha256()
+        with open(path, 'rb') as file:
+            for chunk in iter(lambda: file.read(1024 * 1024), b''):
+                hasher.update(chunk)
+        return hasher.hexdigest()
+
+    def _load(self, path, signature):
+        start = time.perf_counter()
+        if path.endswith(".knn.npz"):
+            # Condensed KNN (models/knn_benchmark.py --export): numpy only
+            from condensed_knn import CondensedKNN
+            model = CondensedKNN.load(path)
+        elif path.endswith(".npz"):
+            # Compiled decision tree (models/export_tree.py): numpy only, no sklearn or joblib
+            from compiled_tree import CompiledTree
+            model = CompiledTree.load(path)
+        else:
+            import joblib  # deferred until the first model is loaded
+            model = joblib.load(path)
+        elapsed = time.perf_counter() - start
+
+        with self._lock:
+            reloaded = path in self._entries
+            self._entries[path] = {'model': model, 'signature': signature}
+            self.loads += 1
+            self.reloads += 1 if reloaded else 0
+            self.total_load_time += elapsed
+            self.last_load_time = elapsed
+        logging.info(f"MODEL CACHE: {'Reloaded' if reloaded else 'Loaded'} {path} in {elapsed:.4f} s")
+        return model
+
+    def get(self, filename):
+        """Return the model stored in filename, loading or reloading it if needed"""
+        path = os.path.abspath(filename)
+        signature = self._file_signature(path)
+
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry['signature'] == signature:
+                self.hits += 1
+                return entry['model']
+            self.misses += 1
+            load_lock = self._load_locks.setdefault(path, threading.Lock())
+
+        if entry is not None:
+            # A stale model exists: reload in this thread only if nobody else is,
+            # otherwise keep serving the current model instead of waiting
+            if not load_lock.acquire(blocking=False):
+                return entry['model']
+        else:
+            load_lock.acquire()
+
+        try:
+            with self._lock:
+                current = self._entries.get(path)
+            if current is not None and current['signature'] == signature:
+                return current['model']
+            try:
+                return self._load(path, signature)
+            except Exception as ex:
+                # The file may still be mid-write; keep the previous model until it loads cleanly
+                if current is None:
+                    raise
+                logging.error(f"MODEL CACHE: Failed to reload {path}, keeping previous model: {ex}")
+                return current['model']
+        finally:
+            load_lock.release()
+
+    def invalidate(self, filename=None):
+        """Drop one cached model, or all of them"""
+        with self._lock:
+            if filename is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(os.path.abspath(filename), None)
+
+    def stats(self):
+        """Return cache counters"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'loads': self.loads,
+                'reloads': self.reloads,
+                'total_load_time': self.total_load_time,
+                'avg_load_time': self.total_load_time / self.loads if self.loads else 0.0,
+                'last_load_time': self.last_load_time,
+                'cached_models': len(self._entries)
+            }
+
+
+# Shared by every AutonomicManager in this process
+model_cache = ModelCache()
+
+
+def get_model(filename):
+    """Return the shared cached model for filename"""
+    return model_cache.get(filename)
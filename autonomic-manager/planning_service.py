@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""Shared planning service: one classifier, micro-batched predictions for many managers.
+
+Managers send one feature row per plan as a JSON line over a Unix socket or
+localhost TCP, either as a list in the model's column order or as a
+{feature name: value} object. The service holds a single copy of the model
+(through the model cache, so a retrained file is picked up). Each row is
+checked against the model's features when it arrives, so a malformed request
+gets its own error. Valid rows are collected into a batch until max_batch rows
+are waiting or the oldest request has waited max_delay seconds. The whole
+batch is then answered with one vectorized predict call, or row by row if
+that call fails.
+
+    python planning_service.py serve --address /tmp/planner.sock --model dtc.joblib
+    python planning_service.py bench --address /tmp/planner.sock --clients 64
+"""
+import argparse
+import asyncio
+from collections import deque
+import json
+import logging
+import socket
+import threading
+import time
+
+from model_cache import get_model
+
+DEFAULT_ADDRESS = "127.0.0.1:8765"
+
+
+def parse_address(address):
+    """A path for a Unix socket, or host:port for TCP"""
+    if "/" in address or ":" not in address:
+        return address, None
+    host, port = address.rsplit(":", 1)
+    return host, int(port)
+
+
+class PlanningService:
+
+    def __init__(self, model_filename, max_batch=256, max_delay=0.002):
+        self.model_filename = model_filename
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.queue = None
+        self.server = None
+
+        # Counters
+        self.requests = 0
+        self.batches = 0
+        self.errors = 0
+        self.started = time.monotonic()
+        self.latencies = deque(maxlen=10000)  # seconds from receipt to answer
+        self.batch_sizes = deque(maxlen=10000)
+
+    def _row(self, features):
+        """features as a list of floats in the model's column order, raising ValueError when they do not fit"""
+        model = get_model(self.model_filename)
+        names = getattr(model, 'feature_names_in_', None)
+        if isinstance(features, dict):
+            if names is None:
+                raise ValueError("The model has no feature names; send features as a list")
+            missing = [str(name) for name in names if str(name) not in features]
+            if missing:
+                raise ValueError(f"Missing features: {missing}")
+            features = [features[str(name)] for name in names]
+        if not isinstance(features, list):
+            raise ValueError("features must be a list or an object")
+        width = getattr(model, 'n_features_in_', None)
+        if width is not None and len(features) != width:
+            raise ValueError(f"X has {len(features)} features, but the model is expecting {width} features as input")
+        return [float(value) for value in features]
+
+    async def _handle_client(self, reader, writer):
+        loop = asyncio.get_running_loop()
+        try:
+            while line := await reader.readline():
+                request = {}
+                try:
+                    request = json.loads(line)
+                    row = None if request.get('stats') else self._row(request['features'])
+                except (KeyError, TypeError, ValueError, AttributeError) as ex:
+                    # A malformed request only fails itself; the connection stays open
+                    self.errors += 1
+                    response = {'error': f"Bad request: {ex!r}"}
+                else:
+                    if row is None:
+                        response = self.stats()
+                    else:
+                        future = loop.create_future()
+                        await self.queue.put((time.monotonic(), row, future))
+                        try:
+                            response = {'prediction': await future}
+                        except Exception as ex:
+                            response = {'error': str(ex)}
+                response['id'] = request.get('id') if isinstance(request, dict) else None
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+        except ConnectionError as ex:
+            logging.warning(f"PLANNER: Dropping client: {ex}")
+        finally:
+            writer.close()
+
+    async def _collect_batch(self):
+        """Wait for one request, then take more until the batch is full or the oldest one is due"""
+        batch = [await self.queue.get()]
+        deadline = batch[0][0] + self.max_delay
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self.queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    def _predict(self, rows):
+        import numpy as np  # deferred: managers import this module only for PlanningClient
+
+        model = get_model(self.model_filename)
+        return [str(label) for label in model.predict(np.asarray(rows, dtype=np.float64))]
+
+    def _predict_each(self, rows):
+        """Row-by-row fallback: a prediction or the exception for each row"""
+        results = []
+        for row in rows:
+            try:
+                results.append(self._predict([row])[0])
+            except Exception as ex:
+                results.append(ex)
+        return results
+
+    async def _batch_forever(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect_batch()
+            rows = [features for _, features, _ in batch]
+            try:
+                # Off the event loop, so new requests keep queueing while the model runs
+                predictions = await loop.run_in_executor(None, self._predict, rows)
+            except Exception as ex:
+                # Only the rows that fail on their own get the error
+                logging.error(f"PLANNER: Batch of {len(batch)} failed, predicting row by row: {ex}")
+                predictions = await loop.run_in_executor(None, self._predict_each, rows)
+            now = time.monotonic()
+            for (received, _, future), prediction in zip(batch, predictions):
+                if future.done():
+                    continue  # the client went away
+                if isinstance(prediction, Exception):
+                    self.errors += 1
+                    future.set_exception(prediction)
+                else:
+                    future.set_result(prediction)
+                self.latencies.append(now - received)
+            self.requests += len(batch)
+            self.batches += 1
+            self.batch_sizes.append(len(batch))
+
+    def stats(self):
+        import numpy as np
+
+        latencies = np.asarray(self.latencies) if self.latencies else np.zeros(1)
+        elapsed = time.monotonic() - self.started
+        return {
+            'requests': self.requests,
+            'batches': self.batches,
+            'errors': self.errors,
+            'throughput': self.requests / elapsed if elapsed > 0 else 0.0,
+            'avg_batch_size': float(np.mean(self.batch_sizes)) if self.batch_sizes else 0.0,
+            'latency_median_ms': float(np.median(latencies) * 1000),
+            'latency_p95_ms': float(np.percentile(latencies, 95) * 1000),
+            'latency_max_ms': float(np.max(latencies) * 1000)
+        }
+
+    async def serve(self, address=DEFAULT_ADDRESS):
+        self.queue = asyncio.Queue()
+        host, port = parse_address(address)
+        if port is None:
+            self.server = await asyncio.start_unix_server(self._handle_client, path=host)
+        else:
+            self.server = await asyncio.start_server(self._handle_client, host, port)
+        # Load the model before the first request has to wait for it
+        get_model(self.model_filename)
+        logging.info(f"PLANNER: Serving {self.model_filename} on {address}")
+        batcher = asyncio.create_task(self._batch_forever())
+        try:
+            async with self.server:
+                await self.server.serve_forever()
+        finally:
+            batcher.cancel()
+
+
+class PlanningClient:
+    """Blocking client with one persistent connection; safe to share between threads"""
+
+    def __init__(self, address=DEFAULT_ADDRESS, timeout=5.0):
+        self.address = address
+        self.timeout = timeout
+        self._socket = None
+        self._file = None
+        self._lock = threading.Lock()
+        self._next_id = 0
+
+    def _connect(self):
+        host, port = parse_address(self.address)
+        if port is None:
+            self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._socket.settimeout(self.timeout)
+            self._socket.connect(host)
+        else:
+            self._socket = socket.create_connection((host, port), timeout=self.timeout)
+            self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._file = self._socket.makefile('rb')
+
+    def _request(self, request):
+        with self._lock:
+            if self._socket is None:
+                self._connect()
+            self._next_id += 1
+            request['id'] = self._next_id
+            try:
+                self._socket.sendall(json.dumps(request).encode() + b"\n")
+                line = self._file.readline()
+                if not line:
+                    raise ConnectionError("Planning service closed the connection")
+            except (OSError, ConnectionError):
+                self.close()
+                raise
+        response = json.loads(line)
+        if 'error' in response:
+            raise RuntimeError(f"Planning service: {response['error']}")
+        return response
+
+    def predict(self, features):
+        """Prediction for one feature row: a list in the model's column order, or a {name: value} dict"""
+        features = dict(features) if isinstance(features, dict) else list(features)
+        return self._request({'features': features})['prediction']
+
+    def stats(self):
+        return self._request({'stats': True})
+
+    def close(self):
+        if self._socket is not None:
+            self._file.close()
+            self._socket.close()
+        self._socket = None
+        self._file = None
+
+
+def bench(address, clients, requests, features):
+    """Many concurrent clients, one row per request, like a fleet of managers planning"""
+    import numpy as np
+
+    def run_client(latencies):
+        client = PlanningClient(address)
+        for _ in range(requests):
+            start = time.perf_counter()
+            client.predict(features)
+            latencies.append(time.perf_counter() - start)
+        client.close()
+
+    latencies = []
+    threads = [threading.Thread(target=run_client, args=(latencies,)) for _ in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    print(f"{clients * requests} requests from {clients} clients in {elapsed:.2f} s ({clients * requests / elapsed:,.0f} req/s)")
+    print(f"Client latency median {np.median(latencies) * 1000:.2f} ms, p95 {np.percentile(latencies, 95) * 1000:.2f} ms")
+    print(f"Service: {PlanningClient(address).stats()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["serve", "bench"])
+    parser.add_argument("--address", default=DEFAULT_ADDRESS, help="Unix socket path or host:port")
+    parser.add_argument("--model", default="dtc.joblib")
+    parser.add_argument("--max-batch", type=int, default=256)
+    parser.add_argument("--max-delay", type=float, default=0.002, help="Seconds a request may wait for its batch to fill")
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=200, help="Requests per client")
+    parser.add_argument("--features", type=float, nargs="+", default=None, help="Feature row sent by bench")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.command == "serve":
+        service = PlanningService(args.model, args.max_batch, args.max_delay)
+        try:
+            asyncio.run(service.serve(args.address))
+        except KeyboardInterrupt:
+            logging.info(f"PLANNER: Stopped: {service.stats()}")
+    else:
+        if args.features is None:
+            parser.error("bench needs --features, one row the model accepts")
+        bench(args.address, args.clients, args.requests, args.features)
+
+
+if __name__ == "__main__":
+    main()
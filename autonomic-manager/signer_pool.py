@@ -0,0 +1,231 @@
+from collections import OrderedDict
+from contextlib import contextmanager
+import logging
+import threading
+import time
+
+
+class PooledSigner:
+    """Long-lived signer/verifier pair and keypair for one algorithm"""
+
+    def __init__(self, alg, keypair=None):
+        """keypair is (public_key, secret_key, created, signatures) of a saved key to restore instead of
+        generating one, created being its wall-clock creation time and signatures the number it has made"""
+        import oqs  # deferred: loading liboqs is only paid when the first signer is created
+
+        self.alg = alg
+        self.verifier = oqs.Signature(alg)
+        if keypair is None:
+            self.signer = oqs.Signature(alg)
+            start = time.perf_counter()
+            self.public_key = self.signer.generate_keypair()
+            self.keygen_time = time.perf_counter() - start
+            self.created = time.time()
+            self.signatures = 0
+        else:
+            self.public_key, secret_key, self.created, self.signatures = keypair
+            self.signer = oqs.Signature(alg, secret_key)
+            self.keygen_time = 0.0
+
+        # A restored key keeps its age and signature count, so both rotation limits still apply across restarts
+        self.created_at = time.monotonic() - (time.time() - self.created)
+        self.saved_signatures = self.signatures
+        self.in_use = 0
+        self.retired = False
+        # Approximate footprint: keys plus one signature buffer
+        self.size_bytes = len(self.public_key) + self.signer.length_secret_key + self.signer.length_signature
+
+    def sign(self, message):
+        self.signatures += 1
+        return self.signer.sign(message)
+
+    def verify(self, message, signature):
+        return self.verifier.verify(message, signature, self.public_key)
+
+    def age(self):
+        return time.monotonic() - self.created_at
+
+    def free(self):
+        self.signer.free()
+        self.verifier.free()
+
+
+class SignerPool:
+    """Reuse oqs.Signature contexts and keypairs across MAPE iterations.
+
+    Keys are rotated once they are older than max_key_age seconds or have
+    produced max_signatures signatures (None disables either limit). Least
+    recently used algorithms are evicted when the pool holds more than
+    max_entries algorithms or more than memory_budget bytes of key material.
+    on_retire(alg, public_key) is called, outside the pool lock, when a key is
+    rotated. With a key_store (a SignatureStore), keypairs and their signature
+    counts are saved and restored across restarts, so stored signatures stay
+    usable; eviction then only frees memory, and the key is restored on its
+    next use.
+    """
+
+    def __init__(self, max_key_age=None, max_signatures=None, max_entries=8, memory_budget=None, on_retire=None,
+                 key_store=None):
+        self.max_key_age = max_key_age
+        self.max_signatures = max_signatures
+        self.max_entries = max_entries
+        self.memory_budget = memory_budget
+        self.on_retire = on_retire
+        self.key_store = key_store
+        self._entries = OrderedDict()  # alg -> PooledSigner, least recently used first
+        self._lock = threading.Lock()
+
+        # Counters
+        self.hits = 0
+        self.keygens = 0
+        self.rotations = 0
+        self.evictions = 0
+        self.keygen_time = 0.0
+        self.time_saved = 0.0
+        self._avg_keygen_time = {}  # alg -> last measured keygen time
+
+    def _needs_rotation(self, entry):
+        if self.max_key_age is not None and entry.age() >= self.max_key_age:
+            return True
+        if self.max_signatures is not None and entry.signatures >= self.max_signatures:
+            return True
+        return False
+
+    def _retire(self, entry, retired=None):
+        """Free the C contexts now, or when the last user releases the entry. Called under the lock;
+        the discarded key is appended to retired for _notify to report once the lock is released."""
+        entry.retired = True
+        if entry.in_use == 0:
+            entry.free()
+        if retired is not None:
+            retired.append((entry.alg, entry.public_key))
+
+    def _notify(self, retired):
+        for alg, public_key in retired:
+            if self.key_store is not None:
+                self.key_store.delete_key(alg, public_key)
+            if self.on_retire is not None:
+                self.on_retire(alg, public_key)
+        retired.clear()
+
+    def _memory_used(self):
+        return sum(entry.size_bytes for entry in self._entries.values())
+
+    def _evict(self, saved):
+        while self._entries and (
+                (self.max_entries is not None and len(self._entries) > self.max_entries) or
+                (self.memory_budget is not None and len(self._entries) > 1 and self._memory_used() > self.memory_budget)):
+            alg, entry = self._entries.popitem(last=False)
+            self.evictions += 1
+            logging.info(f"SIGNER POOL: Evicted {alg}")
+            # Not a rotation: the key and its stored signatures stay in the key store
+            self._retire(entry)
+            saved.append(entry)
+
+    def _get(self, alg):
+        retired = []
+        with self._lock:
+            entry = self._entries.get(alg)
+            if entry is not None and self._needs_rotation(entry):
+                logging.info(f"SIGNER POOL: Rotating {alg} key after {entry.signatures} signatures, {entry.age():.1f} s")
+                del self._entries[alg]
+                self.rotations += 1
+                self._retire(entry, retired)
+                entry = None
+
+            if entry is not None:
+                self._entries.move_to_end(alg)
+                self.hits += 1
+                self.time_saved += self._avg_keygen_time.get(alg, entry.keygen_time)
+                entry.in_use += 1
+                return entry
+        # Expiring a key's stored signatures is a database write, so never under the pool lock
+        self._notify(retired)
+
+        # Key generation can be slow (SPHINCS+, CROSS, UOV), so do it outside the lock
+        entry = self._restore(alg) or PooledSigner(alg)
+        with self._lock:
+            if entry.keygen_time:
+                self.keygens += 1
+                self.keygen_time += entry.keygen_time
+                self._avg_keygen_time[alg] = entry.keygen_time
+            previous = self._entries.pop(alg, None)
+            if previous is not None:
+                self._retire(previous, retired)
+            self._entries[alg] = entry
+            entry.in_use += 1
+            evicted = []
+            self._evict(evicted)
+        if self.key_store is not None and entry.keygen_time:
+            self.key_store.save_key(alg, entry.public_key, entry.signer.export_secret_key(), entry.created)
+        self._save_signatures(evicted)
+        self._notify(retired)
+        return entry
+
+    def _restore(self, alg):
+        """The saved keypair for alg, unless it is due for rotation"""
+        if self.key_store is None:
+            return None
+        keypair = self.key_store.load_key(alg)
+        if keypair is None:
+            return None
+        entry = PooledSigner(alg, keypair)
+        if self._needs_rotation(entry):
+            logging.info(f"SIGNER POOL: Rotating saved {alg} key after {entry.signatures} signatures, {entry.age():.1f} s")
+            self.rotations += 1
+            entry.free()
+            self._notify([(alg, entry.public_key)])
+            return None
+        logging.info(f"SIGNER POOL: Restored saved {alg} key, {entry.age():.1f} s old, {entry.signatures} signatures")
+        return entry
+
+    def _save_signatures(self, entries):
+        """Persist the signature counts that changed, outside the pool lock"""
+        if self.key_store is None:
+            return
+        for entry in entries:
+            if entry.signatures != entry.saved_signatures:
+                self.key_store.save_signatures(entry.alg, entry.public_key, entry.signatures)
+                entry.saved_signatures = entry.signatures
+
+    def _release(self, entry):
+        with self._lock:
+            entry.in_use -= 1
+            if entry.retired and entry.in_use == 0:
+                entry.free()
+        # Saved after every use, so a crash cannot reset the count that max_signatures rotation relies on
+        self._save_signatures([entry])
+
+    @contextmanager
+    def acquire(self, alg):
+        """Borrow the pooled signer for alg, generating a keypair if needed"""
+        entry = self._get(alg)
+        try:
+            yield entry
+        finally:
+            self._release(entry)
+
+    def close(self):
+        """Free every pooled context"""
+        closed = []
+        with self._lock:
+            while self._entries:
+                _, entry = self._entries.popitem()
+                # Closing is not a rotation: the key's stored signatures stay valid
+                self._retire(entry)
+                closed.append(entry)
+        self._save_signatures(closed)
+
+    def stats(self):
+        """Return keygen cost versus the keygen time avoided by reuse"""
+        with self._lock:
+            return {
+                'algorithms': list(self._entries.keys()),
+                'hits': self.hits,
+                'keygens': self.keygens,
+                'rotations': self.rotations,
+                'evictions': self.evictions,
+                'keygen_time': self.keygen_time,
+                'time_saved': self.time_saved,
+                'memory_bytes': self._memory_used()
+            }
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""Cold-start benchmark for the manager entry point.
+
+Each repeat starts a fresh interpreter with `python -X importtime`, imports the
+module and builds an offline AutonomicManager with the entry point's defaults
+(100 MB payloads). The first iteration's payloads are then generated, which
+fills the payload pool and loads numpy, and reported separately, since that
+cost moved out of the constructor rather than away. It reports wall time and the
+modules with the largest cumulative import time. It also lists any module from
+--forbid that got imported, e.g. matplotlib or kasa, which an offline manager
+should never load. Exits non-zero past --max-seconds or on a forbidden import,
+so it can guard against regressions.
+"""
+import argparse
+import os
+from pathlib import Path
+import statistics
+import subprocess
+import sys
+
+HERE = Path(__file__).resolve().parent
+DEFAULT_FORBIDDEN = ["matplotlib", "kasa", "oqs", "joblib", "sklearn", "pandas", "numpy"]
+
+STARTUP_CODE = """
+import time
+start = time.perf_counter()
+import {module}
+imported = time.perf_counter()
+{setup}
+built = time.perf_counter()
+import sys
+print("FIRST ITERATION", file=sys.stderr, flush=True)
+{first}
+print(f"STARTUP {{imported - start}} {{built - imported}} {{time.perf_counter() - built}}")
+"""
+MANAGER_SETUP = "am = manager.AutonomicManager('bench', 'ML-DSA-44', 0.037, 117.5)"
+MANAGER_FIRST = "am.payloads.generate(1)"
+
+
+def parse_importtime(stderr):
+    """{module: (self_us, cumulative_us)} from -X importtime output"""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def run_once(module, setup, first):
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [str(HERE), str(HERE.parent), env.get('PYTHONPATH')]))
+    code = STARTUP_CODE.format(module=module, setup=setup, first=first)
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], env=env, cwd=HERE,
+                            capture_output=True, text=True, check=True)
+    timing = next(line for line in result.stdout.splitlines() if line.startswith("STARTUP"))
+    import_time, setup_time, first_time = map(float, timing.split()[1:])
+    return import_time, setup_time, first_time, parse_importtime(result.stderr.split("FIRST ITERATION", 1)[0])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="manager")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="Modules to list by cumulative import time")
+    parser.add_argument("--forbid", nargs="*", default=DEFAULT_FORBIDDEN, help="Top-level packages that must not be imported")
+    parser.add_argument("--max-seconds", type=float, default=None, help="Fail when median import + setup exceeds this")
+    args = parser.parse_args()
+
+    setup, first = (MANAGER_SETUP, MANAGER_FIRST) if args.module == "manager" else ("", "")
+    runs = [run_once(args.module, setup, first) for _ in range(args.repeats)]
+    import_times = [run[0] for run in runs]
+    setup_times = [run[1] for run in runs]
+    first_times = [run[2] for run in runs]
+    modules = runs[-1][3]
+
+    print(f"import {args.module}: median {statistics.median(import_times) * 1000:.1f} ms "
+          f"(min {min(import_times) * 1000:.1f}, max {max(import_times) * 1000:.1f}) over {args.repeats} runs")
+    if setup:
+        print(f"AutonomicManager(): median {statistics.median(setup_times) * 1000:.1f} ms")
+        print(f"first payloads.generate() (pool fill, numpy import): median {statistics.median(first_times) * 1000:.1f} ms")
+    print(f"{len(modules)} modules imported. Largest cumulative import times:")
+    top_level = sorted(((cumulative, name) for name, (_, cumulative) in modules.items()), reverse=True)
+    for cumulative, name in top_level[:args.top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+    failed = False
+    forbidden = sorted({name for name in modules if name.split(".")[0] in args.forbid})
+    if forbidden:
+        print(f"FAIL: imported at startup: {', '.join(forbidden)}")
+        failed = True
+    total = statistics.median(import_times) + statistics.median(setup_times)
+    if args.max_seconds is not None and total > args.max_seconds:
+        print(f"FAIL: startup took {total:.3f} s, limit {args.max_seconds:.3f} s")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""Live per-algorithm signing throughput and latency, for throttle-aware planning costs.
+
+algorithms_test.py measures every algorithm once, offline, so the energy index
+and the planner assume static costs while a Pi slows down under sustained
+signing. ThroughputEstimator keeps an EWMA per algorithm from two sources:
+
+    execute  observe() with each batch the manager signed: real MB/s and seconds per file
+    probe    a background thread signs and verifies a small fixed message with each
+             tracked algorithm in turn, only while the probes' CPU time stays below
+             budget (a fraction of one core's wall time)
+
+Probes always sign the same message, so their latency EWMA divided by the lowest
+value seen is the algorithm's current slowdown. Every update is tagged with the
+CPU temperature and frequency last sampled by the thread. Estimates are replaced
+whole on update, so estimate() and slowdown() are lock-free dictionary lookups.
+"""
+import logging
+import os
+import threading
+import time
+
+import psutil
+
+from runtime_metrics import read_temperature, registry as metrics
+from signer_pool import PooledSigner
+
+
+def read_cpu_mhz():
+    """Current CPU frequency in MHz, or None where psutil cannot read it"""
+    try:
+        frequency = psutil.cpu_freq()
+    except (OSError, NotImplementedError):
+        return None
+    return frequency.current if frequency else None
+
+
+class ThroughputEstimator:
+
+    def __init__(self, algorithms=(), alpha=0.2, budget=0.02, interval=5.0, probe_bytes=4096):
+        if not 0 < budget < 1:
+            raise ValueError("budget must be a fraction of CPU time between 0 and 1")
+        self.alpha = alpha
+        self.budget = budget
+        self.interval = interval
+        self.message = os.urandom(probe_bytes)
+        self._tracked = list(dict.fromkeys(algorithms))
+        self._estimates = {}  # alg -> estimate dict, never mutated after it is stored
+        self._signers = {}  # alg -> PooledSigner used only by probes
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._turn = 0
+        self.temperature = read_temperature()
+        self.cpu_mhz = read_cpu_mhz()
+
+        # Counters
+        self.probes = 0
+        self.skipped = 0
+        self.probe_cpu_seconds = 0.0
+        self.started = None
+
+    def track(self, alg):
+        """Add alg to the algorithms the thread probes"""
+        if alg not in self._tracked:
+            with self._lock:
+                if alg not in self._tracked:
+                    self._tracked.append(alg)
+
+    def estimate(self, alg):
+        """Latest estimate for alg, or None before its first probe or batch"""
+        return self._estimates.get(alg)
+
+    def slowdown(self, alg):
+        """Probe latency relative to the fastest seen for alg; 1.0 when unknown"""
+        estimate = self._estimates.get(alg)
+        return estimate['slowdown'] if estimate else 1.0
+
+    def _ewma(self, previous, value):
+        return value if previous is None else previous + self.alpha * (value - previous)
+
+    def _update(self, alg, **values):
+        """Fold values into alg's EWMAs and store a new estimate dict"""
+        with self._lock:
+            estimate = dict(self._estimates.get(alg) or {
+                'sign_seconds': None, 'verify_seconds': None, 'fastest_probe': None, 'slowdown': 1.0,
+                'mb_per_second': None, 'seconds_per_file': None, 'probes': 0, 'batches': 0})
+            for name, value in values.items():
+                estimate[name] = self._ewma(estimate[name], value)
+            if 'sign_seconds' in values:
+                estimate['probes'] += 1
+                latency = estimate['sign_seconds'] + estimate['verify_seconds']
+                estimate['fastest_probe'] = min(estimate['fastest_probe'] or latency, latency)
+                estimate['slowdown'] = latency / estimate['fastest_probe']
+            else:
+                estimate['batches'] += 1
+            estimate.update(temperature=self.temperature, cpu_mhz=self.cpu_mhz, updated=time.monotonic())
+            self._estimates[alg] = estimate
+        return estimate
+
+    def observe(self, alg, megabytes, num_files, seconds):
+        """Fold in a batch signed by execute()"""
+        if seconds <= 0 or not num_files:
+            return
+        values = {'seconds_per_file': seconds / num_files}
+        if megabytes:
+            values['mb_per_second'] = megabytes / seconds
+        estimate = self._update(alg, **values)
+        if estimate['mb_per_second'] is not None:
+            metrics.gauge("live_throughput_mb_per_second", "EWMA signing throughput of executed batches",
+                          algorithm=alg).set(estimate['mb_per_second'])
+
+    def probe(self, alg):
+        """Sign and verify the probe message once with alg, charging its CPU time to the budget"""
+        cpu_start = time.thread_time()
+        signer = self._signers.get(alg)
+        if signer is None:
+            signer = self._signers[alg] = PooledSigner(alg)  # keygen counts against the budget too
+        start = time.perf_counter()
+        signature = signer.sign(self.message)
+        sign_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        is_valid = signer.verify(self.message, signature)
+        verify_seconds = time.perf_counter() - start
+        cpu_seconds = time.thread_time() - cpu_start
+
+        self.probes += 1
+        self.probe_cpu_seconds += cpu_seconds
+        metrics.counter("throughput_probe_cpu_seconds_total", "CPU time spent on throughput probes").inc(cpu_seconds)
+        if not is_valid:
+            logging.warning(f"THROUGHPUT: Invalid {alg} probe signature")
+            return None
+        estimate = self._update(alg, sign_seconds=sign_seconds, verify_seconds=verify_seconds)
+        metrics.gauge("throughput_probe_seconds", "EWMA sign + verify latency of the probe message",
+                      algorithm=alg).set(estimate['sign_seconds'] + estimate['verify_seconds'])
+        metrics.gauge("throughput_slowdown", "Probe latency relative to the fastest seen", algorithm=alg).set(estimate['slowdown'])
+        return estimate
+
+    def sample_tags(self):
+        self.temperature = read_temperature()
+        self.cpu_mhz = read_cpu_mhz()
+        if self.temperature is not None:
+            metrics.gauge("cpu_temperature_celsius", "CPU temperature").set(self.temperature)
+        if self.cpu_mhz is not None:
+            metrics.gauge("cpu_frequency_mhz", "Current CPU frequency").set(self.cpu_mhz)
+
+    def within_budget(self):
+        return self.probe_cpu_seconds <= self.budget * (time.monotonic() - self.started)
+
+    def _probe_forever(self):
+        while not self._stop.wait(self.interval):
+            self.sample_tags()
+            if not self._tracked:
+                continue
+            if not self.within_budget():
+                self.skipped += 1
+                continue
+            alg = self._tracked[self._turn % len(self._tracked)]
+            self._turn += 1
+            try:
+                self.probe(alg)
+            except Exception as ex:
+                logging.error(f"THROUGHPUT: Probe of {alg} failed: {ex}")
+
+    def start(self):
+        """Probe every interval seconds on a background thread"""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self.started = time.monotonic()
+        self._thread = threading.Thread(target=self._probe_forever, name="throughput-probe", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the thread and free the probe signers"""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        for signer in self._signers.values():
+            signer.free()
+        self._signers.clear()
+
+    def stats(self):
+        elapsed = time.monotonic() - self.started if self.started else 0.0
+        return {
+            'probes': self.probes,
+            'skipped': self.skipped,
+            'probe_cpu_seconds': self.probe_cpu_seconds,
+            'cpu_fraction': self.probe_cpu_seconds / elapsed if elapsed else 0.0
+        }
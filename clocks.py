@@ -0,0 +1,88 @@
+"""Clocks for EnergyMonitor and AutonomicManager.
+
+Everything that schedules polls, integrates energy or stamps samples asks a
+clock instead of calling time.monotonic()/datetime.now() directly, so the same
+code runs against wall time (SystemClock) or accelerated, reproducible
+simulated time (SimulatedClock, used by telemetry_replay.py).
+"""
+import asyncio
+from datetime import datetime, timedelta
+import threading
+import time
+
+
+class SystemClock:
+    speed = 1.0
+
+    def monotonic(self):
+        return time.monotonic()
+
+    def now(self):
+        return datetime.now()
+
+    def to_real(self, seconds):
+        """Wall-clock seconds that correspond to seconds of this clock"""
+        return seconds
+
+    def sleep(self, seconds):
+        time.sleep(max(seconds, 0))
+
+    async def async_sleep(self, seconds):
+        await asyncio.sleep(max(seconds, 0))
+
+
+SYSTEM_CLOCK = SystemClock()
+
+
+class SimulatedClock:
+    """Simulated time running speed times faster than wall time.
+    monotonic() counts simulated seconds from 0 and now() adds them to start.
+
+    With speed=None the clock is manual: it only moves when advance() or
+    sleep() is called, which makes a single-threaded replay bit-for-bit
+    reproducible regardless of how fast the machine is.
+    """
+
+    def __init__(self, speed=1.0, start=datetime(2026, 1, 1)):
+        if speed is not None and speed <= 0:
+            raise ValueError("speed must be positive, or None for a manual clock")
+        self.speed = speed
+        self.start = start
+        self._origin = time.perf_counter()
+        self._manual = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def is_manual(self):
+        return self.speed is None
+
+    def monotonic(self):
+        if self.is_manual:
+            return self._manual
+        return (time.perf_counter() - self._origin) * self.speed
+
+    def now(self):
+        return self.start + timedelta(seconds=self.monotonic())
+
+    def to_real(self, seconds):
+        return 0.0 if self.is_manual else seconds / self.speed
+
+    def advance(self, seconds):
+        """Move a manual clock forward"""
+        if not self.is_manual:
+            raise RuntimeError("Only a manual clock (speed=None) can be advanced")
+        with self._lock:
+            self._manual += max(seconds, 0)
+
+    def sleep(self, seconds):
+        if self.is_manual:
+            self.advance(seconds)
+        else:
+            time.sleep(max(seconds, 0) / self.speed)
+
+    async def async_sleep(self, seconds):
+        if self.is_manual:
+            self.advance(seconds)
+            await asyncio.sleep(0)
+        else:
+            await asyncio.sleep(max(seconds, 0) / self.speed)
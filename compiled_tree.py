@@ -0,0 +1,146 @@
+"""Array-backed decision tree evaluator that needs numpy but not sklearn or joblib.
+
+A trained DecisionTreeClassifier is exported (models/export_tree.py, or
+CompiledTree.from_sklearn) to an uncompressed .npz with one packed array per
+node attribute:
+
+    feature    int32    feature index tested at the node (0 at leaves)
+    threshold  float64  go left when X[feature] <= threshold
+    left/right int32    child node indices; a leaf points at itself
+    nan_left   bool     where a NaN feature value goes (sklearn's missing_go_to_left)
+    leaf_class int32    index into classes of the majority class at the node
+
+Inputs are rounded to float32 before comparing, as sklearn does, and the
+class is the first argmax of the node's class distribution, so predictions
+match sklearn's bit for bit. Batched prediction walks every row down the tree
+at once, one vectorized step per level. predict_one walks a single sample over
+plain Python lists, which is faster than any numpy call for one row.
+"""
+from array import array
+
+import numpy as np
+
+ARRAYS = ('feature', 'threshold', 'left', 'right', 'nan_left', 'leaf_class')
+
+
+class CompiledTree:
+
+    def __init__(self, feature, threshold, left, right, nan_left, leaf_class, classes, feature_names=None):
+        self.feature = np.ascontiguousarray(feature, dtype=np.int32)
+        self.threshold = np.ascontiguousarray(threshold, dtype=np.float64)
+        self.left = np.ascontiguousarray(left, dtype=np.int32)
+        self.right = np.ascontiguousarray(right, dtype=np.int32)
+        self.nan_left = np.ascontiguousarray(nan_left, dtype=bool)
+        self.leaf_class = np.ascontiguousarray(leaf_class, dtype=np.int32)
+        self.classes_ = np.asarray(classes)
+        self.feature_names_in_ = None if feature_names is None else np.asarray(feature_names)
+        self.n_features_in_ = int(self.feature.max()) + 1 if len(self.feature) else 0
+        if self.feature_names_in_ is not None:
+            self.n_features_in_ = len(self.feature_names_in_)
+        self.max_depth = self._depth()
+        # Scalar path: Python lists avoid a numpy call per node
+        self._nodes = list(zip(self.feature.tolist(), self.threshold.tolist(), self.left.tolist(), self.right.tolist(),
+                               self.nan_left.tolist()))
+        self._labels = [self.classes_[index] for index in self.leaf_class.tolist()]
+
+    def _depth(self):
+        depth = np.zeros(len(self.left), dtype=np.int32)
+        for node in range(len(self.left)):  # sklearn numbers children after their parent
+            if self.left[node] != node:
+                depth[self.left[node]] = depth[self.right[node]] = depth[node] + 1
+        return int(depth.max()) if len(depth) else 0
+
+    @classmethod
+    def from_sklearn(cls, model):
+        """Pack a fitted single-output DecisionTreeClassifier"""
+        tree = model.tree_
+        if tree.n_outputs != 1:
+            raise ValueError("Only single-output trees can be compiled")
+        nodes = np.arange(tree.node_count, dtype=np.int32)
+        is_leaf = tree.children_left == -1
+        return cls(feature=np.where(is_leaf, 0, tree.feature),
+                   threshold=np.where(is_leaf, np.inf, tree.threshold),
+                   left=np.where(is_leaf, nodes, tree.children_left),
+                   right=np.where(is_leaf, nodes, tree.children_right),
+                   nan_left=getattr(tree, 'missing_go_to_left', np.zeros(tree.node_count, dtype=bool)),
+                   leaf_class=np.argmax(tree.value[:, 0, :], axis=1),
+                   classes=model.classes_,
+                   feature_names=getattr(model, 'feature_names_in_', None))
+
+    def save(self, path):
+        """Write the packed arrays to an uncompressed .npz (no pickled objects)"""
+        arrays = {name: getattr(self, name) for name in ARRAYS}
+        # Numeric labels keep their dtype; object (string) labels are stored as fixed-width unicode
+        arrays['classes'] = self.classes_.astype(str) if self.classes_.dtype == object else self.classes_
+        if self.feature_names_in_ is not None:
+            arrays['feature_names'] = self.feature_names_in_.astype(str)
+        with open(path, 'wb') as file:
+            np.savez(file, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(*(data[name] for name in ARRAYS), data['classes'],
+                       data['feature_names'] if 'feature_names' in data.files else None)
+
+    def apply(self, X):
+        """Leaf index of each row of X"""
+        X = np.ascontiguousarray(check_features(self, X, np.float32), dtype=np.float32)
+        flat = X.ravel()
+        offsets = np.arange(len(X), dtype=np.intp) * X.shape[1]
+        has_nan = bool(np.isnan(flat).any())
+        node = np.zeros(len(X), dtype=np.intp)
+        for _ in range(self.max_depth):
+            # Leaves point at themselves, so rows that reached one simply stay there
+            values = flat[offsets + self.feature[node]]
+            go_left = values <= self.threshold[node]
+            if has_nan:
+                go_left = np.where(np.isnan(values), self.nan_left[node], go_left)
+            node = np.where(go_left, self.left[node], self.right[node])
+        return node
+
+    def predict(self, X):
+        """Class of each row of X (array or DataFrame in the fitted column order); a 1-D X is one sample"""
+        return self.classes_[self.leaf_class[self.apply(X)]]
+
+    def predict_one(self, features):
+        """Class of a single sample given as a sequence of numbers"""
+        values = array('f', features)  # float32, like sklearn's input validation
+        if len(values) != self.n_features_in_:
+            raise ValueError(f"X has {len(values)} features, but CompiledTree is expecting {self.n_features_in_} features as input")
+        nodes = self._nodes
+        node = 0
+        while True:
+            feature, threshold, left, right, nan_left = nodes[node]
+            if left == node:
+                return self._labels[node]
+            value = values[feature]
+            if value != value:
+                node = left if nan_left else right
+            else:
+                node = left if value <= threshold else right
+
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in ARRAYS) + self.classes_.nbytes
+
+
+def check_features(model, X, dtype):
+    """X as a 2-D array in the fitted feature order, raising ValueError like sklearn when it does not fit.
+    A DataFrame is reordered by column name when the model knows its feature names; its columns must
+    include every one of them.
+    """
+    names = model.feature_names_in_
+    if hasattr(X, 'columns'):
+        if names is not None:
+            missing = [str(name) for name in names if name not in X.columns]
+            if missing:
+                raise ValueError(f"X is missing features seen at fit time: {missing}")
+            X = X[list(names)]
+        X = X.to_numpy(dtype)
+    X = np.asarray(X, dtype=dtype)
+    if X.ndim == 1:
+        X = X.reshape(1, -1)
+    if X.ndim != 2 or X.shape[1] != model.n_features_in_:
+        raise ValueError(f"X has {X.shape[-1]} features, but {type(model).__name__} is expecting "
+                         f"{model.n_features_in_} features as input")
+    return X
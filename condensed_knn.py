@@ -0,0 +1,245 @@
+"""Condensed k-nearest-neighbours classifier with built-in scaling and a spatial index, numpy only.
+
+dataset_expanded.csv holds ~100 jittered copies of every source row, so a
+plain KNN ships and searches tens of thousands of near-duplicates. fit()
+instead:
+
+    1. standardizes every feature (the notebook KNN was dominated by
+       Min_Throughput and Max_Stack_Usage, which have the widest ranges)
+    2. collapses the rows of each class that fall in the same grid cell of
+       side `cell` (in standard deviations) into one prototype at their mean,
+       weighted by how many rows it stands for. The jitter spans about
+       0.3 standard deviations per feature, so cells below ~0.1 merge almost
+       nothing; from 0.2 up, a larger cell gives fewer prototypes
+    3. edits out prototypes that their edit_k nearest neighbours outvote
+       (Wilson editing), which removes the overlap noise between classes
+    4. condenses (Hart): starting from the heaviest prototype, keeps only the
+       prototypes the kept set misclassifies, so class interiors collapse to
+       a few points and mostly the class boundaries remain
+
+Prototypes are indexed by a k-d tree whose leaves are stored as fixed-size
+blocks with bounding boxes. A single query (predict_one) bounds its search
+with the nearest box and scans only the leaves within that bound. A batch is
+answered with one distance matrix against all prototypes instead, which is
+faster than any per-row walk at this size. Votes are weighted by prototype
+weight / distance, like weights='distance' for the rows a prototype replaced.
+"""
+import numpy as np
+
+from compiled_tree import check_features
+
+SAVED = ('blocks', 'block_labels', 'block_weights', 'leaf_lo', 'leaf_hi', 'mean', 'scale')
+
+
+def _squared_distances(A, B):
+    return np.maximum((A * A).sum(1)[:, None] - 2 * A @ B.T + (B * B).sum(1)[None, :], 0)
+
+
+def _build_leaves(points, leaf_size):
+    """k-d tree split on the widest dimension, down to leaf_size points; returns leaf index lists.
+    Splits near the median at a multiple of leaf_size, so every leaf but one is full and the padded blocks stay small.
+    """
+    leaves = []
+    stack = [np.arange(len(points))]
+    while stack:
+        index = stack.pop()
+        if len(index) <= leaf_size:
+            leaves.append(index)
+            continue
+        subset = points[index]
+        dimension = int(np.argmax(subset.max(0) - subset.min(0)))
+        order = index[np.argsort(subset[:, dimension], kind='stable')]
+        middle = leaf_size * ((len(order) + 2 * leaf_size - 1) // (2 * leaf_size))
+        stack += [order[middle:], order[:middle]]
+    return leaves
+
+
+class CondensedKNN:
+
+    def __init__(self, blocks, block_labels, block_weights, leaf_lo, leaf_hi, mean, scale, classes, k=5, feature_names=None):
+        self.blocks = np.asarray(blocks, dtype=np.float64)  # (leaves, leaf_size, features), padded with +inf
+        self.block_labels = np.asarray(block_labels, dtype=np.int32)
+        self.block_weights = np.asarray(block_weights, dtype=np.float64)
+        self.leaf_lo = np.asarray(leaf_lo, dtype=np.float64)
+        self.leaf_hi = np.asarray(leaf_hi, dtype=np.float64)
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.classes_ = np.asarray(classes)
+        self.k = int(k)
+        self.feature_names_in_ = None if feature_names is None else np.asarray(feature_names)
+        self.n_features_in_ = len(self.mean)
+        # The prototypes without the padding, for the brute-force batch search
+        filled = np.isfinite(self.blocks[:, :, 0])
+        self._points = self.blocks[filled]
+        self._labels = self.block_labels[filled]
+        self._weights = self.block_weights[filled]
+        self._squared_norms = (self._points * self._points).sum(1)
+        self.n_prototypes = len(self._points)
+
+    @classmethod
+    def fit(cls, X, y, k=1, cell=0.2, edit_k=5, condense=True, leaf_size=16, max_passes=10):
+        feature_names = getattr(X, 'columns', None)
+        X = np.asarray(X.to_numpy(np.float64) if hasattr(X, 'to_numpy') else X, dtype=np.float64)
+        classes, codes = np.unique(np.asarray(y), return_inverse=True)
+        mean = X.mean(0)
+        scale = X.std(0)
+        scale[scale == 0] = 1.0
+        Z = (X - mean) / scale
+
+        # Grid condensation: one weighted prototype per (cell, class)
+        keys = np.column_stack((np.floor(Z / cell).astype(np.int64), codes))
+        _, group = np.unique(keys, axis=0, return_inverse=True)
+        group = group.ravel()
+        weights = np.bincount(group).astype(np.float64)
+        points = np.column_stack([np.bincount(group, Z[:, column]) for column in range(Z.shape[1])]) / weights[:, None]
+        labels = np.zeros(len(weights), dtype=np.int32)
+        labels[group] = codes
+
+        if edit_k and len(points) > edit_k:
+            keep = cls._vote(points, labels, weights, points, edit_k, len(classes), exclude_self=True) == labels
+            points, labels, weights = points[keep], labels[keep], weights[keep]
+
+        if condense and len(points) > 1:
+            store = _condense(points, labels, weights, max_passes)
+            # Each kept prototype carries the weight of the rows nearest to it
+            nearest = np.concatenate([np.argmin(_squared_distances(points[start:start + 2048], points[store]), axis=1)
+                                      for start in range(0, len(points), 2048)])
+            weights = np.bincount(nearest, weights, minlength=len(store))
+            points, labels = points[store], labels[store]
+        return cls.from_prototypes(points, labels, weights, mean, scale, classes, k, leaf_size, feature_names)
+
+    @classmethod
+    def from_prototypes(cls, points, labels, weights, mean, scale, classes, k=5, leaf_size=16, feature_names=None):
+        leaf_size = max(leaf_size, k)  # the nearest leaf alone must be able to bound k neighbours
+        leaves = _build_leaves(points, leaf_size)
+        blocks = np.full((len(leaves), leaf_size, points.shape[1]), np.inf)
+        block_labels = np.zeros((len(leaves), leaf_size), dtype=np.int32)
+        block_weights = np.zeros((len(leaves), leaf_size))
+        for leaf, index in enumerate(leaves):
+            blocks[leaf, :len(index)] = points[index]
+            block_labels[leaf, :len(index)] = labels[index]
+            block_weights[leaf, :len(index)] = weights[index]
+        leaf_lo = np.array([points[index].min(0) for index in leaves])
+        leaf_hi = np.array([points[index].max(0) for index in leaves])
+        return cls(blocks, block_labels, block_weights, leaf_lo, leaf_hi, mean, scale, classes, k, feature_names)
+
+    @staticmethod
+    def _vote(points, labels, weights, queries, k, n_classes, exclude_self=False, chunk=2048):
+        """Brute-force weighted k-NN vote, used while fitting before the index exists"""
+        predicted = np.empty(len(queries), dtype=np.int32)
+        k = min(k, len(points) - (1 if exclude_self else 0))
+        for start in range(0, len(queries), chunk):
+            distances = _squared_distances(queries[start:start + chunk], points)
+            if exclude_self:
+                distances[np.arange(len(distances)), np.arange(start, start + len(distances))] = np.inf
+            nearest = np.argpartition(distances, k - 1, axis=1)[:, :k]
+            predicted[start:start + chunk] = _weighted_vote(np.take_along_axis(distances, nearest, 1), labels[nearest],
+                                                            weights[nearest], n_classes)
+        return predicted
+
+    def kneighbors(self, Z, chunk=2048):
+        """Squared distances, labels and weights of the k nearest prototypes to each scaled query row.
+
+        A batch is one distance matrix against every prototype per chunk of
+        rows and a partial sort along it: with a few thousand prototypes a
+        matrix product beats walking the index row by row.
+        """
+        n, k = len(Z), min(self.k, self.n_prototypes)
+        if n == 1:
+            return self._kneighbors_one(Z[0], k)
+        best = np.empty((n, k))
+        slot = np.empty((n, k), dtype=np.intp)
+        for start in range(0, n, chunk):
+            rows = Z[start:start + chunk]
+            # |z|^2 is the same for a whole row, so it is only added back for the k that are kept
+            partial = rows @ (-2 * self._points.T)
+            partial += self._squared_norms
+            if k == 1:
+                nearest = np.argmin(partial, axis=1)[:, None]
+            else:
+                nearest = np.argpartition(partial, k - 1, axis=1)[:, :k]
+            best[start:start + chunk] = np.maximum(np.take_along_axis(partial, nearest, 1) + (rows * rows).sum(1)[:, None], 0)
+            slot[start:start + chunk] = nearest
+        return best, self._labels[slot], self._weights[slot]
+
+    def _kneighbors_one(self, z, k):
+        """Single query: the k-th distance within the nearest box bounds the search, then every
+        leaf within that bound is scanned at once. Far fewer numpy calls than the batched rounds."""
+        box = ((np.maximum(self.leaf_lo - z, 0) + np.maximum(z - self.leaf_hi, 0)) ** 2).sum(1)
+        bound = np.partition(((self.blocks[np.argmin(box)] - z) ** 2).sum(1), k - 1)[k - 1]
+        leaves = np.flatnonzero(box <= bound)
+        distances = ((self.blocks[leaves] - z) ** 2).sum(2).ravel()
+        take = np.argpartition(distances, k - 1)[:k]
+        labels, weights = self.block_labels[leaves].ravel()[take], self.block_weights[leaves].ravel()[take]
+        return distances[take][None], labels[None], weights[None]
+
+    def transform(self, X):
+        """Scaled rows of X; a DataFrame is matched to the fitted columns by name"""
+        return (check_features(self, X, np.float64) - self.mean) / self.scale
+
+    def predict(self, X):
+        """Class of each row of X (array or DataFrame in the fitted column order); a 1-D X is one sample"""
+        distances, labels, weights = self.kneighbors(self.transform(X))
+        return self.classes_[_weighted_vote(distances, labels, weights, len(self.classes_))]
+
+    def predict_one(self, features):
+        """Class of a single sample given as a sequence of numbers"""
+        features = np.asarray(features, dtype=np.float64)
+        if features.shape != (self.n_features_in_,):
+            raise ValueError(f"X has {features.size} features, but CondensedKNN is expecting {self.n_features_in_} features as input")
+        z = (features - self.mean) / self.scale
+        distances, labels, weights = self._kneighbors_one(z, min(self.k, self.n_prototypes))
+        return self.classes_[_weighted_vote(distances, labels, weights, len(self.classes_))[0]]
+
+    def save(self, path):
+        arrays = {name: getattr(self, name) for name in SAVED}
+        arrays['classes'] = self.classes_.astype(str) if self.classes_.dtype == object else self.classes_
+        arrays['k'] = np.array(self.k)
+        if self.feature_names_in_ is not None:
+            arrays['feature_names'] = self.feature_names_in_.astype(str)
+        with open(path, 'wb') as file:
+            np.savez(file, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(*(data[name] for name in SAVED), data['classes'], int(data['k']),
+                       data['feature_names'] if 'feature_names' in data.files else None)
+
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in SAVED) + self.classes_.nbytes
+
+
+def _condense(points, labels, weights, max_passes):
+    """Hart's condensed nearest neighbour rule, heaviest prototypes first. Returns the kept indices.
+    The nearest kept prototype of every point is updated incrementally as prototypes are added,
+    so a pass costs one O(n) vector update per addition rather than a search per point.
+    """
+    order = np.argsort(-weights, kind='stable')
+    store = [order[0]]
+    nearest_distance = ((points - points[order[0]]) ** 2).sum(1)
+    nearest_label = np.full(len(points), labels[order[0]])
+    for _ in range(max_passes):
+        added = 0
+        for index in order:
+            if nearest_label[index] != labels[index]:
+                store.append(index)
+                added += 1
+                distance = ((points - points[index]) ** 2).sum(1)
+                closer = distance < nearest_distance
+                nearest_distance[closer] = distance[closer]
+                nearest_label[closer] = labels[index]
+        if not added:
+            break
+    return np.array(store)
+
+
+def _weighted_vote(distances, labels, weights, n_classes):
+    """Class with the largest sum of weight / distance; exact matches outvote everything else"""
+    distances = np.sqrt(distances)
+    exact = distances == 0
+    with np.errstate(divide='ignore'):
+        votes = np.where(exact.any(1, keepdims=True), exact * weights, weights / distances)
+    votes = np.where(np.isfinite(distances), votes, 0)
+    totals = np.column_stack([np.where(labels == label, votes, 0).sum(1) for label in range(n_classes)])
+    return np.argmax(totals, axis=1)
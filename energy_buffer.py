@@ -0,0 +1,91 @@
+import numpy as np
+
+
+class EnergyRingBuffer:
+    """Fixed-capacity, preallocated store of energy samples for one socket.
+
+    Samples are kept in numpy arrays that are written in place, so appends are
+    O(1) and the memory footprint never changes. Timestamps must be monotonic
+    floats (time.monotonic()), which keeps the stored samples sorted and lets
+    time-window lookups use binary search.
+    """
+    columns = ('time', 'wall_time', 'power', 'current', 'voltage')
+
+    def __init__(self, capacity=86400):
+        self.capacity = capacity
+        self._data = {name: np.zeros(capacity, dtype=np.float64) for name in self.columns}
+        self._start = 0  # index of the oldest sample
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def append(self, timestamp, power, current, voltage, wall_time=0.0):
+        """Add one sample, overwriting the oldest one when full"""
+        if self.size and timestamp < self.last_time():
+            raise ValueError("EnergyRingBuffer timestamps must be monotonic")
+        index = (self._start + self.size) % self.capacity
+        self._data['time'][index] = timestamp
+        self._data['wall_time'][index] = wall_time
+        self._data['power'][index] = power
+        self._data['current'][index] = current
+        self._data['voltage'][index] = voltage
+        if self.size < self.capacity:
+            self.size += 1
+        else:
+            self._start = (self._start + 1) % self.capacity
+
+    def _segments(self, name):
+        """The column as two chronological views: oldest part, then the wrapped part"""
+        array = self._data[name]
+        end = self._start + self.size
+        if end <= self.capacity:
+            return array[self._start:end], array[:0]
+        return array[self._start:], array[:end - self.capacity]
+
+    def _slice(self, name, begin, end):
+        """Chronological samples [begin, end) of a column; a view unless the range wraps"""
+        first, second = self._segments(name)
+        if end <= len(first):
+            return first[begin:end]
+        if begin >= len(first):
+            return second[begin - len(first):end - len(first)]
+        return np.concatenate((first[begin:], second[:end - len(first)]))
+
+    def search(self, timestamp, side='left'):
+        """Logical index of the first sample at or after timestamp, in O(log n)"""
+        first, second = self._segments('time')
+        if len(second) and timestamp > first[-1]:
+            return len(first) + int(np.searchsorted(second, timestamp, side=side))
+        return int(np.searchsorted(first, timestamp, side=side))
+
+    def last_time(self):
+        return self._data['time'][(self._start + self.size - 1) % self.capacity] if self.size else None
+
+    def latest(self, name, count):
+        """The most recent count samples of a column, oldest first"""
+        return self._slice(name, max(self.size - count, 0), self.size)
+
+    def last(self, name):
+        return self._data[name][(self._start + self.size - 1) % self.capacity] if self.size else None
+
+    def window(self, name, start_time, end_time=None):
+        """Samples of a column with start_time <= time <= end_time"""
+        begin = self.search(start_time)
+        end = self.size if end_time is None else self.search(end_time, side='right')
+        return self._slice(name, begin, end)
+
+    def energy_wh(self, start_time, end_time=None):
+        """Energy drawn between start_time and end_time in Wh (trapezoidal W·s / 3600).
+        The sample just before start_time is included and clipped to the window so the
+        interval that straddles the boundary is counted.
+        """
+        if self.size < 2:
+            return 0.0
+        begin = max(self.search(start_time) - 1, 0)
+        end = self.size if end_time is None else self.search(end_time, side='right')
+        if end - begin < 2:
+            return 0.0
+        times = np.clip(self._slice('time', begin, end), start_time, np.inf if end_time is None else end_time)
+        power = self._slice('power', begin, end)
+        return float(np.sum((power[1:] + power[:-1]) * np.diff(times)) / 2 / 3600)
@@ -0,0 +1,182 @@
+import argparse
+import asyncio
+import threading
+import time
+
+from kasa_energy import EnergyMonitor
+from telemetry_writer import TelemetryWriter
+
+
+class DeviceSubscription:
+    """Energy view of one device (socket alias) for an AutonomicManager.
+    Offers the EnergyMonitor calls the manager uses, resolved to whichever
+    strip the socket is on.
+    """
+
+    def __init__(self, collector, device_id, device_ip=None):
+        self.collector = collector
+        self.device_id = device_id
+        self.device_ip = device_ip
+
+    def _monitor(self):
+        return self.collector.find_monitor(self.device_id, self.device_ip)
+
+    def energy_wh(self, socket_name, start_time, end_time=None):
+        monitor = self._monitor()
+        return monitor.energy_wh(socket_name, start_time, end_time) if monitor else 0.0
+
+    def boost(self, duration=None):
+        monitor = self._monitor()
+        if monitor:
+            monitor.boost(duration)
+
+    def close(self):
+        self.collector.unsubscribe(self)
+
+
+class EnergyCollector:
+    """One asyncio loop, on one background thread, polling any number of strips.
+
+    Each strip gets an EnergyMonitor whose polling coroutine runs as a task on
+    the shared loop, and all strips share one TelemetryWriter. Managers call
+    subscribe() instead of starting their own monitor thread.
+    """
+
+    def __init__(self, csv_filename="energy_data.csv", telemetry_writer=None, drain_interval=1.0, **monitor_options):
+        self.telemetry_writer = telemetry_writer or TelemetryWriter(csv_filename)
+        self.drain_interval = drain_interval
+        self.monitor_options = monitor_options
+        self.monitors = {}  # device_ip -> EnergyMonitor
+        self.subscriptions = []
+        self._tasks = {}
+        self._lock = threading.Lock()
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run_loop, daemon=True)
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._drain_forever(), self.loop)
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    async def _drain_forever(self):
+        # Move queued samples into the ring buffers and the writer even when no manager is asking
+        while True:
+            for monitor in list(self.monitors.values()):
+                monitor.get_latest_data()
+            await asyncio.sleep(self.drain_interval)
+
+    def add_strip(self, device_ip, strip=None, aliases=None):
+        """Start polling a strip; aliases=None polls every socket with an energy meter"""
+        with self._lock:
+            if device_ip in self.monitors:
+                return self.monitors[device_ip]
+            monitor = EnergyMonitor(device_ip=device_ip, telemetry_writer=self.telemetry_writer, strip=strip,
+                                    aliases=aliases, monitor_all_sockets=aliases is None, **self.monitor_options)
+            self.monitors[device_ip] = monitor
+            self._tasks[device_ip] = asyncio.run_coroutine_threadsafe(monitor.run_periodic_update(), self.loop)
+            return monitor
+
+    def remove_strip(self, device_ip):
+        with self._lock:
+            monitor = self.monitors.pop(device_ip, None)
+            task = self._tasks.pop(device_ip, None)
+        if monitor:
+            monitor.running = False
+            monitor.get_latest_data()
+        if task:
+            task.cancel()
+
+    def find_monitor(self, device_id, device_ip=None):
+        """The monitor whose strip has the socket named device_id"""
+        if device_ip:
+            return self.monitors.get(device_ip)
+        for monitor in list(self.monitors.values()):
+            if device_id in monitor.buffers or (not monitor.monitor_all_sockets and device_id in monitor.aliases):
+                return monitor
+        return None
+
+    def subscribe(self, device_id, device_ip=None, strip=None):
+        """Subscribe a manager to its device's socket, adding the strip if it is not polled yet"""
+        if device_ip:
+            self.add_strip(device_ip, strip=strip)
+        subscription = DeviceSubscription(self, device_id, device_ip)
+        with self._lock:
+            self.subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            if subscription in self.subscriptions:
+                self.subscriptions.remove(subscription)
+
+    def poll_stats(self):
+        return {device_ip: monitor.poll_stats() for device_ip, monitor in self.monitors.items()}
+
+    async def _shutdown(self):
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def close(self):
+        for device_ip in list(self.monitors):
+            self.remove_strip(device_ip)
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self.loop).result(timeout=5)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=5)
+        self.telemetry_writer.close()
+
+
+_collector = None
+_collector_lock = threading.Lock()
+
+
+def get_collector(**options):
+    """The process-wide collector, created on first use"""
+    global _collector
+    with _collector_lock:
+        if _collector is None:
+            _collector = EnergyCollector(**options)
+        return _collector
+
+
+def main():
+    """Load benchmark: poll hundreds of simulated sockets at a fixed 1 Hz on one loop"""
+    from kasa_fake import FakeIotStrip
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--strips", type=int, default=50)
+    parser.add_argument("--sockets-per-strip", type=int, default=6)
+    parser.add_argument("--latency", type=float, default=0.05, help="Simulated round-trip per request in seconds")
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--output", default="fleet_energy_data.csv")
+    args = parser.parse_args()
+
+    # Fixed 1 Hz cadence: adaptive sampling off
+    collector = EnergyCollector(csv_filename=args.output, interval=1.0, min_interval=1.0)
+    for strip_index in range(args.strips):
+        aliases = [f"dev{strip_index}-{socket}" for socket in range(args.sockets_per_strip)]
+        collector.add_strip(f"fake-{strip_index}", strip=FakeIotStrip(aliases=aliases, latency=args.latency, seed=strip_index))
+
+    start = time.monotonic()
+    time.sleep(args.duration)
+    elapsed = time.monotonic() - start
+    stats = collector.poll_stats()
+    for monitor in collector.monitors.values():
+        monitor.get_latest_data()
+    samples = sum(len(buffer) for monitor in collector.monitors.values() for buffer in monitor.buffers.values())
+    collector.close()
+
+    sockets = args.strips * args.sockets_per_strip
+    polls = sum(stat['polls'] for stat in stats.values())
+    print(f"{sockets} sockets on {args.strips} strips for {elapsed:.1f} s")
+    print(f"Per-strip poll rate: {polls / args.strips / elapsed:.3f} Hz (target 1 Hz)")
+    print(f"Samples stored: {samples} ({samples / sockets / elapsed:.3f} per socket per second)")
+    print(f"Worst p95 request latency: {max(stat['latency_p95'] for stat in stats.values()) * 1000:.1f} ms")
+    print(f"Missed ticks: {sum(stat['missed_ticks'] for stat in stats.values())}, "
+          f"timeouts: {sum(stat['timeouts'] for stat in stats.values())}, errors: {sum(stat['errors'] for stat in stats.values())}")
+
+
+if __name__ == "__main__":
+    main()
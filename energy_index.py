@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""Per-(device, algorithm) energy cost index built from recorded telemetry.
+
+Joins the Kasa samples in energy_data.csv with the run windows in
+liboqs-scripts/signing_benchmark_*.csv. Each socket's power is integrated once
+into a cumulative energy curve. Run energy is then an as-of lookup of that
+curve at the start and end times, so the join is vectorized and touches each
+sample once. The result is a small JSON index:
+
+    {"rpi4": {"ML-DSA-44": {"joules_per_mb": ..., "joules_per_signature": ..., ...}}}
+
+AutonomicManager loads it with EnergyIndex.load() and predicts energy with a
+dictionary lookup.
+"""
+import argparse
+import glob
+import json
+from pathlib import Path
+import re
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_INDEX = Path(__file__).resolve().parent / "energy_index.json"
+DEFAULT_ENERGY_CSV = Path(__file__).resolve().parent / "energy_data.csv"
+DEFAULT_BENCHMARKS = str(Path(__file__).resolve().parent / "liboqs-scripts" / "signing_benchmark_*.csv")
+
+
+def device_from_filename(filename):
+    """signing_benchmark_rpi_4.csv (and its _stream/_parallel variants) -> "rpi4", the socket alias"""
+    match = re.match(r"signing_benchmark_([a-z]+)_?(\d+)", Path(filename).name)
+    return f"{match.group(1)}{match.group(2)}" if match else Path(filename).stem
+
+
+def cumulative_energy(times, power):
+    """Cumulative trapezoidal energy in joules at each sample time"""
+    return np.concatenate(([0.0], np.cumsum(np.diff(times) * (power[1:] + power[:-1]) / 2)))
+
+
+def energy_between(times, cumulative, start, end):
+    """Joules drawn between each start/end pair, interpolated between samples.
+    Windows are clipped to the recorded samples; the covered seconds are returned too.
+    """
+    start = np.clip(start, times[0], times[-1])
+    end = np.clip(end, times[0], times[-1])
+    return np.interp(end, times, cumulative) - np.interp(start, times, cumulative), end - start
+
+
+def idle_power(times, power, start, end):
+    """Median power of the samples that fall outside every benchmark run"""
+    order = np.argsort(start)
+    start, end = start[order], end[order]
+    # The last run starting at or before each sample; the sample is busy if that run has not ended yet
+    run = np.searchsorted(start, times, side='right') - 1
+    busy = (run >= 0) & (times <= end[np.maximum(run, 0)])
+    idle = power[~busy]
+    return float(np.median(idle)) if len(idle) else 0.0
+
+
+def epoch_seconds(timestamps):
+    return (timestamps - pd.Timestamp(0)).dt.total_seconds().to_numpy()
+
+
+def load_energy(filename):
+    energy = pd.read_csv(filename, usecols=['Timestamp', 'Socket', 'Power (W)'], parse_dates=['Timestamp'])
+    energy['time'] = epoch_seconds(energy['Timestamp'])
+    return energy.sort_values(['Socket', 'time'], kind='stable')
+
+
+def load_runs(filenames):
+    frames = []
+    for filename in filenames:
+        runs = pd.read_csv(filename, skipinitialspace=True, parse_dates=['Start Time', 'End Time'])
+        runs['device'] = device_from_filename(filename)
+        frames.append(runs[['device', 'Algorithm', 'Start Time', 'End Time', 'Num Files', 'Total Size MB']])
+    runs = pd.concat(frames, ignore_index=True)
+    runs['start'] = epoch_seconds(runs['Start Time'])
+    runs['end'] = epoch_seconds(runs['End Time'])
+    return runs
+
+
+def build_index(energy_csv=DEFAULT_ENERGY_CSV, benchmark_files=None):
+    """Return {device: {algorithm: costs}} for every benchmark run covered by the telemetry"""
+    benchmark_files = benchmark_files if benchmark_files is not None else sorted(glob.glob(DEFAULT_BENCHMARKS))
+    energy = load_energy(energy_csv)
+    runs = load_runs(benchmark_files)
+
+    index = {}
+    for device, device_runs in runs.groupby('device', sort=True):
+        samples = energy[energy['Socket'] == device]
+        if len(samples) < 2:
+            print(f"No telemetry for socket {device}, skipping {len(device_runs)} runs")
+            continue
+        times = samples['time'].to_numpy()
+        power = samples['Power (W)'].to_numpy(np.float64)
+        start = device_runs['start'].to_numpy()
+        end = device_runs['end'].to_numpy()
+
+        joules, covered = energy_between(times, cumulative_energy(times, power), start, end)
+        baseline = idle_power(times, power, start, end)
+        # A run only partly inside the telemetry is charged for the data signed in the covered part,
+        # assuming a steady rate, so partial joules are not divided by the whole run's megabytes
+        duration = end - start
+        fraction = np.divide(covered, duration, out=np.zeros_like(covered, dtype=np.float64), where=duration > 0)
+        costs = pd.DataFrame({
+            'algorithm': device_runs['Algorithm'].to_numpy(),
+            'joules': joules,
+            'seconds': covered,
+            'megabytes': device_runs['Total Size MB'].to_numpy(np.float64) * fraction,
+            'signatures': device_runs['Num Files'].to_numpy(np.float64) * fraction
+        })
+        # Runs outside the recorded telemetry would otherwise show up as free
+        costs = costs[costs['seconds'] > 0]
+        totals = costs.groupby('algorithm', sort=True).sum()
+
+        index[device] = {'_idle_power_w': baseline}
+        for algorithm, row in totals.iterrows():
+            index[device][algorithm] = {
+                'joules_per_mb': row['joules'] / row['megabytes'],
+                'joules_per_signature': row['joules'] / row['signatures'],
+                'seconds_per_mb': row['seconds'] / row['megabytes'],
+                'mean_power_w': row['joules'] / row['seconds'],
+                'net_joules_per_mb': (row['joules'] - baseline * row['seconds']) / row['megabytes']
+            }
+    return index
+
+
+class EnergyIndex:
+    """Read-only view of an energy index for constant-time cost predictions"""
+
+    def __init__(self, index):
+        self.index = index
+
+    @classmethod
+    def load(cls, filename=DEFAULT_INDEX):
+        with open(filename) as file:
+            return cls(json.load(file))
+
+    def save(self, filename=DEFAULT_INDEX):
+        with open(filename, 'w') as file:
+            json.dump(self.index, file, indent=1, sort_keys=True)
+
+    def costs(self, device, algorithm):
+        return self.index.get(device, {}).get(algorithm)
+
+    def idle_power_w(self, device):
+        return self.index.get(device, {}).get('_idle_power_w')
+
+    def predict_joules(self, device, algorithm, megabytes=0.0, signatures=0):
+        """Energy to sign megabytes of data in signatures files, or None if the pair was never measured"""
+        costs = self.costs(device, algorithm)
+        if costs is None:
+            return None
+        if megabytes:
+            return costs['joules_per_mb'] * megabytes
+        return costs['joules_per_signature'] * signatures
+
+    def predict_wh(self, device, algorithm, megabytes=0.0, signatures=0):
+        joules = self.predict_joules(device, algorithm, megabytes, signatures)
+        return None if joules is None else joules / 3600
+
+    def predict_seconds(self, device, algorithm, megabytes):
+        costs = self.costs(device, algorithm)
+        return None if costs is None else costs['seconds_per_mb'] * megabytes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--energy", default=str(DEFAULT_ENERGY_CSV), help="Kasa telemetry CSV")
+    parser.add_argument("--benchmarks", nargs="+", default=None, help="Benchmark CSVs, default liboqs-scripts/signing_benchmark_*.csv")
+    parser.add_argument("--output", default=str(DEFAULT_INDEX))
+    args = parser.parse_args()
+
+    energy_index = EnergyIndex(build_index(args.energy, args.benchmarks))
+    energy_index.save(args.output)
+    for device, algorithms in energy_index.index.items():
+        print(f"{device}: {len(algorithms) - 1} algorithms, idle {algorithms['_idle_power_w']:.3f} W")
+        measured = [name for name in algorithms if not name.startswith('_')]
+        if not measured:
+            continue  # every run on this device fell outside the telemetry
+        cheapest = min(measured, key=lambda name: algorithms[name]['joules_per_mb'])
+        print(f"  cheapest per MB: {cheapest} ({algorithms[cheapest]['joules_per_mb']:.3f} J/MB)")
+    print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
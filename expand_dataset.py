@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""Vectorized replacement for the row-by-row loop in expand-dataset.ipynb.
+
+Every source row is expanded into `factor` jittered samples drawn with the same
+ranges as the notebook:
+    Residual_Power   ~ U(power - 10, power)
+    Max_Stack_Usage  ~ U(ram, ram + 100)
+    Max_ROM          ~ U(rom, rom + 10)
+    Min_Throughput   ~ max(0, U(throughput - 100, throughput))
+The output holds the source rows followed by the generated rows, as before.
+
+The pyarrow writer (in requirements.txt; used by --engine auto when installed)
+is about 10x faster than pandas. Its output has the same header and unquoted
+text as the pandas writer, and parses to identical values. The one visible
+difference is that floats with an integral value are written without ".0"
+(e.g. 100 instead of 100.0). Text values containing a comma, quote or
+newline make pyarrow quote every text value in the file, not just those.
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+# pyarrow is listed in requirements.txt; without it the slower pandas writer is used
+try:
+    import pyarrow
+    import pyarrow.csv
+except ImportError:
+    pyarrow = None
+
+COLUMNS = ['Residual_Power', 'Application_Type', 'Min_Security_Level', 'Max_Stack_Usage', 'Max_ROM', 'Min_Throughput', 'Algorithm']
+NUMERIC_COLUMNS = ['Residual_Power', 'Max_Stack_Usage', 'Max_ROM', 'Min_Throughput']
+
+
+def load_source(filename):
+    """Read a headerless source dataset such as datasets/FullDataset.csv"""
+    df = pd.read_csv(filename, header=None, names=COLUMNS)
+    df[NUMERIC_COLUMNS] = df[NUMERIC_COLUMNS].astype(np.float64)
+    for column in COLUMNS:
+        if column not in NUMERIC_COLUMNS:
+            df[column] = df[column].astype('category')
+    return df
+
+
+def _repeat_categorical(column, index):
+    """Repeat a text column by integer codes instead of copying Python strings"""
+    categorical = pd.Categorical(column)
+    return pd.Categorical.from_codes(categorical.codes[index], categorical.categories)
+
+
+def jitter(df, factor, rng):
+    """Return factor jittered samples per row of df, in row order"""
+    index = np.repeat(np.arange(len(df)), factor)
+    size = len(index)
+    power = df['Residual_Power'].to_numpy()[index]
+    ram = df['Max_Stack_Usage'].to_numpy()[index]
+    rom = df['Max_ROM'].to_numpy()[index]
+    throughput = df['Min_Throughput'].to_numpy()[index]
+
+    return pd.DataFrame({
+        'Residual_Power': rng.uniform(power - 10, power, size),
+        'Application_Type': _repeat_categorical(df['Application_Type'], index),
+        'Min_Security_Level': _repeat_categorical(df['Min_Security_Level'], index),
+        'Max_Stack_Usage': rng.uniform(ram, ram + 100, size),
+        'Max_ROM': rng.uniform(rom, rom + 10, size),
+        'Min_Throughput': np.maximum(0, rng.uniform(throughput - 100, throughput, size)),
+        'Algorithm': _repeat_categorical(df['Algorithm'], index)
+    }, columns=COLUMNS)
+
+
+def iter_expanded(df, factor=100, seed=None, chunk_rows=1_000_000):
+    """Yield the source rows, then the generated rows in chunks of about chunk_rows.
+    The same seed and chunk_rows always produce the same samples.
+    """
+    rng = np.random.default_rng(seed)
+    yield df
+    source_rows = max(chunk_rows // factor, 1)
+    for start in range(0, len(df), source_rows):
+        yield jitter(df.iloc[start:start + source_rows], factor, rng)
+
+
+def _needs_quotes(df):
+    """Whether any text value would need quoting in a CSV"""
+    return any(any(character in str(value) for character in ',"\r\n')
+               for column in COLUMNS if column not in NUMERIC_COLUMNS for value in df[column].cat.categories)
+
+
+def _write_pyarrow(df, chunks, output):
+    rows = 0
+    writer = None
+    # pyarrow always quotes its own header, so the header is written here in the pandas format;
+    # text is left unquoted, like pandas does, unless some value needs quotes
+    options = pyarrow.csv.WriteOptions(include_header=False, quoting_style="needed" if _needs_quotes(df) else "none")
+    with open(output, 'wb') as file:
+        file.write((",".join(COLUMNS) + "\n").encode())
+        try:
+            for chunk in chunks:
+                table = pyarrow.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pyarrow.csv.CSVWriter(file, table.schema, write_options=options)
+                writer.write_table(table)
+                rows += len(chunk)
+        finally:
+            if writer is not None:
+                writer.close()
+    return rows
+
+
+def _write_pandas(chunks, output):
+    rows = 0
+    for index, chunk in enumerate(chunks):
+        chunk.to_csv(output, mode='w' if index == 0 else 'a', header=index == 0, index=False, encoding='utf-8')
+        rows += len(chunk)
+    return rows
+
+
+def expand_dataset(source, output, factor=100, seed=None, chunk_rows=1_000_000, engine="auto"):
+    """Expand source into output as CSV, streaming chunk by chunk. Returns the number of rows written.
+    engine is "pandas", "pyarrow", or "auto" to use pyarrow when it is installed.
+    """
+    df = load_source(source)
+    chunks = iter_expanded(df, factor, seed, chunk_rows)
+    if engine == "pyarrow" or (engine == "auto" and pyarrow is not None):
+        return _write_pyarrow(df, chunks, output)
+    return _write_pandas(chunks, output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", default="datasets/FullDataset.csv")
+    parser.add_argument("--output", default="dataset_expanded.csv")
+    parser.add_argument("--factor", type=int, default=100, help="Generated samples per source row")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for reproducible output")
+    parser.add_argument("--chunk-rows", type=int, default=1_000_000, help="Generated rows held in memory at once")
+    parser.add_argument("--engine", choices=["auto", "pandas", "pyarrow"], default="auto", help="CSV writer")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    rows = expand_dataset(args.source, args.output, args.factor, args.seed, args.chunk_rows, args.engine)
+    elapsed = time.perf_counter() - start
+    print(f"Wrote {rows} rows to {args.output} in {elapsed:.2f} s ({rows / elapsed:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -19,97 +19,177 @@
 
 # asyncio.run(get_device_children())
 
-from kasa.iot import IotStrip
+# kasa and matplotlib are imported where they are used, so offline managers start without them
+import argparse
 import asyncio
-import matplotlib.pyplot as plt
-from matplotlib.animation import FuncAnimation
-from collections import defaultdict
-from datetime import datetime
+from clocks import SYSTEM_CLOCK
+from energy_buffer import EnergyRingBuffer
 import numpy as np
 import threading
-from queue import Queue
-import csv
-import os
+from collections import deque
+from queue import Queue, Empty
+from runtime_metrics import registry as metrics
+from telemetry_writer import OUTPUT_FORMATS, FSYNC_POLICIES, TelemetryWriter
+import time
+
+DEFAULT_STRIP_IP = "192.168.11.105"
 
 class EnergyMonitor:
     aliases = ["rpi3", "rpi4", "rpi5"]  # Names of the sockets to monitor
-    def __init__(self, device_ip="192.168.11.105", max_points=60, csv_filename="energy_data.csv"):
+    def __init__(self, device_ip=DEFAULT_STRIP_IP, max_points=60, csv_filename="energy_data.csv", history_size=86400, telemetry_writer=None,
+                 strip=None, aliases=None, monitor_all_sockets=False, interval=1.0, min_interval=0.5, idle_interval=None, request_timeout=2.0, burst_threshold=0.5, burst_hold=10.0,
+                 clock=None):
         self.device_ip = device_ip
-        self.strip = IotStrip(device_ip)
-        self.max_points = max_points
+        # Sample times, timestamps and the polling cadence follow this clock (clocks.SimulatedClock for replays)
+        self.clock = clock or SYSTEM_CLOCK
+        # Any object with the IotStrip interface works, e.g. kasa_fake.FakeIotStrip
+        if strip is None:
+            from kasa.iot import IotStrip
+            strip = IotStrip(device_ip)
+        self.strip = strip
+        if aliases is not None:
+            self.aliases = list(aliases)
+        self.monitor_all_sockets = monitor_all_sockets
+        self.max_points = max_points  # Points shown by the dashboard
+        self.history_size = history_size  # Samples kept per socket
         
-        # CSV file setup
+        # CSV file setup: rows are batched and written off the collection thread
         self.csv_filename = csv_filename
-        self.csv_file = None
-        self.csv_writer = None
-        self._init_csv()
+        self.telemetry_writer = telemetry_writer or TelemetryWriter(csv_filename)
         
-        # Data storage for each socket
-        self.power_data = defaultdict(list)
-        self.current_data = defaultdict(list)
-        self.voltage_data = defaultdict(list)
-        self.timestamps = []
+        # Ring buffer of samples for each socket, indexed by monotonic time
+        self.buffers = {}
+        self.last_timestamp = None
+        self._buffers_lock = threading.Lock()
         
         # Queue for thread-safe data updates
         self.data_queue = Queue()
         self.running = True
-    
-    def _init_csv(self):
-        """Initialize CSV file with headers"""
-        file_exists = os.path.exists(self.csv_filename)
-        self.csv_file = open(self.csv_filename, 'a', newline='')
-        self.csv_writer = csv.writer(self.csv_file)
-        
-        # Write header if file is new
-        if not file_exists:
-            self.csv_writer.writerow(['Timestamp', 'Socket', 'Power (W)', 'Current (A)', 'Voltage (V)'])
-            self.csv_file.flush()
+
+        # Adaptive sampling: poll every min_interval during signing bursts (power jumps by more
+        # than burst_threshold W, or boost() was called) and back off towards idle_interval when idle.
+        # idle_interval defaults to interval; set it higher to poll less often between bursts
+        self.interval = interval
+        self.min_interval = min_interval
+        self.idle_interval = interval if idle_interval is None else idle_interval
+        self.request_timeout = request_timeout
+        self.burst_threshold = burst_threshold
+        self.burst_hold = burst_hold
+        self.current_interval = interval
+        self._burst_until = 0.0
+        self._last_power = {}
+
+        # Poll statistics
+        self.poll_latencies = deque(maxlen=1000)
+        self.polls = 0
+        self.poll_timeouts = 0
+        self.poll_errors = 0
+        self.missed_ticks = 0
     
     def _write_to_csv(self, timestamp, socket_name, power, current, voltage):
-        """Write a single row to CSV"""
-        try:
-            self.csv_writer.writerow([timestamp, socket_name, power, current, voltage])
-            self.csv_file.flush()
-        except Exception as e:
-            print(f"Error writing to CSV: {e}")
+        """Queue a single row for the background telemetry writer"""
+        self.telemetry_writer.write(timestamp, socket_name, power, current, voltage)
         
+    async def _poll_child(self, child):
+        """Update one socket, giving up after request_timeout seconds"""
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(child.update(), self.clock.to_real(self.request_timeout) or None)
+        except asyncio.TimeoutError:
+            self.poll_timeouts += 1
+            return None
+        finally:
+            self.poll_latencies.append(time.perf_counter() - start)
+
+        if not child.has_emeter:
+            return None
+        return {
+            'power': child.state_information.get('Current consumption', 0),
+            'current': child.state_information.get('Current', 0),
+            'voltage': child.state_information.get('Voltage', 0)
+        }
+
     async def _update_data_async(self):
-        """Fetch the latest data from the device"""
+        """Fetch the latest data from the device, polling all monitored sockets concurrently"""
         try:
-            await self.strip.update()
+            await asyncio.wait_for(self.strip.update(), self.clock.to_real(self.request_timeout) or None)
+            sample_time = self.clock.monotonic()
+            sample_datetime = self.clock.now()
             
+            children = [child for child in self.strip.children if self.monitor_all_sockets or child.alias in self.aliases]
+            results = await asyncio.gather(*(self._poll_child(child) for child in children), return_exceptions=True)
+
             data = {}
-            for child in self.strip.children:   
-                if child.alias in self.aliases:
-                    await child.update()
-                    
-                    if child.has_emeter:
-                        power = child.state_information.get('Current consumption', 0)
-                        current = child.state_information.get('Current', 0)
-                        voltage = child.state_information.get('Voltage', 0)
-
-                        data[child.alias] = {
-                            'power': power,
-                            'current': current,
-                            'voltage': voltage
-                        }
+            for child, values in zip(children, results):
+                if isinstance(values, Exception):
+                    self.poll_errors += 1
+                    print(f"Error updating {child.alias}: {values}")
+                elif values is not None:
+                    data[child.alias] = values
             
-            self.data_queue.put(data)
+            # Timestamp when the sample was taken, not when it is drained from the queue
+            self.polls += 1
+            self._adapt_interval(data)
+            self.data_queue.put((sample_time, sample_datetime, data))
                 
         except Exception as e:
+            self.poll_errors += 1
             print(f"Error updating data: {e}")
+
+    def boost(self, duration=None):
+        """Sample at min_interval for the next duration seconds, e.g. while signing"""
+        self._burst_until = max(self._burst_until, self.clock.monotonic() + (duration or self.burst_hold))
+
+    def _adapt_interval(self, data):
+        """Pick the next sampling interval from how much power changed since the last poll"""
+        for socket_name, values in data.items():
+            previous = self._last_power.get(socket_name)
+            if previous is not None and abs(values['power'] - previous) >= self.burst_threshold:
+                self.boost()
+            self._last_power[socket_name] = values['power']
+
+        if self.clock.monotonic() < self._burst_until:
+            self.current_interval = self.min_interval
+        else:
+            # Back off gradually so a short pause between bursts does not drop straight to the idle rate
+            self.current_interval = min(self.current_interval * 1.5, self.idle_interval)
+
+    def poll_stats(self):
+        """Per-poll latency statistics for the socket requests"""
+        latencies = np.array(self.poll_latencies)
+        return {
+            'polls': self.polls,
+            'timeouts': self.poll_timeouts,
+            'errors': self.poll_errors,
+            'missed_ticks': self.missed_ticks,
+            'interval': self.current_interval,
+            'latency_mean': float(latencies.mean()) if len(latencies) else 0.0,
+            'latency_p50': float(np.percentile(latencies, 50)) if len(latencies) else 0.0,
+            'latency_p95': float(np.percentile(latencies, 95)) if len(latencies) else 0.0,
+            'latency_max': float(latencies.max()) if len(latencies) else 0.0
+        }
+
+    async def run_periodic_update(self):
+        """Poll on a fixed cadence: each tick is scheduled from the previous tick, not from
+        when the poll finished, so request latency does not accumulate as drift
+        """
+        next_tick = self.clock.monotonic()
+        while self.running:
+            await self._update_data_async()
+            next_tick += self.current_interval
+            delay = next_tick - self.clock.monotonic()
+            if delay < 0:
+                # The poll overran one or more ticks: skip them rather than bursting to catch up
+                self.missed_ticks += int(-delay // self.current_interval) + 1
+                next_tick = self.clock.monotonic()
+                delay = 0
+            await self.clock.async_sleep(delay)
     
     def _run_async_loop(self):
         """Run the async event loop in a separate thread"""
         loop = asyncio.new_event_loop()
         asyncio.set_event_loop(loop)
-        
-        async def periodic_update():
-            while self.running:
-                await self._update_data_async()
-                await asyncio.sleep(1)
-        
-        loop.run_until_complete(periodic_update())
+        loop.run_until_complete(self.run_periodic_update())
     
     def start_background_thread(self):
         """Start the data collection thread"""
@@ -118,39 +198,74 @@ class EnergyMonitor:
     
     def get_latest_data(self):
             """Get the latest data from the queue and write to CSV"""
-            try:
-                while not self.data_queue.empty():
-                    data = self.data_queue.get_nowait()
+            with self._buffers_lock:
+                while True:
+                    try:
+                        sample_time, sample_datetime, data = self.data_queue.get_nowait()
+                    except Empty:
+                        break
                     # Higher resolution timestamp: includes milliseconds
-                    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+                    timestamp = sample_datetime.strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
                     
                     for socket_name, values in data.items():
-                        self.power_data[socket_name].append(values['power'])
-                        self.current_data[socket_name].append(values['current'])
-                        self.voltage_data[socket_name].append(values['voltage'])
+                        if socket_name not in self.buffers:
+                            self.buffers[socket_name] = EnergyRingBuffer(self.history_size)
+                        self.buffers[socket_name].append(sample_time, values['power'], values['current'], values['voltage'],
+                                                         wall_time=sample_datetime.timestamp())
                         
                         # Write to CSV
                         self._write_to_csv(timestamp, socket_name, values['power'], values['current'], values['voltage'])
-                        
-                        # Keep only the last max_points measurements
-                        if len(self.power_data[socket_name]) > self.max_points:
-                            self.power_data[socket_name].pop(0)
-                            self.current_data[socket_name].pop(0)
-                            self.voltage_data[socket_name].pop(0)
                     
-                    self.timestamps.append(timestamp)
-                    if len(self.timestamps) > self.max_points:
-                        self.timestamps.pop(0)
-            except:
-                pass
+                    self.last_timestamp = timestamp
+
+    def energy_wh(self, socket_name, start_time, end_time=None):
+        """Energy used by a socket between two clock.monotonic() times, in Wh"""
+        self.get_latest_data()
+        # Under the lock, so the collection thread cannot wrap the ring buffer mid-query
+        with self._buffers_lock:
+            buffer = self.buffers.get(socket_name)
+            return buffer.energy_wh(start_time, end_time) if buffer else 0.0
+
+    def _latest(self, name):
+        with self._buffers_lock:
+            return {socket_name: buffer.latest(name, self.max_points).copy() for socket_name, buffer in self.buffers.items()}
+
+    @property
+    def power_data(self):
+        """Last max_points power readings per socket"""
+        return self._latest('power')
+
+    @property
+    def current_data(self):
+        """Last max_points current readings per socket"""
+        return self._latest('current')
+
+    @property
+    def voltage_data(self):
+        """Last max_points voltage readings per socket"""
+        return self._latest('voltage')
         
+    def recent(self, seconds, names=('power', 'current', 'voltage')):
+        """{socket: (times, *columns)} for the last seconds of history, copied out under the buffer lock"""
+        self.get_latest_data()
+        with self._buffers_lock:
+            recent = {}
+            for socket_name, buffer in self.buffers.items():
+                start = buffer.last_time() - seconds if len(buffer) else 0.0
+                # window() can return views of the ring buffer, which later appends overwrite
+                recent[socket_name] = tuple(buffer.window(name, start).copy() for name in ('time',) + tuple(names))
+            return recent
+
     def close(self):
-        """Close the CSV file"""
-        if self.csv_file:
-            self.csv_file.close()
+        """Write out queued rows and close the CSV file"""
+        self.get_latest_data()
+        self.telemetry_writer.close()
 
 def create_plots(monitor):
     """Create the figure with three subplots for real-time visualization"""
+    import matplotlib.pyplot as plt
+    from matplotlib.animation import FuncAnimation
+
     fig, (ax1, ax2, ax3) = plt.subplots(3, 1, figsize=(12, 10))
     fig.suptitle('Real-time Energy Monitoring - TPLink HS300', fontsize=14, fontweight='bold')
     
@@ -210,8 +325,8 @@ def create_plots(monitor):
             ax.autoscale_view()
         
         # Update title with timestamp
-        if monitor.timestamps:
-            fig.suptitle(f'Real-time Energy Monitoring - TPLink HS300 | Last update: {monitor.timestamps[-1]}', 
+        if monitor.last_timestamp:
+            fig.suptitle(f'Real-time Energy Monitoring - TPLink HS300 | Last update: {monitor.last_timestamp}', 
                         fontsize=14, fontweight='bold')
         
         return list(lines_power.values()) + list(lines_current.values()) + list(lines_voltage.values())
@@ -221,16 +336,211 @@ def create_plots(monitor):
     
     return fig, ani
 
+def decimate_minmax(times, values, buckets, out_x, out_y):
+    """Reduce a series to the min and max of each of buckets equal slices, written into out_x/out_y.
+    Spikes survive at any zoom level, and the line never has more than 2 * buckets points.
+    Returns the number of points written.
+    """
+    n = len(values)
+    if n <= 2 * buckets:
+        out_x[:n] = times
+        out_y[:n] = values
+        return n
+    starts = (np.arange(buckets) * n) // buckets
+    np.minimum.reduceat(values, starts, out=out_y[0:2 * buckets:2])
+    np.maximum.reduceat(values, starts, out=out_y[1:2 * buckets:2])
+    out_x[0:2 * buckets:2] = times[starts]
+    out_x[1:2 * buckets:2] = times[np.append(starts[1:], n) - 1]
+    return 2 * buckets
+
+
+class BlittedDashboard:
+    """Real-time dashboard that redraws only the lines.
+
+    The axes, ticks and grid are rendered once into a cached background; each
+    frame restores it and draws the animated lines on top (blitting). History
+    is min/max decimated to one pair of points per horizontal pixel, into
+    preallocated arrays. A full redraw only happens when a y-axis has to grow
+    because data left its bounds (or shrink because the data uses less than
+    shrink_below of it), when a new socket appears, or when the window is
+    resized. Sockets are added as they show up, so any number is supported.
+    """
+    columns = (('power', 'Power (W)'), ('current', 'Current (A)'), ('voltage', 'Voltage (V)'))
+
+    def __init__(self, monitor, window=300.0, interval=500, margin=0.1, shrink_below=0.25):
+        import matplotlib.pyplot as plt
+
+        self.monitor = monitor
+        self.window = window
+        self.interval = interval
+        self.margin = margin
+        self.shrink_below = shrink_below
+        self.plt = plt
+        self.fig, self.axes = plt.subplots(len(self.columns), 1, figsize=(12, 10), sharex=True)
+        self.fig.suptitle('Real-time Energy Monitoring - TPLink HS300', fontsize=14, fontweight='bold')
+        for ax, (_, label) in zip(self.axes, self.columns):
+            ax.set_xlim(-window, 0)
+            ax.set_ylabel(label)
+            ax.grid(True, alpha=0.3)
+        self.axes[-1].set_xlabel('Seconds ago')
+
+        self.lines = {}  # socket -> one Line2D per column
+        self.out_x = None
+        self.out_y = None
+        self.status = self.fig.text(0.01, 0.005, '', fontsize=9, animated=True)
+        self.frame_times = deque(maxlen=200)
+        self.full_redraws = 0
+        self.background = None
+        self.fig.canvas.mpl_connect('draw_event', self._on_draw)
+        self.timer = self.fig.canvas.new_timer(interval=interval)
+        self.timer.add_callback(self.update)
+
+    def _buckets(self):
+        """One min/max pair per horizontal pixel of the plot area"""
+        return max(int(self.axes[0].bbox.width), 1)
+
+    def _on_draw(self, event):
+        """Cache the static parts after every full draw, then put the animated artists back"""
+        self.background = self.fig.canvas.copy_from_bbox(self.fig.bbox)
+        self._draw_animated()
+
+    def _draw_animated(self):
+        for lines in self.lines.values():
+            for line in lines:
+                self.fig.draw_artist(line)
+        self.fig.draw_artist(self.status)
+
+    def _add_socket(self, socket_name):
+        color = self.plt.cm.tab20(len(self.lines) % 20)
+        self.lines[socket_name] = [ax.plot([], [], label=socket_name, color=color, linewidth=1, animated=True)[0]
+                                   for ax in self.axes]
+        # Legends are part of the background, so they are only rebuilt when a socket is added
+        for ax in self.axes:
+            ax.legend(loc='upper right', fontsize=9, ncol=max(len(self.lines) // 8, 1))
+
+    def _limits(self, low, high):
+        pad = max((high - low) * self.margin, abs(high) * 0.01, 1e-3)
+        return low - pad, high + pad
+
+    def _needs_rescale(self, ax, low, high):
+        bottom, top = ax.get_ylim()
+        if low < bottom or high > top:
+            return True
+        new_bottom, new_top = self._limits(low, high)
+        return (new_top - new_bottom) < self.shrink_below * (top - bottom)
+
+    def update(self):
+        start = time.perf_counter()
+        recent = self.monitor.recent(self.window)
+        redraw = False
+        for socket_name in sorted(recent):
+            if socket_name not in self.lines:
+                self._add_socket(socket_name)
+                redraw = True
+
+        buckets = self._buckets()
+        if self.out_x is None or len(self.out_x) < 2 * buckets:
+            self.out_x = np.empty(2 * buckets)
+            self.out_y = np.empty(2 * buckets)
+
+        now = max((times[-1] for times, *_ in recent.values() if len(times)), default=0.0)
+        bounds = [[np.inf, -np.inf] for _ in self.axes]
+        for socket_name, (times, *columns) in recent.items():
+            for index, (line, values) in enumerate(zip(self.lines[socket_name], columns)):
+                count = decimate_minmax(times, values, buckets, self.out_x, self.out_y)
+                if count:
+                    x = np.subtract(self.out_x[:count], now, out=self.out_x[:count])
+                    y = self.out_y[:count]
+                    line.set_data(x, y)  # Line2D keeps its own copy, so the buffers are reused next time
+                    bounds[index][0] = min(bounds[index][0], y.min())
+                    bounds[index][1] = max(bounds[index][1], y.max())
+                else:
+                    line.set_data([], [])
+
+        for ax, (low, high) in zip(self.axes, bounds):
+            if low <= high and self._needs_rescale(ax, low, high):
+                ax.set_ylim(*self._limits(low, high))
+                redraw = True
+
+        frame_time = time.perf_counter() - start
+        self.frame_times.append(frame_time)
+        self.status.set_text(self._status_text())
+        if redraw or self.background is None:
+            # draw_event recaches the background and draws the lines over it
+            self.full_redraws += 1
+            self.fig.canvas.draw()
+        else:
+            self.fig.canvas.restore_region(self.background)
+            self._draw_animated()
+            self.fig.canvas.blit(self.fig.bbox)
+        self.fig.canvas.flush_events()
+        self.frame_times[-1] = time.perf_counter() - start
+        metrics.histogram("dashboard_frame_seconds", "Dashboard frame render time").observe(self.frame_times[-1])
+        return self.frame_times[-1]
+
+    def frame_stats(self):
+        times = np.array(self.frame_times)
+        return {
+            'frames': len(times),
+            'full_redraws': self.full_redraws,
+            'frame_mean': float(times.mean()) if len(times) else 0.0,
+            'frame_p95': float(np.percentile(times, 95)) if len(times) else 0.0
+        }
+
+    def _status_text(self):
+        stats = self.frame_stats()
+        return (f"Last update: {self.monitor.last_timestamp or '-'} | {len(self.lines)} sockets | "
+                f"frame {self.frame_times[-1] * 1000:.1f} ms (mean {stats['frame_mean'] * 1000:.1f}, "
+                f"p95 {stats['frame_p95'] * 1000:.1f}) | full redraws {self.full_redraws}")
+
+    def start(self):
+        self.timer.start()
+        return self
+
+
 def main():
     """Main function to initialize and run the monitor"""
-    monitor = EnergyMonitor(device_ip="192.168.11.105", max_points=60, csv_filename="energy_data.csv")
+    import matplotlib.pyplot as plt
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--output", default="energy_data.csv", help="CSV file, or base name of the npz segments")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default="csv")
+    parser.add_argument("--batch-size", type=int, default=60, help="Rows written per batch")
+    parser.add_argument("--flush-interval", type=float, default=10.0, help="Seconds between writes of a partial batch")
+    parser.add_argument("--fsync", choices=FSYNC_POLICIES, default="shutdown")
+    parser.add_argument("--fsync-interval", type=float, default=60.0)
+    parser.add_argument("--max-bytes", type=int, default=None, help="Rotate the CSV file or npz segment past this size")
+    parser.add_argument("--max-age", type=float, default=None, help="Rotate the CSV file or npz segment after this many seconds")
+    parser.add_argument("--dashboard", choices=["blit", "classic"], default="blit",
+                        help="blit: decimated, blitted lines over a cached background; classic: redraw everything each frame")
+    parser.add_argument("--interval", type=float, default=1.0, help="Seconds between polls")
+    parser.add_argument("--idle-interval", type=float, default=None,
+                        help="Seconds between polls once power has been steady for a while (default: --interval)")
+    parser.add_argument("--window", type=float, default=300.0, help="Seconds of history shown by the blit dashboard")
+    parser.add_argument("--fake-sockets", type=int, default=None, help="Plot this many simulated sockets instead of the HS300")
+    args = parser.parse_args()
+
+    writer = TelemetryWriter(args.output, output_format=args.format, batch_size=args.batch_size, flush_interval=args.flush_interval,
+                             fsync=args.fsync, fsync_interval=args.fsync_interval, max_bytes=args.max_bytes, max_age=args.max_age)
+    strip = None
+    if args.fake_sockets:
+        from kasa_fake import FakeIotStrip
+        strip = FakeIotStrip(aliases=[f"socket{index}" for index in range(args.fake_sockets)], seed=0)
+    monitor = EnergyMonitor(device_ip=DEFAULT_STRIP_IP, max_points=60, csv_filename=args.output, telemetry_writer=writer,
+                            strip=strip, monitor_all_sockets=bool(args.fake_sockets), interval=args.interval,
+                            idle_interval=args.idle_interval)
     
     # Start background thread for data collection
     monitor.start_background_thread()
     
     # Create plots
-    fig, ani = create_plots(monitor)
-    plt.tight_layout()
+    if args.dashboard == "blit":
+        dashboard = BlittedDashboard(monitor, window=args.window)
+        plt.tight_layout(rect=(0, 0.02, 1, 1))
+        dashboard.start()
+    else:
+        fig, ani = create_plots(monitor)
+        plt.tight_layout()
     
     try:
         plt.show()
@@ -0,0 +1,92 @@
+import argparse
+import asyncio
+import random
+import time
+
+
+class FakeIotPlug:
+    """Stand-in for a kasa.iot child socket with an energy meter.
+    Readings follow a noisy idle draw with occasional signing bursts.
+    """
+
+    def __init__(self, alias, idle_power=2.5, burst_power=6.0, voltage=117.0, latency=0.02, jitter=0.01, burst_probability=0.02, seed=None):
+        self.alias = alias
+        self.is_on = True
+        self.has_emeter = True
+        self.idle_power = idle_power
+        self.burst_power = burst_power
+        self.voltage = voltage
+        self.latency = latency
+        self.jitter = jitter
+        self.burst_probability = burst_probability
+        self.updates = 0
+        self._random = random.Random(seed)
+        self._burst_until = 0.0
+        self.state_information = {}
+
+    def _reading(self):
+        now = time.monotonic()
+        if now >= self._burst_until and self._random.random() < self.burst_probability:
+            self._burst_until = now + self._random.uniform(5, 30)
+        power = (self.burst_power if now < self._burst_until else self.idle_power) + self._random.gauss(0, 0.05)
+        voltage = self.voltage + self._random.gauss(0, 0.2)
+        return power, voltage
+
+    async def update(self):
+        await asyncio.sleep(max(self.latency + self._random.uniform(-self.jitter, self.jitter), 0))
+        power, voltage = self._reading()
+        self.updates += 1
+        self.state_information = {
+            'Current consumption': round(power, 3),
+            'Current': round(power / voltage, 3),
+            'Voltage': round(voltage, 3)
+        }
+
+
+class FakeIotStrip:
+    """Stand-in for kasa.iot.IotStrip so EnergyMonitor can run without the HS300"""
+
+    def __init__(self, host="fake", aliases=("rpi3", "rpi4", "rpi5"), latency=0.02, seed=None):
+        self.host = host
+        self.latency = latency
+        self.children = [FakeIotPlug(alias, latency=latency, seed=None if seed is None else seed + index)
+                         for index, alias in enumerate(aliases)]
+
+    async def update(self):
+        await asyncio.sleep(self.latency)
+
+
+def main():
+    """Run EnergyMonitor against a fake strip and report polling statistics"""
+    from kasa_energy import EnergyMonitor
+    from telemetry_writer import TelemetryWriter
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sockets", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.05, help="Simulated round-trip per request in seconds")
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--output", default="fake_energy_data.csv")
+    args = parser.parse_args()
+
+    aliases = [f"rpi{index}" for index in range(args.sockets)]
+    monitor = EnergyMonitor(strip=FakeIotStrip(aliases=aliases, latency=args.latency, seed=0),
+                            telemetry_writer=TelemetryWriter(args.output))
+    monitor.aliases = aliases
+    monitor.start_background_thread()
+
+    start = time.monotonic()
+    while time.monotonic() - start < args.duration:
+        time.sleep(1)
+        monitor.get_latest_data()
+    monitor.running = False
+    monitor.close()
+
+    stats = monitor.poll_stats()
+    print(f"Polls: {stats['polls']} in {args.duration:.0f} s ({stats['polls'] / args.duration:.2f} Hz), interval now {stats['interval']:.2f} s")
+    print(f"Request latency mean/p50/p95/max: {stats['latency_mean'] * 1000:.1f}/{stats['latency_p50'] * 1000:.1f}/"
+          f"{stats['latency_p95'] * 1000:.1f}/{stats['latency_max'] * 1000:.1f} ms")
+    print(f"Timeouts: {stats['timeouts']}, errors: {stats['errors']}, missed ticks: {stats['missed_ticks']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -12,11 +12,37 @@ from pathlib import Path
 import numpy as np
 import platform
 
+# Shared signing helpers live in the repository root next to kasa_energy.py
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from parallel_signing import default_workers, parallel_signing_with_detailed_metrics
+from pqc_signing import SIGNING_MODES, read_message, record_signature
+from runtime_metrics import read_peak_rss_bytes, read_rss_bytes, registry as metrics, reset_peak_rss
+
 # Parameters
 should_create_random_files = False
 number_of_files = 5
 min_file_size_in_mb = 10  # Starting size (will double for each file)
 file_extension = "bin"
+signing_mode = "full"  # "full" keeps benchmark numbers comparable, "stream"/"mmap" hash in chunks and sign the digest
+parallel_workers = 1  # 1 signs files one after another, 0 uses one process per core, N uses N processes
+memory_measurement = "rss"  # "rss": peak RSS growth from /proc at no runtime cost, in an extra "Peak RSS Growth (MB)" column,
+                            # "tracemalloc": traced Python allocations in "Memory Used (MB)" (slows signing; opt in for the old column)
+metrics_prometheus_file = "signing_benchmark_metrics.prom"  # Per-algorithm sign/verify histograms, None to skip
+metrics_jsonl_file = None
+
+# List of digital signing algorithms to be tested in this script
+SIGALGS = ["Falcon-512", "Falcon-1024", "ML-DSA-44", "ML-DSA-65", "ML-DSA-87", "SPHINCS+-SHA2-128f-simple", "SPHINCS+-SHA2-192f-simple", "SPHINCS+-SHA2-256f-simple",
+           "SLH_DSA_PURE_SHA2_128F", "SLH_DSA_PURE_SHA2_192F", "SLH_DSA_PURE_SHA2_256F", "SLH_DSA_PURE_SHAKE_128F", "SLH_DSA_PURE_SHAKE_192F", "SLH_DSA_PURE_SHAKE_256F",
+           "cross-rsdp-128-balanced", "cross-rsdp-128-fast", "cross-rsdp-128-small", "cross-rsdp-192-balanced", "cross-rsdp-192-fast", "cross-rsdp-192-small",
+           "cross-rsdp-256-balanced", "cross-rsdp-256-fast", "cross-rsdp-256-small", "MAYO-1", "MAYO-2", "MAYO-3", "MAYO-5", "SNOVA_24_5_4", "SNOVA_56_25_2", "SNOVA_60_10_4",
+           "OV-Is", "OV-III", "OV-V"]
+
+# Column names of the benchmark CSV
+CSV_HEADER = ("Algorithm,Start Time,End Time,Execution Time (s),Memory Used (MB),CPU Usage (%),"
+              "Read Bytes,Write Bytes,Total Signature Size (bytes),"
+              "Num Files,Total Size MB,Avg File Size MB,"
+              "CPU Count,Total RAM MB,Available RAM MB,System CPU %,System Memory %,"
+              "Avg Time Per File,Throughput MB/s,Temp-Before, Temp-After, DeltaTemp")
 
 
 def get_temperature():
@@ -133,7 +159,7 @@ def signing(alg, files):
         return total_signature_size
     
 
-def signing_with_detailed_metrics(alg, files):
+def signing_with_detailed_metrics(alg, files, mode="full"):
     """Enhanced signing with per-file metrics"""
     with oqs.Signature(alg) as signer, oqs.Signature(alg) as verifier:
         signer_public_key = signer.generate_keypair()
@@ -145,16 +171,23 @@ def signing_with_detailed_metrics(alg, files):
         for filename in files:
             file_start = time.perf_counter()
             
-            with open(filename, 'rb') as file:
-                bytes_data = file.read()
-                signature = signer.sign(bytes_data)
-                total_signature_size += len(signature)
-                per_file_signature_sizes.append(len(signature))
-                is_valid = verifier.verify(bytes_data, signature, signer_public_key)
-                print(f"Valid signature ({Path(filename).name})? {is_valid}\t|\t")
+            # In "stream"/"mmap" mode this is a digest, so memory stays flat regardless of file size
+            message = read_message(filename, mode)
+            # The sign/verify histograms leave the read out; the per-file time still includes it
+            sign_start = time.perf_counter()
+            signature = signer.sign(message)
+            sign_time = time.perf_counter() - sign_start
+            total_signature_size += len(signature)
+            per_file_signature_sizes.append(len(signature))
+            verify_start = time.perf_counter()
+            is_valid = verifier.verify(message, signature, signer_public_key)
+            verify_time = time.perf_counter() - verify_start
             
             file_elapsed = time.perf_counter() - file_start
             per_file_times.append(file_elapsed)
+            record_signature(alg, os.path.getsize(filename), is_valid, sign_time, verify_time)
+            if not is_valid:
+                print(f"Invalid signature ({Path(filename).name})\t|\t")
         
         return {
             'total_signature_size': total_signature_size,
@@ -165,24 +198,22 @@ def signing_with_detailed_metrics(alg, files):
         }
 
 if __name__ == "__main__":
-    # List of digital signing algorithms to be tested in this script
-    sigalgs = ["Falcon-512", "Falcon-1024", "ML-DSA-44", "ML-DSA-65", "ML-DSA-87", "SPHINCS+-SHA2-128f-simple", "SPHINCS+-SHA2-192f-simple", "SPHINCS+-SHA2-256f-simple",
-               "SLH_DSA_PURE_SHA2_128F", "SLH_DSA_PURE_SHA2_192F", "SLH_DSA_PURE_SHA2_256F", "SLH_DSA_PURE_SHAKE_128F", "SLH_DSA_PURE_SHAKE_192F", "SLH_DSA_PURE_SHAKE_256F",
-               "cross-rsdp-128-balanced", "cross-rsdp-128-fast", "cross-rsdp-128-small", "cross-rsdp-192-balanced", "cross-rsdp-192-fast", "cross-rsdp-192-small",
-               "cross-rsdp-256-balanced", "cross-rsdp-256-fast", "cross-rsdp-256-small", "MAYO-1", "MAYO-2", "MAYO-3", "MAYO-5", "SNOVA_24_5_4", "SNOVA_56_25_2", "SNOVA_60_10_4",
-               "OV-Is", "OV-III", "OV-V"]
-
-    # Output .csv file
+    sigalgs = SIGALGS
+
+    if signing_mode not in SIGNING_MODES:
+        sys.exit(f"Unknown signing mode '{signing_mode}', expected one of {SIGNING_MODES}")
+
+    # Output .csv file (full-buffer runs keep the original filename so results stay comparable)
     rpi_model = get_rpi_model()
-    output_csv = f"signing_benchmark_{rpi_model}.csv"
+    output_csv = f"signing_benchmark_{rpi_model}.csv" if signing_mode == "full" else f"signing_benchmark_{rpi_model}_{signing_mode}.csv"
+    workers = parallel_workers or default_workers()
+    if workers > 1:
+        output_csv = output_csv.replace(".csv", f"_parallel{workers}.csv")
     f = open(Path(__file__).parent / output_csv, 'w')
     # Write CSV header
     #f.write("Algorithm,Start Time,End Time,Execution Time (s),Memory Used (MB),CPU Usage (%),Read Bytes,Write Bytes,Total Signature Size (bytes)\n")
-    f.write("Algorithm,Start Time,End Time,Execution Time (s),Memory Used (MB),CPU Usage (%),"
-            "Read Bytes,Write Bytes,Total Signature Size (bytes),"
-            "Num Files,Total Size MB,Avg File Size MB,"
-            "CPU Count,Total RAM MB,Available RAM MB,System CPU %,System Memory %,"
-            "Avg Time Per File,Throughput MB/s,Temp-Before, Temp-After, DeltaTemp\n")
+    # "Memory Used (MB)" always means traced Python allocations; RSS goes in its own column
+    f.write(CSV_HEADER + (",Peak RSS Growth (MB)" if memory_measurement == "rss" else "") + "\n")
     
     # Get device info once
     device_info = get_device_info()
@@ -217,13 +248,20 @@ if __name__ == "__main__":
         start_time = time.perf_counter()
         start_date_time = datetime.datetime.now()
         line += f"{start_date_time},"
-        tracemalloc.start()
+        if memory_measurement == "tracemalloc":
+            tracemalloc.start()
+        else:
+            reset_peak_rss()
+            rss_before = read_rss_bytes()
         initial_io_info = current_process.io_counters()
         initial_cpu_times = current_process.cpu_times()
 
         # Perform signing
         #signature_size = signing(alg, files)
-        detailed_metrics = signing_with_detailed_metrics(alg, files)
+        if workers > 1:
+            detailed_metrics = parallel_signing_with_detailed_metrics(alg, files, signing_mode, workers)
+        else:
+            detailed_metrics = signing_with_detailed_metrics(alg, files, signing_mode)
 
         # End timer
         end_time = time.perf_counter()
@@ -239,10 +277,17 @@ if __name__ == "__main__":
         # Get CPU usage based on actual CPU time consumed
         cpu_time_used = (final_cpu_times.user - initial_cpu_times.user + 
                          final_cpu_times.system - initial_cpu_times.system)
+        # Worker processes from the parallel mode have exited by now and are counted as children
+        cpu_time_used += (final_cpu_times.children_user - initial_cpu_times.children_user +
+                          final_cpu_times.children_system - initial_cpu_times.children_system)
         cpu_usage = (cpu_time_used / elapsed_time) * 100 if elapsed_time > 0 else 0
 
         # Get peak memory usage from signing
-        current_mem, peak_mem = tracemalloc.get_traced_memory()
+        if memory_measurement == "tracemalloc":
+            current_mem, peak_mem = tracemalloc.get_traced_memory()
+        else:
+            # Worker processes from the parallel mode are not included
+            current_mem, peak_mem = rss_before, read_peak_rss_bytes()
         current_mem_mb = current_mem / (1024 * 1024)
         peak_mem_mb = peak_mem / (1024 * 1024)
 
@@ -269,7 +314,7 @@ if __name__ == "__main__":
         # Write to .csv file
         line += f"{end_date_time},"
         line += f"{elapsed_time},"
-        line += f"{peak_mem_mb - current_mem_mb},"
+        line += f"{peak_mem_mb - current_mem_mb if memory_measurement == 'tracemalloc' else 'N/A'},"
         line += f"{cpu_usage},"
         line += f"{read_bytes},"
         line += f"{write_bytes},"
@@ -287,8 +332,13 @@ if __name__ == "__main__":
         line += f"{temp_before if temp_before else 'N/A'},"
         line += f"{temp_after if temp_after else 'N/A'},"
         line += f"{temp_change if temp_before and temp_after else 'N/A'}"
+        if memory_measurement == "rss":
+            line += f",{peak_mem_mb - current_mem_mb}"
         line += "\n"
         f.write(line)
-        tracemalloc.stop()
+        if memory_measurement == "tracemalloc":
+            tracemalloc.stop()
         
-    f.close()
\ No newline at end of file
+    f.close()
+    metrics.export(metrics_prometheus_file and str(Path(__file__).parent / metrics_prometheus_file),
+                   metrics_jsonl_file and str(Path(__file__).parent / metrics_jsonl_file))
\ No newline at end of file
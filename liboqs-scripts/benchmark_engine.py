@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""Per-operation PQC benchmark: keygen, sign and verify are timed separately.
+
+Each operation gets warm-up runs followed by N timed repetitions and is
+reported as median/p95/stddev. Files are read (or hashed, in stream/mmap mode)
+once per file and timed on their own, so file I/O is kept out of the sign and
+verify numbers. CPU load is sampled without the 1 s psutil stall, and
+tracemalloc only runs in a separate, untimed pass that fills the
+"Memory Used (MB)" column.
+
+Results are appended to the CSV and flushed after every algorithm. With
+--resume, algorithms with a complete row in the CSV are skipped (a row cut
+short by a crash is dropped and rerun), so a crash late in the run does not
+mean starting over. Invalid signatures are logged as warnings. The CSV has the algorithms_test.py columns
+followed by the per-operation columns.
+"""
+import argparse
+import datetime
+import glob
+import logging
+import os
+from pathlib import Path
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import oqs
+import psutil
+
+# pqc_signing.py lives in the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from algorithms_test import (CSV_HEADER, SIGALGS, create_random_files, get_data_characteristics, get_device_info,
+                             get_rpi_model, get_temperature)
+from pqc_signing import SIGNING_MODES, read_message
+
+OPERATIONS = ("Keygen", "Sign", "Verify")
+EXTRA_COLUMNS = [f"{operation} {statistic} (s)" for operation in OPERATIONS for statistic in ("Median", "P95", "Std")]
+EXTRA_COLUMNS += ["Read Time (s)", "Signing Mode", "Warmup", "Repetitions"]
+DEFAULT_FILES = str(Path(__file__).parent / "*.bin")
+
+
+def summarize(samples):
+    """Median, 95th percentile and standard deviation of a list of timings"""
+    samples = np.asarray(samples, dtype=np.float64)
+    return float(np.median(samples)), float(np.percentile(samples, 95)), float(np.std(samples))
+
+
+def time_repeated(operation, warmup, repeats):
+    """Run operation warmup times untimed, then repeats times timed. Returns (timings, last result)"""
+    result = None
+    for _ in range(warmup):
+        result = operation()
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = operation()
+        timings.append(time.perf_counter() - start)
+    return timings, result
+
+
+def benchmark_algorithm(alg, files, mode="full", warmup=1, repeats=5):
+    """Time keygen, sign and verify for one algorithm over all files"""
+    with oqs.Signature(alg) as signer, oqs.Signature(alg) as verifier:
+        keygen_times, public_key = time_repeated(signer.generate_keypair, warmup, repeats)
+
+        sign_times, verify_times, read_times = [], [], []
+        per_file_times = []
+        total_signature_size = 0
+        for filename in files:
+            # File I/O (or hashing, in stream/mmap mode) is timed separately from the signature operations
+            start = time.perf_counter()
+            message = read_message(filename, mode)
+            read_times.append(time.perf_counter() - start)
+
+            # Bound as defaults, so the del below frees the buffer before the next file is read
+            file_sign_times, signature = time_repeated(lambda m=message: signer.sign(m), warmup, repeats)
+            file_verify_times, is_valid = time_repeated(lambda m=message: verifier.verify(m, signature, public_key), warmup, repeats)
+            if is_valid:
+                logging.debug(f"Valid {alg} signature ({Path(filename).name})")
+            else:
+                logging.warning(f"Invalid {alg} signature ({Path(filename).name})")
+
+            sign_times += file_sign_times
+            verify_times += file_verify_times
+            per_file_times.append(np.median(file_sign_times) + np.median(file_verify_times))
+            total_signature_size += len(signature)
+            del message
+
+    total_mb = sum(os.path.getsize(f) for f in files) / (1024 * 1024)
+    return {
+        'keygen': summarize(keygen_times),
+        'sign': summarize(sign_times),
+        'verify': summarize(verify_times),
+        'read_time': sum(read_times),
+        'total_signature_size': total_signature_size,
+        'avg_time_per_file': float(np.mean(per_file_times)),
+        'throughput_mb_per_sec': total_mb / sum(per_file_times) if sum(per_file_times) > 0 else 0
+    }
+
+
+def traced_peak_memory_mb(alg, files, mode="full"):
+    """Peak Python allocation of one sign/verify pass, measured outside the timed runs"""
+    tracemalloc.start()
+    try:
+        with oqs.Signature(alg) as signer, oqs.Signature(alg) as verifier:
+            public_key = signer.generate_keypair()
+            for filename in files:
+                message = read_message(filename, mode)
+                verifier.verify(message, signer.sign(message), public_key)
+                del message
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return (peak - current) / (1024 * 1024)
+
+
+def completed_algorithms(csv_path):
+    """Algorithms with a complete row in an existing benchmark CSV.
+
+    A row cut short by a crash (no newline, or fewer fields than the header) does
+    not count, and is truncated away so the resumed run does not append onto it.
+    """
+    if not os.path.exists(csv_path):
+        return set()
+    done = set()
+    with open(csv_path, 'rb+') as file:
+        header = file.readline()
+        columns = header.count(b',') + 1
+        complete = file.tell()
+        for line in file:
+            if not line.endswith(b"\n") or line.count(b',') + 1 != columns:
+                break
+            done.add(line.split(b',', 1)[0].decode())
+            complete += len(line)
+        if header.endswith(b"\n"):
+            file.truncate(complete)
+    return done
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--algorithms", nargs="+", default=SIGALGS)
+    parser.add_argument("--mode", choices=SIGNING_MODES, default="full")
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--files", default=DEFAULT_FILES, help="Glob of the files to sign; test files are only created for the default")
+    parser.add_argument("--output", default=None, help="Defaults to signing_benchmark_<model>_engine_<mode>.csv")
+    parser.add_argument("--resume", action="store_true", help="Skip algorithms already in the output CSV")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc pass")
+    args = parser.parse_args()
+
+    output_csv = args.output or str(Path(__file__).parent / f"signing_benchmark_{get_rpi_model()}_engine_{args.mode}.csv")
+    files = glob.glob(args.files)
+    if not files and args.files == DEFAULT_FILES:
+        # create_random_files writes next to the scripts, which is where the default glob looks
+        print(f"No files match {args.files}. Creating the test files...")
+        create_random_files("testfile", 5, 10, "bin")
+        files = glob.glob(args.files)
+    if not files:
+        parser.error(f"No files match {args.files}")
+
+    done = completed_algorithms(output_csv) if args.resume else set()
+    if done:
+        print(f"Resuming: {len(done)} algorithms already in {output_csv}")
+    f = open(output_csv, 'a' if done else 'w')
+    if not done:
+        f.write(CSV_HEADER + "," + ",".join(EXTRA_COLUMNS) + "\n")
+
+    device_info = get_device_info()
+    data_chars = get_data_characteristics(files)
+    current_process = psutil.Process(os.getpid())
+    # Prime the non-blocking CPU sampler instead of stalling 1 s per algorithm
+    psutil.cpu_percent(interval=None)
+
+    for idx, alg in enumerate(args.algorithms):
+        if alg in done:
+            continue
+        print(f"Algorithm ({idx}/{len(args.algorithms)}): {alg}\t|\t")
+        system_cpu_percent = psutil.cpu_percent(interval=None)
+        system_memory_percent = psutil.virtual_memory().percent
+        temp_before = get_temperature()
+
+        start_time = time.perf_counter()
+        start_date_time = datetime.datetime.now()
+        initial_io = current_process.io_counters()
+        initial_cpu_times = current_process.cpu_times()
+
+        metrics = benchmark_algorithm(alg, files, args.mode, args.warmup, args.repeats)
+
+        elapsed_time = time.perf_counter() - start_time
+        end_date_time = datetime.datetime.now()
+        final_io = current_process.io_counters()
+        final_cpu_times = current_process.cpu_times()
+        temp_after = get_temperature()
+        temp_change = (temp_after - temp_before) if (temp_before and temp_after) else 0
+
+        cpu_time_used = (final_cpu_times.user - initial_cpu_times.user +
+                         final_cpu_times.system - initial_cpu_times.system)
+        cpu_usage = (cpu_time_used / elapsed_time) * 100 if elapsed_time > 0 else 0
+        try:
+            read_bytes = final_io.read_chars - initial_io.read_chars
+            write_bytes = final_io.write_chars - initial_io.write_chars
+        except AttributeError:
+            read_bytes = final_io.read_bytes - initial_io.read_bytes
+            write_bytes = final_io.write_bytes - initial_io.write_bytes
+
+        memory_used = 'N/A' if args.no_memory else traced_peak_memory_mb(alg, files, args.mode)
+
+        print(f"Keygen/Sign/Verify median: {metrics['keygen'][0]:.6f}/{metrics['sign'][0]:.6f}/{metrics['verify'][0]:.6f} s, "
+              f"read {metrics['read_time']:.4f} s\n")
+
+        values = [alg, start_date_time, end_date_time, elapsed_time, memory_used, cpu_usage,
+                  read_bytes, write_bytes, metrics['total_signature_size'],
+                  data_chars['num_files'], data_chars['total_size_mb'], data_chars['avg_file_size_mb'],
+                  device_info['cpu_count'], device_info['total_ram_mb'], device_info['available_ram_mb'],
+                  system_cpu_percent, system_memory_percent,
+                  metrics['avg_time_per_file'], metrics['throughput_mb_per_sec'],
+                  temp_before if temp_before else 'N/A', temp_after if temp_after else 'N/A',
+                  temp_change if temp_before and temp_after else 'N/A']
+        values += list(metrics['keygen']) + list(metrics['sign']) + list(metrics['verify'])
+        values += [metrics['read_time'], args.mode, args.warmup, args.repeats]
+        f.write(",".join(str(value) for value in values) + "\n")
+
+        # Checkpoint: the row is on disk before the next algorithm starts
+        f.flush()
+        os.fsync(f.fileno())
+
+    f.close()
+
+
+if __name__ == "__main__":
+    main()
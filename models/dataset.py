@@ -0,0 +1,175 @@
+"""Shared, typed loader for dataset_expanded.csv used by the model notebooks.
+
+The first load parses the CSV in chunks with explicit dtypes and writes each
+column to a raw binary file in <csv>.cache/ (float64 for numeric columns,
+int32 codes for categorical ones). Later loads memory-map those files, so they
+cost milliseconds regardless of dataset size. The cache records the source
+file's size, mtime and SHA-256 and is rebuilt when the content changes.
+
+    from dataset import load_split
+    X_train, X_test, y_train, y_test = load_split()
+"""
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_DATASET = Path(__file__).resolve().parent.parent / "datasets" / "dataset_expanded.csv"
+NUMERIC_COLUMNS = ['Residual_Power', 'Max_Stack_Usage', 'Max_ROM', 'Min_Throughput']
+CATEGORICAL_COLUMNS = ['Application_Type', 'Min_Security_Level']
+TARGET_COLUMN = 'Algorithm'
+COLUMNS = ['Residual_Power', 'Application_Type', 'Min_Security_Level', 'Max_Stack_Usage', 'Max_ROM', 'Min_Throughput', 'Algorithm']
+# Like the notebooks, only categorical columns with fewer than this many values are one-hot encoded
+MAX_CARDINALITY = 10
+CACHE_VERSION = 1
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def cache_dir(path):
+    path = Path(path)
+    return path.with_name(path.name + ".cache")
+
+
+def _read_meta(directory):
+    try:
+        with open(directory / "meta.json") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def _cache_is_valid(path, meta):
+    """Compare size/mtime first and only hash the source when those changed"""
+    if meta is None or meta.get('version') != CACHE_VERSION:
+        return False
+    stat = os.stat(path)
+    if meta['size'] == stat.st_size and meta['mtime_ns'] == stat.st_mtime_ns:
+        return True
+    if meta['size'] != stat.st_size or meta['sha256'] != file_sha256(path):
+        return False
+    # Same content with a new mtime (e.g. a fresh checkout): refresh the cheap check
+    meta['mtime_ns'] = stat.st_mtime_ns
+    with open(cache_dir(path) / "meta.json", 'w') as file:
+        json.dump(meta, file)
+    return True
+
+
+def build_cache(path, chunk_rows=1_000_000):
+    """Convert the CSV to memory-mappable column files, streaming chunk by chunk"""
+    path = Path(path)
+    directory = cache_dir(path)
+    directory.mkdir(exist_ok=True)
+    stat = os.stat(path)
+
+    categorical = CATEGORICAL_COLUMNS + [TARGET_COLUMN]
+    categories = {column: {} for column in categorical}
+    files = {column: open(directory / f"{column}.bin.tmp", 'wb') for column in COLUMNS}
+    rows = 0
+    try:
+        dtypes = {column: np.float64 for column in NUMERIC_COLUMNS}
+        dtypes.update({column: str for column in categorical})
+        for chunk in pd.read_csv(path, dtype=dtypes, keep_default_na=False, chunksize=chunk_rows):
+            for column in NUMERIC_COLUMNS:
+                files[column].write(chunk[column].to_numpy(np.float64).tobytes())
+            for column in categorical:
+                # Codes follow first appearance so they stay stable across chunks
+                values, codes = np.unique(chunk[column].to_numpy(), return_inverse=True)
+                mapping = categories[column]
+                lookup = np.array([mapping.setdefault(value, len(mapping)) for value in values], dtype=np.int32)
+                files[column].write(lookup[codes].astype(np.int32).tobytes())
+            rows += len(chunk)
+    finally:
+        for file in files.values():
+            file.close()
+
+    for column in COLUMNS:
+        os.replace(directory / f"{column}.bin.tmp", directory / f"{column}.bin")
+    meta = {
+        'version': CACHE_VERSION,
+        'rows': rows,
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'sha256': file_sha256(path),
+        'categories': {column: list(mapping) for column, mapping in categories.items()}
+    }
+    # meta.json is written last, so a half-built cache is never treated as valid
+    with open(directory / "meta.json", 'w') as file:
+        json.dump(meta, file)
+    return meta
+
+
+def load_columns(path=DEFAULT_DATASET, rebuild=False):
+    """Return (columns, meta): memory-mapped numpy arrays per column plus cache metadata.
+    Categorical columns are int32 codes into meta['categories'][column].
+    """
+    path = Path(path)
+    directory = cache_dir(path)
+    meta = None if rebuild else _read_meta(directory)
+    if not _cache_is_valid(path, meta):
+        meta = build_cache(path)
+
+    columns = {}
+    for column in COLUMNS:
+        dtype = np.float64 if column in NUMERIC_COLUMNS else np.int32
+        if meta['rows'] == 0:
+            columns[column] = np.empty(0, dtype=dtype)
+        else:
+            columns[column] = np.memmap(directory / f"{column}.bin", dtype=dtype, mode='r', shape=(meta['rows'],))
+    return columns, meta
+
+
+def load_dataset(path=DEFAULT_DATASET, rebuild=False):
+    """Load the dataset as a DataFrame with float64 and categorical columns"""
+    columns, meta = load_columns(path, rebuild)
+    data = {}
+    for column in COLUMNS:
+        if column in NUMERIC_COLUMNS:
+            data[column] = columns[column]
+        else:
+            data[column] = pd.Categorical.from_codes(columns[column], meta['categories'][column])
+    return pd.DataFrame(data, columns=COLUMNS)
+
+
+def low_cardinality_columns(meta, max_cardinality=MAX_CARDINALITY):
+    """Categorical feature columns that get one-hot encoded; the rest are dropped"""
+    return [column for column in CATEGORICAL_COLUMNS if len(meta['categories'][column]) < max_cardinality]
+
+
+def feature_names(meta, max_cardinality=MAX_CARDINALITY):
+    """Feature column names, in the same order pd.get_dummies produces in the notebooks"""
+    names = list(NUMERIC_COLUMNS)
+    for column in low_cardinality_columns(meta, max_cardinality):
+        names += [f"{column}_{value}" for value in sorted(meta['categories'][column])]
+    return names
+
+
+def encode_features(df, meta, max_cardinality=MAX_CARDINALITY):
+    """Numeric columns plus one-hot categorical columns, with a fixed column set for any subset of rows"""
+    encoded = {column: df[column].to_numpy(np.float64) for column in NUMERIC_COLUMNS}
+    for column in low_cardinality_columns(meta, max_cardinality):
+        values = meta['categories'][column]
+        codes = pd.Categorical(df[column], categories=values).codes
+        for value in sorted(values):
+            encoded[f"{column}_{value}"] = codes == values.index(value)
+    return pd.DataFrame(encoded, columns=feature_names(meta, max_cardinality), index=df.index)
+
+
+def load_split(path=DEFAULT_DATASET, test_size=0.3, random_state=1):
+    """X_train, X_test, y_train, y_test as built in the notebooks, with consistent one-hot columns"""
+    from sklearn.model_selection import train_test_split
+
+    columns, meta = load_columns(path)
+    df = load_dataset(path)
+    X = encode_features(df, meta)
+    y = np.asarray(meta['categories'][TARGET_COLUMN], dtype=object)[columns[TARGET_COLUMN]]
+    return train_test_split(X, y, test_size=test_size, random_state=random_state)
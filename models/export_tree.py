@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""Export a trained DecisionTreeClassifier to the sklearn-free compiled_tree format.
+
+    python export_tree.py dtc.joblib dtc.npz --verify --benchmark
+
+--verify compares compiled predictions with sklearn's on the test split and
+exits non-zero on any difference. --benchmark compares, in fresh interpreters,
+the import + load time and peak RSS of joblib/sklearn against compiled_tree,
+and the single-sample and batched predict latency.
+"""
+import argparse
+import os
+from pathlib import Path
+import statistics
+import subprocess
+import sys
+import time
+
+import joblib
+import numpy as np
+
+# compiled_tree.py lives in the repository root, next to the manager's other runtime modules
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+from compiled_tree import CompiledTree
+
+LOAD_CODE = """
+import time
+start = time.perf_counter()
+{load}
+elapsed = time.perf_counter() - start
+from runtime_metrics import read_peak_rss_bytes
+print(elapsed, read_peak_rss_bytes())
+"""
+LOADERS = {
+    'joblib': "import joblib; model = joblib.load({path!r})",
+    'compiled': "from compiled_tree import CompiledTree; model = CompiledTree.load({path!r})"
+}
+
+
+def export_tree(model, path):
+    """Compile model and write it to path atomically"""
+    compiled = CompiledTree.from_sklearn(model)
+    temporary = f"{path}.tmp"
+    compiled.save(temporary)
+    os.replace(temporary, path)
+    return compiled
+
+
+def test_features(model):
+    """Test split DataFrame in the column order the model was fitted with"""
+    from dataset import load_split
+
+    _, X_test, _, _ = load_split()
+    if hasattr(model, 'feature_names_in_'):
+        X_test = X_test[list(model.feature_names_in_)]
+    return X_test
+
+
+def verify(model, compiled, X):
+    expected = model.predict(X)
+    batched = compiled.predict(X)
+    single = np.array([compiled.predict_one(row) for row in X.to_numpy()[:10_000]], dtype=batched.dtype)
+    mismatches = int(np.sum(expected != batched)) + int(np.sum(expected[:len(single)] != single))
+    print(f"Verified {len(X)} rows batched and {len(single)} single: {mismatches} mismatches")
+    return mismatches == 0
+
+
+def measure_load(kind, path, repeats):
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [str(ROOT), env.get('PYTHONPATH')]))
+    code = LOAD_CODE.format(load=LOADERS[kind].format(path=str(Path(path).resolve())))
+    runs = [subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True).stdout.split()
+            for _ in range(repeats)]
+    return statistics.median(float(run[0]) for run in runs), max(int(run[1]) for run in runs) / (1024 * 1024)
+
+
+def time_call(function, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        function()
+    return (time.perf_counter() - start) / repeats
+
+
+def benchmark(model_path, compiled_path, model, compiled, X, repeats=5):
+    for kind, path in (('joblib', model_path), ('compiled', compiled_path)):
+        seconds, peak_rss_mb = measure_load(kind, path, repeats)
+        print(f"{kind:>8}: import + load {seconds * 1000:.1f} ms, peak RSS {peak_rss_mb:.1f} MB, "
+              f"file {os.path.getsize(path) / 1024:.1f} KB")
+    row = X.iloc[:1]
+    values = row.to_numpy()[0].tolist()
+    print(f"single predict: sklearn {time_call(lambda: model.predict(row), 200) * 1e6:.1f} us, "
+          f"compiled {time_call(lambda: compiled.predict_one(values), 2000) * 1e6:.2f} us")
+    print(f"batched predict ({len(X)} rows): sklearn {time_call(lambda: model.predict(X), 3) * 1000:.1f} ms, "
+          f"compiled {time_call(lambda: compiled.predict(X), 3) * 1000:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("model", nargs="?", default="dtc.joblib")
+    parser.add_argument("output", nargs="?", default=None, help="Defaults to the model path with a .npz suffix")
+    parser.add_argument("--verify", action="store_true", help="Check predictions against sklearn on the test split")
+    parser.add_argument("--benchmark", action="store_true")
+    args = parser.parse_args()
+
+    output = args.output or str(Path(args.model).with_suffix(".npz"))
+    model = joblib.load(args.model)
+    compiled = export_tree(model, output)
+    print(f"Exported {len(compiled.left)} nodes, depth {compiled.max_depth}, {len(compiled.classes_)} classes "
+          f"to {output} ({compiled.nbytes() / 1024:.1f} KB of arrays)")
+
+    ok = True
+    if args.verify or args.benchmark:
+        X = test_features(model)
+        if args.verify:
+            ok = verify(model, compiled, X)
+        if args.benchmark:
+            benchmark(args.model, output, model, compiled, X)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
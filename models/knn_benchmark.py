@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""Compare the notebook KNN with condensed, indexed CondensedKNN models and export the smallest acceptable one.
+
+    python knn_benchmark.py --tolerance 0.02 --export knn.knn.npz
+
+References are sklearn KNeighborsClassifier(n_neighbors=18, weights='distance')
+on the raw features (as in nearest_neighbors.ipynb) and on standardized
+features. Every CondensedKNN in the cell x k sweep is fitted on the training
+split minus a validation part; the smallest model whose validation accuracy is
+within --tolerance of the scaled reference is refitted on the whole training
+split and reported on the test split. Exits non-zero when no model qualifies.
+"""
+import argparse
+import io
+import os
+from pathlib import Path
+import sys
+import tempfile
+import time
+
+import joblib
+import numpy as np
+from sklearn.model_selection import train_test_split
+from sklearn.neighbors import KNeighborsClassifier
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+
+from dataset import load_split
+
+# condensed_knn.py lives in the repository root, next to the manager's other runtime modules
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+from condensed_knn import CondensedKNN
+
+# 0.05 is below the jitter, so it merges almost no rows and leaves the condensing to Hart alone;
+# from 0.2 up, larger cells trade accuracy for fewer prototypes
+CELLS = [0.05, 0.1, 0.2, 0.3, 0.4, 0.5]
+NEIGHBOURS = [1, 3, 5]
+
+
+def serialized_size(model):
+    """Bytes of the file each model is deployed as: .npz for CondensedKNN, joblib otherwise"""
+    if isinstance(model, CondensedKNN):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "model.npz")
+            model.save(path)
+            return os.path.getsize(path)
+    buffer = io.BytesIO()
+    joblib.dump(model, buffer)
+    return buffer.tell()
+
+
+def time_call(function, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        function()
+    return (time.perf_counter() - start) / repeats
+
+
+def measure(name, model, X, y, rows):
+    """Accuracy, serialized size and single/batched latency of a fitted model"""
+    start = time.perf_counter()
+    accuracy = float(np.mean(model.predict(X) == np.asarray(y)))
+    batch = time.perf_counter() - start
+    if isinstance(model, CondensedKNN):
+        values = X.to_numpy()[0].tolist()
+        single = time_call(lambda: model.predict_one(values), rows)
+    else:
+        row = X.iloc[:1]
+        single = time_call(lambda: model.predict(row), max(rows // 10, 1))
+    prototypes = model.n_prototypes if isinstance(model, CondensedKNN) else model[-1].n_samples_fit_
+    print(f"{name:<28} {prototypes:>7} {serialized_size(model) / 1024:>10.1f} {single * 1e6:>10.1f} "
+          f"{batch * 1000:>9.1f} {accuracy:>8.4f}")
+    return accuracy
+
+
+def header():
+    print(f"{'model':<28} {'points':>7} {'size KB':>10} {'single us':>10} {'batch ms':>9} {'accuracy':>8}")
+
+
+def references(X, y):
+    return {'notebook KNN (unscaled)': make_pipeline(KNeighborsClassifier(n_neighbors=18, weights='distance')).fit(X, y),
+            'scaled KNN': make_pipeline(StandardScaler(), KNeighborsClassifier(n_neighbors=18, weights='distance')).fit(X, y)}
+
+
+def select(X_train, y_train, tolerance, validation_size, rows):
+    """Sweep on a validation split; returns the chosen (cell, k) or None"""
+    X_fit, X_val, y_fit, y_val = train_test_split(X_train, y_train, test_size=validation_size, random_state=1,
+                                                  stratify=y_train)
+    print(f"Validation ({len(X_fit)} fit / {len(X_val)} validation rows)")
+    header()
+    target = 0.0
+    for name, model in references(X_fit, y_fit).items():
+        accuracy = measure(name, model, X_val, y_val, rows)
+        if name == 'scaled KNN':
+            target = accuracy - tolerance
+
+    best = None
+    for cell in CELLS:
+        model = CondensedKNN.fit(X_fit, y_fit, cell=cell)
+        for k in NEIGHBOURS:
+            model.k = k
+            accuracy = measure(f"condensed cell={cell} k={k}", model, X_val, y_val, rows)
+            size = (serialized_size(model), model.n_prototypes)
+            if accuracy >= target and (best is None or size < best[0]):
+                best = (size, cell, k)
+    if best is None:
+        print(f"No condensed model reaches {target:.4f} (scaled KNN - {tolerance})")
+        return None
+    print(f"Selected cell={best[1]} k={best[2]}: smallest model within {tolerance} of scaled KNN ({target:.4f})")
+    return best[1], best[2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tolerance", type=float, default=0.02, help="Allowed accuracy drop against scaled KNN")
+    parser.add_argument("--validation-size", type=float, default=0.2)
+    parser.add_argument("--rows", type=int, default=1000, help="Repeats for the single-sample latency")
+    parser.add_argument("--export", help="Write the selected model, refitted on the whole training split, here")
+    args = parser.parse_args()
+
+    X_train, X_test, y_train, y_test = load_split()
+    chosen = select(X_train, y_train, args.tolerance, args.validation_size, args.rows)
+    if chosen is None:
+        sys.exit(1)
+
+    cell, k = chosen
+    print(f"\nTest ({len(X_train)} training / {len(X_test)} test rows)")
+    header()
+    for name, model in references(X_train, y_train).items():
+        measure(name, model, X_test, y_test, args.rows)
+    model = CondensedKNN.fit(X_train, y_train, k=k, cell=cell)
+    measure(f"condensed cell={cell} k={k}", model, X_test, y_test, args.rows)
+
+    if args.export:
+        temporary = f"{args.export}.tmp"
+        model.save(temporary)
+        os.replace(temporary, args.export)
+        print(f"Exported {model.n_prototypes} prototypes to {args.export}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""Cross-validated hyperparameter search over the DTC, KNN and Naive Bayes models.
+
+Every (candidate, fold) pair is evaluated in parallel across cores and the
+result is appended to a cache file keyed by the dataset hash, model and
+parameters, so a re-run only evaluates configurations it has not seen. Each
+candidate is then refit on the full training split and measured for what it
+costs on the device: single-sample predict latency, serialized size and load
+time. The chosen model can be exported for AutonomicManager.plan.
+"""
+import argparse
+import hashlib
+import io
+import json
+import os
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn import metrics
+from sklearn.model_selection import StratifiedKFold
+from sklearn.naive_bayes import CategoricalNB, GaussianNB
+from sklearn.neighbors import KNeighborsClassifier
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import KBinsDiscretizer
+from sklearn.tree import DecisionTreeClassifier
+
+from dataset import DEFAULT_DATASET, load_columns, load_split
+
+
+def binned_categorical_nb(alpha=1.0, n_bins=10):
+    """CategoricalNB over equal-width bins of each feature.
+
+    CategoricalNB expects small non-negative integer categories, and raises
+    IndexError when a test value was never seen in training. The features are
+    continuous, so they are discretized first; out-of-range values fall into the
+    edge bins and min_categories fixes the category count at n_bins.
+    """
+    return make_pipeline(KBinsDiscretizer(n_bins=n_bins, encode='ordinal', strategy='uniform'),
+                         CategoricalNB(alpha=alpha, min_categories=n_bins))
+
+
+MODELS = {
+    'DecisionTreeClassifier': DecisionTreeClassifier,
+    'KNeighborsClassifier': KNeighborsClassifier,
+    'GaussianNB': GaussianNB,
+    'CategoricalNB': binned_categorical_nb
+}
+
+
+def candidates():
+    """Parameter grid for each model family"""
+    grid = []
+    for criterion in ['gini', 'entropy']:
+        for max_depth in [None, 4, 8, 12, 16]:
+            for min_samples_leaf in [1, 5, 20]:
+                grid.append(('DecisionTreeClassifier', {'criterion': criterion, 'max_depth': max_depth,
+                                                        'min_samples_leaf': min_samples_leaf, 'random_state': 1}))
+    for n_neighbors in [1, 3, 5, 10, 18, 30]:
+        for weights in ['uniform', 'distance']:
+            grid.append(('KNeighborsClassifier', {'n_neighbors': n_neighbors, 'weights': weights}))
+    for var_smoothing in [1e-9, 1e-6, 1e-3]:
+        grid.append(('GaussianNB', {'var_smoothing': var_smoothing}))
+    for alpha in [0.1, 1.0]:
+        for n_bins in [5, 10, 20]:
+            grid.append(('CategoricalNB', {'alpha': alpha, 'n_bins': n_bins}))
+    return grid
+
+
+def candidate_key(dataset_hash, model_name, params, fold, n_folds, seed):
+    """Cache key for one fold of one configuration"""
+    blob = json.dumps([dataset_hash, model_name, params, fold, n_folds, seed], sort_keys=True)
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+
+def load_cache(filename):
+    cache = {}
+    if os.path.exists(filename):
+        with open(filename) as file:
+            for line in file:
+                try:
+                    entry = json.loads(line)
+                    cache[entry['key']] = entry
+                except ValueError:
+                    pass  # partial line from an interrupted run
+    return cache
+
+
+def evaluate_fold(model_name, params, X, y, train_index, test_index):
+    """Fit and score one configuration on one fold"""
+    model = MODELS[model_name](**params)
+    model.fit(X[train_index], y[train_index])
+    y_predict = model.predict(X[test_index])
+    return {
+        'accuracy': metrics.accuracy_score(y[test_index], y_predict),
+        'f1': metrics.f1_score(y[test_index], y_predict, average='weighted')
+    }
+
+
+def measure_deployment(model, X_sample, repeats=200):
+    """Single-sample predict latency, serialized size and load time"""
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        model.predict(X_sample)
+        latencies.append(time.perf_counter() - start)
+
+    buffer = io.BytesIO()
+    joblib.dump(model, buffer)
+    size = buffer.tell()
+    load_times = []
+    for _ in range(5):
+        buffer.seek(0)
+        start = time.perf_counter()
+        joblib.load(buffer)
+        load_times.append(time.perf_counter() - start)
+    return {
+        'predict_latency_ms': float(np.median(latencies) * 1000),
+        'predict_latency_p95_ms': float(np.percentile(latencies, 95) * 1000),
+        'model_size_kb': size / 1024,
+        'load_time_ms': float(np.median(load_times) * 1000)
+    }
+
+
+def search(dataset=DEFAULT_DATASET, n_folds=5, seed=1, n_jobs=-1, cache_file="model_search_cache.jsonl"):
+    """Run the search and return a DataFrame with one row per configuration"""
+    X_train, X_test, y_train, y_test = load_split(dataset)
+    dataset_hash = load_columns(dataset)[1]['sha256']
+    X = X_train.to_numpy(np.float64)
+    y = np.asarray(y_train)
+
+    folds = list(StratifiedKFold(n_splits=n_folds, shuffle=True, random_state=seed).split(X, y))
+    cache = load_cache(cache_file)
+    grid = candidates()
+
+    pending = []
+    for model_name, params in grid:
+        for fold, (train_index, test_index) in enumerate(folds):
+            key = candidate_key(dataset_hash, model_name, params, fold, n_folds, seed)
+            if key not in cache:
+                pending.append((key, model_name, params, train_index, test_index))
+    print(f"{len(grid)} configurations x {n_folds} folds: {len(pending)} to evaluate, "
+          f"{len(grid) * n_folds - len(pending)} cached")
+
+    results = joblib.Parallel(n_jobs=n_jobs)(
+        joblib.delayed(evaluate_fold)(model_name, params, X, y, train_index, test_index)
+        for _, model_name, params, train_index, test_index in pending)
+    with open(cache_file, 'a') as file:
+        for (key, model_name, params, _, _), result in zip(pending, results):
+            entry = dict(result, key=key, model=model_name, params=params)
+            cache[key] = entry
+            file.write(json.dumps(entry) + "\n")
+
+    rows = []
+    X_sample = X_test.iloc[[0]]
+    for model_name, params in grid:
+        scores = [cache[candidate_key(dataset_hash, model_name, params, fold, n_folds, seed)] for fold in range(n_folds)]
+        model = MODELS[model_name](**params).fit(X_train, y_train)
+        y_predict = model.predict(X_test)
+        rows.append(dict({
+            'model': model_name,
+            'params': json.dumps(params, sort_keys=True),
+            'cv_accuracy': np.mean([score['accuracy'] for score in scores]),
+            'cv_accuracy_std': np.std([score['accuracy'] for score in scores]),
+            'cv_f1': np.mean([score['f1'] for score in scores]),
+            'test_accuracy': metrics.accuracy_score(y_test, y_predict),
+            'test_f1': metrics.f1_score(y_test, y_predict, average='weighted')
+        }, **measure_deployment(model, X_sample)))
+    return pd.DataFrame(rows)
+
+
+def select(report, max_latency_ms=None, max_size_kb=None, tolerance=0.005):
+    """Most accurate configuration within the edge budget. Among those within tolerance
+    of the best cross-validated accuracy, prefer the cheapest to run.
+    """
+    eligible = report
+    if max_latency_ms is not None:
+        eligible = eligible[eligible['predict_latency_ms'] <= max_latency_ms]
+    if max_size_kb is not None:
+        eligible = eligible[eligible['model_size_kb'] <= max_size_kb]
+    if eligible.empty:
+        return None
+    close = eligible[eligible['cv_accuracy'] >= eligible['cv_accuracy'].max() - tolerance]
+    return close.sort_values(['predict_latency_ms', 'model_size_kb']).iloc[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dataset", default=str(DEFAULT_DATASET))
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--jobs", type=int, default=-1, help="Parallel workers, -1 for all cores")
+    parser.add_argument("--cache", default="model_search_cache.jsonl")
+    parser.add_argument("--report", default="model_search_report.csv")
+    parser.add_argument("--max-latency-ms", type=float, default=None)
+    parser.add_argument("--max-size-kb", type=float, default=None)
+    parser.add_argument("--tolerance", type=float, default=0.005, help="Accuracy given up for a cheaper model")
+    parser.add_argument("--export", default=None, help="Write the selected model here, e.g. dtc.joblib")
+    args = parser.parse_args()
+
+    report = search(args.dataset, args.folds, args.seed, args.jobs, args.cache)
+    report.to_csv(args.report, index=False)
+    print(report.sort_values('cv_accuracy', ascending=False).head(15).to_string(index=False))
+
+    chosen = select(report, args.max_latency_ms, args.max_size_kb, args.tolerance)
+    if chosen is None:
+        print("No configuration fits the latency/size budget")
+        return
+    print(f"\nSelected {chosen['model']} {chosen['params']}: cv accuracy {chosen['cv_accuracy']:.4f}, "
+          f"{chosen['predict_latency_ms']:.3f} ms/predict, {chosen['model_size_kb']:.1f} KB")
+    if args.export:
+        X_train, _, y_train, _ = load_split(args.dataset)
+        model = MODELS[chosen['model']](**json.loads(chosen['params'])).fit(X_train, y_train)
+        joblib.dump(model, args.export)
+        print(f"Exported to {args.export}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""Incremental training from new dataset rows, with versioned, atomically published models.
+
+New rows (CSV files with the dataset_expanded.csv columns, e.g. appended from
+benchmark runs or field telemetry) update the models without revisiting the
+full history:
+    GaussianNB             - partial_fit on the new rows only
+    DecisionTreeClassifier - refit on a bounded training set: the most recent
+                             window_rows rows plus a uniform reservoir sample of
+                             everything seen before, so older regimes are not forgotten
+
+An update therefore costs O(new rows + window + reservoir), however long the
+history grows. Each update writes <name>-vNNNN.joblib and then atomically
+replaces <name>.joblib, plus dtc.npz for the sklearn-free compiled_tree
+evaluator. AutonomicManager's model cache reloads either file on its next
+plan. The first run bootstraps from the full dataset in chunks through the
+same path.
+
+The naive Bayes model is GaussianNB, not the CategoricalNB of naive_bayes.ipynb.
+CategoricalNB needs integer categories, so its features would have to be binned,
+and bin edges fitted on the bootstrap rows would have to stay fixed for every
+later partial_fit, even after the data drifts. GaussianNB updates its
+per-class means and variances directly from the continuous features.
+
+    python train_incremental.py --bootstrap
+    python train_incremental.py new_rows.csv
+"""
+import argparse
+import json
+import os
+from pathlib import Path
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn import metrics
+from sklearn.naive_bayes import GaussianNB
+from sklearn.tree import DecisionTreeClassifier
+
+from dataset import (CATEGORICAL_COLUMNS, COLUMNS, DEFAULT_DATASET, NUMERIC_COLUMNS, TARGET_COLUMN, encode_features,
+                     feature_names, load_dataset, load_columns)
+from export_tree import export_tree
+
+DEFAULT_STATE_DIR = Path(__file__).resolve().parent / "artifacts"
+STATE_FILE = "training_state.joblib"
+
+
+def atomic_dump(obj, path):
+    """Write to a temporary file and rename it over path, so readers never see a partial file"""
+    path = Path(path)
+    temporary = path.with_name(path.name + ".tmp")
+    joblib.dump(obj, temporary)
+    os.replace(temporary, path)
+
+
+class IncrementalTrainer:
+
+    def __init__(self, meta, window_rows=200_000, reservoir_rows=200_000, tree_params=None, seed=1):
+        # Category lists are frozen at bootstrap so the one-hot columns never change between updates
+        self.meta = {'categories': meta['categories']}
+        self.classes = np.asarray(sorted(meta['categories'][TARGET_COLUMN]), dtype=object)
+        self.window_rows = window_rows
+        self.reservoir_rows = reservoir_rows
+        self.tree_params = tree_params or {'random_state': 1}
+        self.rng = np.random.default_rng(seed)
+        self.features = feature_names(self.meta)
+
+        self.nb = GaussianNB()
+        self.tree = None
+        self.version = 0
+        self.rows_seen = 0
+        n_features = len(self.features)
+        self.window_X = np.empty((0, n_features))
+        self.window_y = np.empty(0, dtype=object)
+        self.reservoir_X = np.empty((0, n_features))
+        self.reservoir_y = np.empty(0, dtype=object)
+        self.history = []
+
+    def _encode(self, df):
+        X = encode_features(df, self.meta).to_numpy(np.float64)
+        y = df[TARGET_COLUMN].astype(str).to_numpy(dtype=object)
+        return X, y
+
+    def _sample_into_reservoir(self, X, y):
+        """Algorithm R over a whole batch: row i of the stream is kept with probability reservoir_rows / (i + 1)"""
+        positions = self.rows_seen + np.arange(len(X))
+        fill = max(min(self.reservoir_rows - len(self.reservoir_X), len(X)), 0)
+        self.reservoir_X = np.concatenate((self.reservoir_X, X[:fill]))
+        self.reservoir_y = np.concatenate((self.reservoir_y, y[:fill]))
+        if fill == len(X):
+            return
+        slots = (self.rng.random(len(X) - fill) * (positions[fill:] + 1)).astype(np.int64)
+        keep = slots < self.reservoir_rows
+        # Later rows overwrite earlier ones in the same slot, as in the sequential algorithm
+        self.reservoir_X[slots[keep]] = X[fill:][keep]
+        self.reservoir_y[slots[keep]] = y[fill:][keep]
+
+    def _slide_window(self, X, y):
+        self.window_X = np.concatenate((self.window_X, X))[-self.window_rows:]
+        self.window_y = np.concatenate((self.window_y, y))[-self.window_rows:]
+
+    def update(self, df, refit_tree=True):
+        """Learn from new rows. Returns prequential scores: how the previous models did on these rows."""
+        X, y = self._encode(df)
+        unknown = set(np.unique(y)) - set(self.classes)
+        if unknown:
+            raise ValueError(f"New algorithms {sorted(unknown)} are not in the bootstrap classes; rerun with --bootstrap")
+
+        scores = {'rows': len(X)}
+        if self.tree is not None:
+            scores['tree_accuracy'] = metrics.accuracy_score(y, self.tree.predict(X))
+        if hasattr(self.nb, 'classes_'):
+            scores['nb_accuracy'] = metrics.accuracy_score(y, self.nb.predict(X))
+
+        self.nb.partial_fit(X, y, classes=self.classes)
+        # Rows enter the reservoir as they leave the window
+        leaving = max(len(self.window_X) + len(X) - self.window_rows, 0)
+        if leaving:
+            stream_X = np.concatenate((self.window_X, X))[:leaving]
+            stream_y = np.concatenate((self.window_y, y))[:leaving]
+            self._sample_into_reservoir(stream_X, stream_y)
+            self.rows_seen += leaving
+        self._slide_window(X, y)
+        if refit_tree:
+            self.refit_tree()
+        return scores
+
+    def refit_tree(self):
+        X = np.concatenate((self.window_X, self.reservoir_X))
+        y = np.concatenate((self.window_y, self.reservoir_y))
+        self.tree = DecisionTreeClassifier(**self.tree_params).fit(X, y)
+
+    def publish(self, model_dir, keep_versions=5):
+        """Write versioned artifacts and atomically swap the live dtc.joblib and gnb.joblib"""
+        self.version += 1
+        model_dir = Path(model_dir)
+        model_dir.mkdir(parents=True, exist_ok=True)
+        for name, model in (('dtc', self.tree), ('gnb', self.nb)):
+            atomic_dump(model, model_dir / f"{name}-v{self.version:04d}.joblib")
+            atomic_dump(model, model_dir / f"{name}.joblib")
+            for old in sorted(model_dir.glob(f"{name}-v*.joblib"))[:-keep_versions]:
+                old.unlink()
+        # sklearn-free copy of the tree for devices (compiled_tree.py)
+        export_tree(self.tree, model_dir / "dtc.npz")
+        manifest = {'version': self.version, 'features': self.features, 'classes': list(self.classes),
+                    'training_rows': len(self.window_X) + len(self.reservoir_X), 'history': self.history[-20:]}
+        with open(model_dir / "manifest.json.tmp", 'w') as file:
+            json.dump(manifest, file, indent=1)
+        os.replace(model_dir / "manifest.json.tmp", model_dir / "manifest.json")
+
+    def save(self, state_dir):
+        atomic_dump(self, Path(state_dir) / STATE_FILE)
+
+    @staticmethod
+    def load(state_dir):
+        return joblib.load(Path(state_dir) / STATE_FILE)
+
+
+def read_rows(filename):
+    """New rows in the dataset_expanded.csv layout"""
+    dtypes = {column: np.float64 for column in NUMERIC_COLUMNS}
+    dtypes.update({column: str for column in CATEGORICAL_COLUMNS + [TARGET_COLUMN]})
+    return pd.read_csv(filename, usecols=COLUMNS, dtype=dtypes, keep_default_na=False)
+
+
+def bootstrap(dataset, state_dir, chunk_rows=500_000, **options):
+    """Initial state from the full dataset, streamed through the incremental path"""
+    _, meta = load_columns(dataset)
+    trainer = IncrementalTrainer(meta, **options)
+    df = load_dataset(dataset)
+    # Shuffle once so the window and reservoir are not biased by the dataset's row order
+    order = trainer.rng.permutation(len(df))
+    for start in range(0, len(df), chunk_rows):
+        trainer.update(df.iloc[order[start:start + chunk_rows]], refit_tree=False)
+    trainer.refit_tree()
+    return trainer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("rows", nargs="*", help="CSV files of new rows")
+    parser.add_argument("--bootstrap", action="store_true", help="Start over from --dataset")
+    parser.add_argument("--dataset", default=str(DEFAULT_DATASET))
+    parser.add_argument("--state-dir", default=str(DEFAULT_STATE_DIR))
+    parser.add_argument("--model-dir", default=None, help="Where dtc.joblib/gnb.joblib are published, defaults to --state-dir")
+    parser.add_argument("--window-rows", type=int, default=200_000)
+    parser.add_argument("--reservoir-rows", type=int, default=200_000)
+    parser.add_argument("--keep-versions", type=int, default=5)
+    args = parser.parse_args()
+
+    Path(args.state_dir).mkdir(parents=True, exist_ok=True)
+    start = time.perf_counter()
+    if args.bootstrap:
+        trainer = bootstrap(args.dataset, args.state_dir, window_rows=args.window_rows, reservoir_rows=args.reservoir_rows)
+        print(f"Bootstrapped from {args.dataset} in {time.perf_counter() - start:.2f} s")
+    else:
+        trainer = IncrementalTrainer.load(args.state_dir)
+
+    for filename in args.rows:
+        update_start = time.perf_counter()
+        scores = trainer.update(read_rows(filename))
+        scores.update(file=str(filename), seconds=time.perf_counter() - update_start)
+        trainer.history.append(scores)
+        print(f"{filename}: {scores['rows']} rows in {scores['seconds']:.2f} s, accuracy before update "
+              f"tree {scores.get('tree_accuracy', float('nan')):.4f}, NB {scores.get('nb_accuracy', float('nan')):.4f}")
+
+    if args.bootstrap or args.rows:
+        trainer.publish(args.model_dir or args.state_dir, args.keep_versions)
+        trainer.save(args.state_dir)
+        print(f"Published version {trainer.version} to {args.model_dir or args.state_dir}")
+
+
+if __name__ == "__main__":
+    main()
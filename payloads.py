@@ -0,0 +1,151 @@
+"""Synthetic signing workloads without writing gigabytes of os.urandom to disk.
+
+One pool of pseudo-random bytes is filled from a seeded numpy generator on the
+first generate(), so constructing a generator costs nothing. Each payload is a
+size-byte memoryview slice of that pool at a seeded offset within the first
+spread bytes (size / 16 by default), so a new iteration costs no allocation or
+copying. Payload modes:
+    "memory" - payloads are memoryviews and never touch a file
+    "tmpfs"  - payloads are written to /dev/shm (RAM-backed) for code that needs file paths,
+               e.g. parallel signing or the "mmap" signing mode
+    "disk"   - payloads are written next to the caller, as create_random_files did
+
+With distinct=N, offsets are drawn from a fixed set of N seeded offsets, so
+payloads repeat across iterations like unchanged data would (which is what
+lets a signature store hit). By default every payload gets a fresh offset.
+
+Every iteration is recorded as a manifest (iteration, seed, offset and size of
+each payload), so the exact payload set can be regenerated from the seed. File
+modes delete the previous iteration's files, so no stale payloads are picked up.
+"""
+from collections import deque
+import json
+import os
+from pathlib import Path
+import tempfile
+
+PAYLOAD_MODES = ("memory", "tmpfs", "disk")
+DEFAULT_PAYLOAD_MODE = "memory"
+FILL_CHUNK_SIZE = 16 * 1024 * 1024
+# Default spread of payload offsets as a fraction of the payload size
+DEFAULT_SPREAD = 1 / 16
+
+
+def tmpfs_directory():
+    """A RAM-backed directory when one exists, otherwise the temp directory"""
+    return "/dev/shm" if os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK) else tempfile.gettempdir()
+
+
+class Payload:
+    """One payload: a read-only view of the pool and, in file modes, the file holding the same bytes"""
+
+    def __init__(self, name, view, offset, path=None):
+        self.name = name
+        self.view = view
+        self.offset = offset
+        self.size = len(view)
+        self.path = path
+
+    @property
+    def source(self):
+        """What read_message takes: the file path when there is one, otherwise the buffer"""
+        return self.path if self.path else self.view
+
+
+class PayloadGenerator:
+
+    def __init__(self, size_mb=100, mode=DEFAULT_PAYLOAD_MODE, seed=None, directory=None, spread_mb=None,
+                 history=100, manifest_file=None, distinct=None):
+        if mode not in PAYLOAD_MODES:
+            raise ValueError(f"Unknown payload mode '{mode}', expected one of {PAYLOAD_MODES}")
+        self.mode = mode
+        self.size = int(size_mb * 1024 * 1024)
+        # Payloads start anywhere in the first spread bytes, so the pool holds size + spread bytes
+        self.spread = int(self.size * DEFAULT_SPREAD) if spread_mb is None else int(spread_mb * 1024 * 1024)
+        # Without a seed, draw one and keep it so every manifest can still be reproduced
+        self.seed = seed if seed is not None else int.from_bytes(os.urandom(8), 'big') >> 1
+        if directory is None:
+            directory = tmpfs_directory() if mode == "tmpfs" else Path(__file__).parent
+        self.directory = Path(directory)
+        self.manifest_file = manifest_file
+        self.distinct = distinct
+        self.iteration = 0
+        self.current = []
+        self.history = deque(maxlen=history)
+        self._pool = None
+        self._view = None
+
+    def _fill(self):
+        """Allocate and fill the pool; deferred to the first generate()"""
+        import numpy as np  # deferred with the pool, so constructing a manager does not load numpy
+
+        self._pool = bytearray(self.size + self.spread)
+        view = memoryview(self._pool)
+        rng = np.random.default_rng(self.seed)
+        for offset in range(0, len(self._pool), FILL_CHUNK_SIZE):
+            chunk = view[offset:offset + FILL_CHUNK_SIZE]
+            chunk[:] = rng.bytes(len(chunk))
+        self._view = view.toreadonly()
+
+    def _release(self):
+        """Delete the previous iteration's files"""
+        for payload in self.current:
+            if payload.path:
+                try:
+                    os.remove(payload.path)
+                except FileNotFoundError:
+                    pass
+        self.current = []
+
+    def generate(self, num_files, prefix="payload"):
+        """Return the payloads for the next iteration"""
+        import numpy as np
+
+        self._release()
+        if self._view is None:
+            self._fill()
+        self.iteration += 1
+        rng = np.random.default_rng([self.seed, self.iteration])
+        if self.distinct:
+            # Iteration 0 is never generated, so its stream is free to pick the fixed offsets
+            fixed = np.random.default_rng([self.seed, 0]).integers(0, self.spread + 1, self.distinct)
+            offsets = fixed[rng.integers(0, self.distinct, num_files)]
+        else:
+            offsets = rng.integers(0, self.spread + 1, num_files)
+
+        payloads = []
+        for index, offset in enumerate(offsets.tolist()):
+            name = f"{prefix}_{self.iteration}_{index}.bin"
+            view = self._view[offset:offset + self.size]
+            path = None
+            if self.mode != "memory":
+                path = str(self.directory / name)
+                with open(path, 'wb') as file:
+                    file.write(view)
+            payloads.append(Payload(name, view, offset, path))
+        self.current = payloads
+        self._record()
+        return payloads
+
+    def _record(self):
+        manifest = self.manifest()
+        self.history.append(manifest)
+        if self.manifest_file:
+            with open(self.manifest_file, 'a') as file:
+                file.write(json.dumps(manifest) + "\n")
+
+    def manifest(self):
+        """The current iteration's payload set, enough to regenerate it from the seed"""
+        return {
+            'iteration': self.iteration,
+            'seed': self.seed,
+            'mode': self.mode,
+            'size': self.size,
+            'distinct': self.distinct,
+            'payloads': [{'name': payload.name, 'offset': payload.offset, 'path': payload.path} for payload in self.current]
+        }
+
+    def close(self):
+        self._release()
+        if self._view is not None:
+            self._view.release()
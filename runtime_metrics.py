@@ -0,0 +1,262 @@
+"""Low-overhead runtime metrics: counters, gauges and histograms with Prometheus and JSON-lines export.
+
+Recording a metric is a lock-protected add; histograms use fixed buckets and
+a binary search, so nothing grows with the number of observations. Metrics
+are looked up once and kept, e.g.
+
+    sign_seconds = registry.histogram("sign_seconds", "Time per sign call", algorithm=alg)
+    sign_seconds.observe(elapsed)
+
+A disabled registry (or a disabled name prefix) hands out one shared no-op
+metric instead, so disabled instrumentation records nothing. Process state is
+sampled from /proc on demand rather than traced: RSS, peak RSS and CPU
+temperature. Peak RSS can be reset between runs, so a benchmark can measure
+the peak of one algorithm without tracemalloc's per-allocation overhead.
+"""
+from bisect import bisect_left
+import json
+import logging
+import os
+import threading
+import time
+
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def _label_text(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, labels, help_text):
+        self.name = name
+        self.labels = labels
+        self.help = help_text
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def snapshot(self):
+        return self.value
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value):
+        self.value = value
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, labels, help_text, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.labels = labels
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # the last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th quantile"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def snapshot(self):
+        return {'count': self.count, 'sum': self.sum, 'p50': self.quantile(0.5), 'p95': self.quantile(0.95)}
+
+
+class _NullMetric:
+    """Stand-in for disabled metrics"""
+
+    def inc(self, amount=1):
+        pass
+
+    def set(self, value):
+        pass
+
+    def observe(self, value):
+        pass
+
+
+NULL_METRIC = _NullMetric()
+
+
+def read_rss_bytes():
+    """Resident set size from /proc/self/statm, or 0 where /proc is not available"""
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return 0
+
+
+def read_peak_rss_bytes():
+    """Peak RSS (VmHWM) since process start or the last reset_peak_rss()"""
+    try:
+        with open("/proc/self/status") as file:
+            for line in file:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    return read_rss_bytes()
+
+
+def reset_peak_rss():
+    """Reset VmHWM to the current RSS (Linux 4.0+). Returns False where that is not supported."""
+    try:
+        with open("/proc/self/clear_refs", "w") as file:
+            file.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def read_temperature():
+    """CPU temperature in degrees Celsius from the first thermal zone, or None"""
+    try:
+        with open("/sys/class/thermal/thermal_zone0/temp") as file:
+            return int(file.read()) / 1000
+    except (OSError, ValueError):
+        return None
+
+
+class MetricsRegistry:
+
+    def __init__(self, enabled=True, disabled_prefixes=()):
+        self.enabled = enabled
+        self.disabled_prefixes = tuple(disabled_prefixes)
+        self._metrics = {}  # (name, labels) -> metric
+        self._lock = threading.Lock()
+        self._exporter = None
+        self._stop = threading.Event()
+
+    def _get(self, cls, name, help_text, labels, **options):
+        if not self.enabled or name.startswith(self.disabled_prefixes):
+            return NULL_METRIC
+        key = (name, tuple(sorted((label, str(value)) for label, value in labels.items())))
+        with self._lock:
+            metric = self._metrics.get(key)
+            if metric is None:
+                metric = self._metrics[key] = cls(name, key[1], help_text, **options)
+            return metric
+
+    def counter(self, name, help_text="", **labels):
+        return self._get(Counter, name, help_text, labels)
+
+    def gauge(self, name, help_text="", **labels):
+        return self._get(Gauge, name, help_text, labels)
+
+    def histogram(self, name, help_text="", buckets=DEFAULT_BUCKETS, **labels):
+        return self._get(Histogram, name, help_text, labels, buckets=buckets)
+
+    def sample_process(self):
+        """Update the process gauges from /proc and sysfs"""
+        self.gauge("process_rss_bytes", "Resident set size").set(read_rss_bytes())
+        self.gauge("process_peak_rss_bytes", "Peak resident set size").set(read_peak_rss_bytes())
+        temperature = read_temperature()
+        if temperature is not None:
+            self.gauge("cpu_temperature_celsius", "CPU temperature").set(temperature)
+
+    def snapshot(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {metric.name + _label_text(metric.labels): metric.snapshot() for metric in metrics}
+
+    def prometheus_text(self):
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: (metric.name, metric.labels))
+        lines = []
+        described = set()
+        for metric in metrics:
+            if metric.name not in described:
+                described.add(metric.name)
+                if metric.help:
+                    lines.append(f"# HELP {metric.name} {metric.help}")
+                lines.append(f"# TYPE {metric.name} {metric.kind}")
+            if metric.kind != "histogram":
+                lines.append(f"{metric.name}{_label_text(metric.labels)} {metric.value}")
+                continue
+            cumulative = 0
+            for bound, count in zip(metric.buckets + (float("inf"),), metric.counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{metric.name}_bucket{_label_text(metric.labels + (('le', le),))} {cumulative}")
+            lines.append(f"{metric.name}_sum{_label_text(metric.labels)} {metric.sum}")
+            lines.append(f"{metric.name}_count{_label_text(metric.labels)} {metric.count}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        """Write the Prometheus text format atomically, e.g. for node_exporter's textfile collector"""
+        temporary = f"{path}.tmp"
+        with open(temporary, "w") as file:
+            file.write(self.prometheus_text())
+        os.replace(temporary, path)
+
+    def append_jsonl(self, path):
+        with open(path, "a") as file:
+            file.write(json.dumps({'timestamp': time.time(), 'metrics': self.snapshot()}) + "\n")
+
+    def export(self, prometheus_path=None, jsonl_path=None):
+        if not self.enabled:
+            return
+        self.sample_process()
+        if prometheus_path:
+            self.write_prometheus(prometheus_path)
+        if jsonl_path:
+            self.append_jsonl(jsonl_path)
+
+    def _export_forever(self, interval, prometheus_path, jsonl_path):
+        while not self._stop.wait(interval):
+            try:
+                self.export(prometheus_path, jsonl_path)
+            except OSError as ex:
+                logging.error(f"METRICS: Export failed: {ex}")
+
+    def start_exporter(self, interval=10.0, prometheus_path=None, jsonl_path=None):
+        """Export every interval seconds on a background thread"""
+        if not self.enabled or self._exporter is not None or not (prometheus_path or jsonl_path):
+            return
+        self._stop.clear()
+        self._export_paths = (prometheus_path, jsonl_path)
+        self._exporter = threading.Thread(target=self._export_forever, args=(interval, prometheus_path, jsonl_path), daemon=True)
+        self._exporter.start()
+
+    def stop_exporter(self):
+        """Stop the exporter thread after one last export"""
+        if self._exporter is None:
+            return
+        self._stop.set()
+        self._exporter.join()
+        self._exporter = None
+        self.export(*self._export_paths)
+
+
+# Shared by everything in the process; RUNTIME_METRICS=0 turns recording off
+registry = MetricsRegistry(enabled=os.environ.get("RUNTIME_METRICS", "1") != "0")
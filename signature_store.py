@@ -0,0 +1,180 @@
+"""Persistent, content-addressed store of signatures and verification results.
+
+Entries are keyed by (content digest, algorithm, SHA-256 of the public key,
+signing mode) in a SQLite table, so signing data that was already signed with
+the same key costs one hash pass and an indexed lookup instead of a sign and a
+verify. The mode is part of the key because "full" signs the content itself
+while "stream"/"mmap" sign a message built from its digest, so a signature from
+one mode does not verify in the other. Entries for a key are deleted when the
+key is rotated (see SignerPool on_retire), and entries unused for max_age
+seconds are pruned.
+
+The signer pool's keypairs are kept in the same file (SignerPool key_store),
+with the number of signatures each has made, since a fresh key per process
+would make every stored signature unreachable after a restart. The file therefore holds secret keys and is created readable
+by its owner only.
+"""
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from pqc_signing import DEFAULT_CHUNK_SIZE, DEFAULT_DIGEST, buffer_digest, file_digest
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS signatures (
+    digest BLOB NOT NULL,
+    algorithm TEXT NOT NULL,
+    key_id BLOB NOT NULL,
+    mode TEXT NOT NULL,
+    signature BLOB NOT NULL,
+    is_valid INTEGER NOT NULL,
+    created REAL NOT NULL,
+    last_used REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (digest, algorithm, key_id, mode)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS signatures_by_key ON signatures (algorithm, key_id);
+CREATE TABLE IF NOT EXISTS keys (
+    algorithm TEXT PRIMARY KEY,
+    public_key BLOB NOT NULL,
+    secret_key BLOB NOT NULL,
+    created REAL NOT NULL,
+    signatures INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+def key_id(public_key):
+    return hashlib.sha256(public_key).digest()
+
+
+def content_digest(source, digest=DEFAULT_DIGEST, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Digest of a file path or an in-memory buffer, computed in chunks"""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return buffer_digest(source, digest, chunk_size)
+    return file_digest(source, digest, chunk_size)
+
+
+class SignatureStore:
+
+    def __init__(self, path="signatures.sqlite", max_age=None):
+        self.path = path
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            # Secret keys are stored here: owner-only, which SQLite carries over to the WAL files
+            os.close(os.open(path, os.O_RDWR | os.O_CREAT, 0o600))
+            os.chmod(path, 0o600)
+        # Used from the signing executor thread as well as the loop thread, always under _lock
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        columns = [row[1] for row in self._db.execute("PRAGMA table_info(signatures)")]
+        if columns and 'mode' not in columns:
+            # Entries from before the signing mode was recorded cannot be matched to one; they are only a cache
+            self._db.execute("DROP TABLE signatures")
+        self._db.executescript(SCHEMA)
+        if 'signatures' not in [row[1] for row in self._db.execute("PRAGMA table_info(keys)")]:
+            # Keys saved before signature counts were kept start from zero
+            self._db.execute("ALTER TABLE keys ADD COLUMN signatures INTEGER NOT NULL DEFAULT 0")
+
+        # Counters for this process
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.expired = 0
+        if max_age is not None:
+            self.prune(max_age)
+
+    def lookup(self, digest, algorithm, public_key, mode):
+        """Return (signature, is_valid) for content already signed with this key in this signing mode, or None"""
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT signature, is_valid FROM signatures WHERE digest = ? AND algorithm = ? AND key_id = ? AND mode = ?",
+                (digest, algorithm, key_id(public_key), mode)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._db.execute(
+                "UPDATE signatures SET hits = hits + 1, last_used = ? "
+                "WHERE digest = ? AND algorithm = ? AND key_id = ? AND mode = ?",
+                (now, digest, algorithm, key_id(public_key), mode))
+            self._db.commit()
+            self.hits += 1
+        return row[0], bool(row[1])
+
+    def store(self, digest, algorithm, public_key, mode, signature, is_valid):
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO signatures (digest, algorithm, key_id, mode, signature, is_valid, created, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (digest, algorithm, key_id(public_key), mode, signature, int(bool(is_valid)), now, now))
+            self._db.commit()
+            self.stores += 1
+
+    def expire_key(self, algorithm, public_key):
+        """Drop every entry signed with a rotated or discarded key"""
+        with self._lock:
+            deleted = self._db.execute("DELETE FROM signatures WHERE algorithm = ? AND key_id = ?",
+                                       (algorithm, key_id(public_key))).rowcount
+            self._db.commit()
+            self.expired += deleted
+        if deleted:
+            logging.info(f"SIGNATURE STORE: Expired {deleted} {algorithm} entries after key rotation")
+        return deleted
+
+    def load_key(self, algorithm):
+        """(public_key, secret_key, created, signatures) of the saved keypair for algorithm, or None"""
+        with self._lock:
+            return self._db.execute("SELECT public_key, secret_key, created, signatures FROM keys WHERE algorithm = ?",
+                                    (algorithm,)).fetchone()
+
+    def save_key(self, algorithm, public_key, secret_key, created, signatures=0):
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO keys (algorithm, public_key, secret_key, created, signatures) "
+                             "VALUES (?, ?, ?, ?, ?)", (algorithm, public_key, secret_key, created, signatures))
+            self._db.commit()
+
+    def save_signatures(self, algorithm, public_key, signatures):
+        """Record how many signatures a saved key has made; the count never goes down"""
+        with self._lock:
+            self._db.execute("UPDATE keys SET signatures = MAX(signatures, ?) WHERE algorithm = ? AND public_key = ?",
+                             (signatures, algorithm, public_key))
+            self._db.commit()
+
+    def delete_key(self, algorithm, public_key):
+        """Forget a rotated keypair; a newer key saved for the algorithm is kept"""
+        with self._lock:
+            self._db.execute("DELETE FROM keys WHERE algorithm = ? AND public_key = ?", (algorithm, public_key))
+            self._db.commit()
+
+    def prune(self, max_age):
+        """Drop entries not used for max_age seconds, e.g. those of keys from earlier runs"""
+        with self._lock:
+            deleted = self._db.execute("DELETE FROM signatures WHERE last_used < ?", (time.time() - max_age,)).rowcount
+            self._db.commit()
+            self.expired += deleted
+        return deleted
+
+    def stats(self):
+        with self._lock:
+            entries, total_hits = self._db.execute("SELECT COUNT(*), COALESCE(SUM(hits), 0) FROM signatures").fetchone()
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'stores': self.stores,
+                'expired': self.expired,
+                'entries': entries,
+                'stored_hits': total_hits
+            }
+
+    def close(self):
+        with self._lock:
+            self._db.close()
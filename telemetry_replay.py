@@ -0,0 +1,293 @@
+"""Replay recorded (or synthetic) energy traces through the kasa IotStrip interface.
+
+ReplayIotStrip serves energy_data.csv readings to EnergyMonitor exactly like the
+HS300 would: each update() returns the trace sample in effect at the current
+simulated time, looping over the trace, so the readings depend only on the
+clock and not on how often or how late the strip is polled. Paired with a
+clocks.SimulatedClock this runs the telemetry path, or whole autonomic managers,
+at 1x to 1000x+ without hardware:
+
+    python telemetry_replay.py telemetry --speed 0 --hours 24      # manual clock: deterministic, as fast as possible
+    python telemetry_replay.py telemetry --speed 1000 --strips 20  # collector under load, 1000x real time
+    python telemetry_replay.py manager --speed 1000 --capacity 20  # managers draining simulated batteries
+"""
+import argparse
+import asyncio
+import csv
+from datetime import datetime
+import logging
+import os
+import sys
+import time
+
+import numpy as np
+
+from clocks import SYSTEM_CLOCK, SimulatedClock
+
+
+class ReplayTrace:
+    """Per-socket (offset seconds, power, current, voltage) arrays of one recording"""
+
+    def __init__(self, sockets, start=None):
+        self.sockets = sockets  # name -> dict of equal-length arrays 'time', 'power', 'current', 'voltage'
+        self.start = start
+        self.duration = max(float(data['time'][-1]) for data in sockets.values()) if sockets else 0.0
+
+    @classmethod
+    def from_csv(cls, filename):
+        """Load a kasa_energy.py CSV (Timestamp,Socket,Power (W),Current (A),Voltage (V))"""
+        rows = {}
+        with open(filename, newline='') as file:
+            reader = csv.reader(file)
+            next(reader)
+            for timestamp, socket_name, power, current, voltage in reader:
+                rows.setdefault(socket_name, []).append(
+                    (datetime.strptime(timestamp, "%Y-%m-%d %H:%M:%S.%f").timestamp(), float(power), float(current), float(voltage)))
+        if not rows:
+            raise ValueError(f"{filename} has no samples")
+        start = min(samples[0][0] for samples in rows.values())
+        sockets = {}
+        for socket_name, samples in rows.items():
+            data = np.array(sorted(samples))
+            sockets[socket_name] = {'time': data[:, 0] - start, 'power': data[:, 1], 'current': data[:, 2], 'voltage': data[:, 3]}
+        return cls(sockets, datetime.fromtimestamp(start))
+
+    @classmethod
+    def synthetic(cls, aliases=("rpi3", "rpi4", "rpi5"), hours=1.0, interval=1.0, idle_power=2.5, burst_power=6.0,
+                  voltage=117.0, burst_probability=0.02, seed=0):
+        """Idle draw with random signing bursts, like kasa_fake, but generated up front from a seed"""
+        rng = np.random.default_rng(seed)
+        times = np.arange(0.0, hours * 3600, interval)
+        sockets = {}
+        for alias in aliases:
+            bursting = np.zeros(len(times), dtype=bool)
+            for start in np.flatnonzero(rng.random(len(times)) < burst_probability):
+                bursting[start:start + int(rng.uniform(5, 30) / interval)] = True
+            power = np.where(bursting, burst_power, idle_power) + rng.normal(0, 0.05, len(times))
+            volts = voltage + rng.normal(0, 0.2, len(times))
+            sockets[alias] = {'time': times.copy(), 'power': power.round(3), 'current': (power / volts).round(3), 'voltage': volts.round(3)}
+        return cls(sockets, datetime(2026, 1, 1))
+
+    def sample(self, socket_name, offset):
+        """Reading in effect offset seconds into the trace; the trace repeats after its last sample"""
+        data = self.sockets[socket_name]
+        if self.duration > 0:
+            offset = offset % self.duration
+        index = max(int(np.searchsorted(data['time'], offset, side='right')) - 1, 0)
+        return float(data['power'][index]), float(data['current'][index]), float(data['voltage'][index])
+
+    def energy_wh(self, socket_name, start, end):
+        """Exact energy of the step-wise trace between two offsets, for checking what the monitor measured"""
+        data = self.sockets[socket_name]
+        edges = np.concatenate(([start], data['time'][(data['time'] > start) & (data['time'] < end)], [end]))
+        powers = data['power'][np.maximum(np.searchsorted(data['time'], edges[:-1], side='right') - 1, 0)]
+        return float(np.sum(powers * np.diff(edges))) / 3600
+
+
+class ReplayIotPlug:
+    """Child socket whose readings come from one socket of a ReplayTrace"""
+
+    def __init__(self, alias, trace, socket_name, clock=None, offset=0.0, latency=0.0):
+        self.alias = alias
+        self.is_on = True
+        self.has_emeter = True
+        self.trace = trace
+        self.socket_name = socket_name
+        self.clock = clock or SYSTEM_CLOCK
+        self.offset = offset
+        self.latency = latency
+        self.updates = 0
+        self._origin = self.clock.monotonic()
+        self.state_information = {}
+
+    def trace_offset(self):
+        return self.clock.monotonic() - self._origin + self.offset
+
+    async def update(self):
+        if self.latency:
+            await self.clock.async_sleep(self.latency)
+        power, current, voltage = self.trace.sample(self.socket_name, self.trace_offset())
+        self.updates += 1
+        self.state_information = {
+            'Current consumption': power,
+            'Current': current,
+            'Voltage': voltage
+        }
+
+
+class ReplayIotStrip:
+    """Stand-in for kasa.iot.IotStrip serving a ReplayTrace.
+
+    aliases defaults to the trace's socket names. With other names (e.g. one
+    per simulated device) socket i replays trace socket i modulo the number of
+    trace sockets, shifted by i * stagger seconds so the devices do not burst
+    in lockstep.
+    """
+
+    def __init__(self, trace, host="replay", aliases=None, clock=None, latency=0.0, stagger=0.0):
+        self.host = host
+        self.trace = trace
+        self.latency = latency
+        self.clock = clock or SYSTEM_CLOCK
+        names = sorted(trace.sockets)
+        aliases = list(aliases) if aliases is not None else names
+        self.children = [ReplayIotPlug(alias, trace, names[index % len(names)], self.clock, index * stagger, latency)
+                         for index, alias in enumerate(aliases)]
+
+    async def update(self):
+        if self.latency:
+            await self.clock.async_sleep(self.latency)
+
+
+def load_trace(args):
+    if args.trace:
+        return ReplayTrace.from_csv(args.trace)
+    return ReplayTrace.synthetic(hours=args.synthetic_hours, seed=args.seed)
+
+
+def replay_manual(trace, args):
+    """Step a manual clock poll by poll: the same trace and arguments always give the same samples"""
+    from kasa_energy import EnergyMonitor
+    from telemetry_writer import TelemetryWriter
+
+    clock = SimulatedClock(speed=None, start=trace.start)
+    writer = TelemetryWriter(args.output)
+    strips = [ReplayIotStrip(trace, host=f"replay-{index}", clock=clock, stagger=args.stagger) for index in range(args.strips)]
+    monitors = [EnergyMonitor(device_ip=strip.host, strip=strip, telemetry_writer=writer, monitor_all_sockets=True,
+                              history_size=int(args.hours * 3600 / args.interval) + 1, clock=clock,
+                              interval=args.interval, min_interval=args.interval)
+                for strip in strips]
+
+    async def poll_all():
+        for _ in range(int(args.hours * 3600 / args.interval)):
+            await asyncio.gather(*(monitor._update_data_async() for monitor in monitors))
+            clock.advance(args.interval)
+
+    start = time.perf_counter()
+    asyncio.run(poll_all())
+    for monitor in monitors:
+        monitor.get_latest_data()
+    elapsed = time.perf_counter() - start
+    return clock, monitors, writer.close, elapsed
+
+
+def replay_scaled(trace, args):
+    """Poll through one EnergyCollector on a clock running args.speed times faster than real time"""
+    from energy_collector import EnergyCollector
+
+    clock = SimulatedClock(speed=args.speed, start=trace.start)
+    collector = EnergyCollector(csv_filename=args.output, clock=clock, history_size=int(args.hours * 3600 / args.interval) + 1,
+                                interval=args.interval, min_interval=args.interval)
+    for index in range(args.strips):
+        collector.add_strip(f"replay-{index}", strip=ReplayIotStrip(trace, host=f"replay-{index}", clock=clock, stagger=args.stagger))
+    start = time.perf_counter()
+    time.sleep(clock.to_real(args.hours * 3600))
+    monitors = list(collector.monitors.values())
+    for monitor in monitors:
+        monitor.running = False
+        monitor.get_latest_data()
+    elapsed = time.perf_counter() - start
+    return clock, monitors, collector.close, elapsed
+
+
+def run_telemetry(args):
+    trace = load_trace(args)
+    replay = replay_manual if args.speed == 0 else replay_scaled
+    clock, monitors, close, elapsed = replay(trace, args)
+
+    samples = sum(len(buffer) for monitor in monitors for buffer in monitor.buffers.values())
+    simulated = clock.monotonic()
+    print(f"Replayed {simulated / 3600:.2f} simulated hours of {len(trace.sockets)}-socket trace on {len(monitors)} strips "
+          f"in {elapsed:.2f} s ({simulated / elapsed:.0f}x real time)")
+    print(f"Samples stored: {samples} ({samples / elapsed:.0f} per second)")
+    # Energy the monitor integrated versus the trace itself, for the first strip
+    for child in monitors[0].strip.children:
+        buffer = monitors[0].buffers.get(child.alias)
+        if buffer is None or len(buffer) < 2:
+            continue
+        first, last = buffer.window('time', 0.0)[[0, -1]]
+        measured = buffer.energy_wh(first, last)
+        expected = trace.energy_wh(child.socket_name, first + child.offset, last + child.offset) if last + child.offset <= trace.duration else None
+        comparison = f", trace {expected:.4f} Wh ({(measured - expected) / expected * 100:+.2f}%)" if expected else ""
+        print(f"  {child.alias}: measured {measured:.4f} Wh{comparison}")
+    stats = monitors[0].poll_stats()
+    print(f"Missed ticks: {sum(monitor.missed_ticks for monitor in monitors)}, timeouts: {stats['timeouts']}, errors: {stats['errors']}")
+    close()
+
+
+class StaticPlanner:
+    """Planner stand-in for AutonomicManager.planner: always picks the same algorithm"""
+
+    def __init__(self, algorithm, current, voltage):
+        self.result = (algorithm, current, voltage)
+
+    def predict(self, features):
+        return self.result
+
+
+async def run_managers(managers, monitor_interval):
+    await asyncio.gather(*(manager.run(monitor_interval) for manager in managers))
+
+
+def run_manager(args):
+    """Online managers on replayed sockets, each running the asynchronous MAPE loop until its battery is empty"""
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "autonomic-manager"))
+    from energy_collector import get_collector
+    from manager import AutonomicManager
+
+    trace = load_trace(args)
+    clock = SimulatedClock(speed=args.speed, start=trace.start)
+    aliases = [f"device{index}" for index in range(args.managers)]
+    # Created first, so the managers subscribe to the replayed strip instead of the HS300
+    collector = get_collector(csv_filename=args.output, clock=clock)
+    collector.add_strip("replay", strip=ReplayIotStrip(trace, aliases=aliases, clock=clock, stagger=args.stagger))
+    managers = []
+    for alias in aliases:
+        manager = AutonomicManager(alias, args.algorithm, 0.037, 117.5, capacity=args.capacity, interval=args.interval,
+                                   is_online=True, device_ip="replay", payload_size_mb=args.payload_size_mb, payload_seed=0, clock=clock)
+        manager.planner = StaticPlanner(args.algorithm, 0.037, 117.5)
+        managers.append(manager)
+
+    start = time.perf_counter()
+    asyncio.run(run_managers(managers, args.monitor_interval))
+    elapsed = time.perf_counter() - start
+    simulated = clock.monotonic()
+    print(f"{len(managers)} managers drained {args.capacity} Wh in {simulated / 3600:.2f} simulated hours, "
+          f"{elapsed:.1f} s real ({simulated / elapsed:.0f}x)")
+    for manager in managers:
+        stats = manager.phase_stats()
+        cycles = stats.get('cycle', {}).get('count', 0)
+        print(f"  {manager.device_id}: {cycles} MAPE cycles, capacity {manager.battery_capacity:.3f} Wh")
+    collector.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["telemetry", "manager"])
+    parser.add_argument("--trace", default=None, help="kasa_energy.py CSV to replay, default a synthetic trace")
+    parser.add_argument("--synthetic-hours", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--speed", type=float, default=1000.0, help="Simulated seconds per real second, 0 for a manual clock (telemetry only)")
+    parser.add_argument("--stagger", type=float, default=37.0, help="Trace offset in seconds between replayed sockets")
+    parser.add_argument("--output", default="replay_energy_data.csv")
+    parser.add_argument("--hours", type=float, default=1.0, help="Simulated hours to replay (telemetry)")
+    parser.add_argument("--strips", type=int, default=1, help="Replayed strips (telemetry)")
+    parser.add_argument("--interval", type=float, default=1.0, help="Poll interval (telemetry) or manager loop interval, simulated seconds")
+    parser.add_argument("--managers", type=int, default=3)
+    parser.add_argument("--capacity", type=float, default=20.0, help="Battery capacity per manager in Wh")
+    parser.add_argument("--monitor-interval", type=float, default=1.0)
+    parser.add_argument("--algorithm", default="ML-DSA-44")
+    parser.add_argument("--payload-size-mb", type=float, default=1)
+    args = parser.parse_args()
+
+    if args.command == "telemetry":
+        run_telemetry(args)
+    else:
+        logging.basicConfig(level=logging.WARNING)
+        if args.speed == 0:
+            parser.error("the manager replay needs a running clock, use --speed > 0")
+        run_manager(args)
+
+
+if __name__ == "__main__":
+    main()
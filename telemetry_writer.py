@@ -0,0 +1,298 @@
+import csv
+from datetime import datetime
+import os
+from pathlib import Path
+from queue import Queue, Empty
+import threading
+import time
+
+import numpy as np
+
+HEADER = ['Timestamp', 'Socket', 'Power (W)', 'Current (A)', 'Voltage (V)']
+OUTPUT_FORMATS = ("csv", "npz")
+FSYNC_POLICIES = ("never", "interval", "shutdown")
+# An npz segment is closed at this many rows even without max_bytes/max_age, to bound memory
+NPZ_SEGMENT_ROWS = 86400
+_STOP = object()
+
+
+def epoch_seconds(timestamps):
+    """Timestamps as float64 seconds; "%Y-%m-%d %H:%M:%S.%f" strings are read as naive wall-clock time"""
+    values = np.asarray(timestamps)
+    if values.dtype.kind in "iuf":
+        return values.astype(np.float64)
+    return values.astype("datetime64[us]").astype(np.int64) / 1e6
+
+
+def batch_columns(batch):
+    """Columns of a batch of rows; sockets are stored as integer codes into socket_names"""
+    timestamps, sockets, power, current, voltage = zip(*batch)
+    socket_names, codes = np.unique(np.asarray(sockets, dtype=str), return_inverse=True)
+    return {'timestamp': epoch_seconds(timestamps),
+            'socket_names': socket_names,
+            'socket': codes.astype(np.uint16),
+            'power': np.asarray(power, dtype=np.float64),
+            'current': np.asarray(current, dtype=np.float64),
+            'voltage': np.asarray(voltage, dtype=np.float64)}
+
+
+def merge_columns(chunks):
+    """Concatenate chunk columns, re-coding sockets against one combined socket_names table"""
+    socket_names = np.unique(np.concatenate([chunk['socket_names'] for chunk in chunks]))
+    merged = {name: np.concatenate([chunk[name] for chunk in chunks]) for name in ('timestamp', 'power', 'current', 'voltage')}
+    merged['socket_names'] = socket_names
+    merged['socket'] = np.concatenate([np.searchsorted(socket_names, chunk['socket_names'])[chunk['socket']]
+                                       for chunk in chunks]).astype(np.uint16)
+    return merged
+
+
+def save_columns(path, columns, fsync=False):
+    """Write columns to a compressed npz file atomically"""
+    path = Path(path)
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, 'wb') as file:
+        np.savez_compressed(file, **columns)
+        if fsync:
+            file.flush()
+            os.fsync(file.fileno())
+    os.replace(tmp_path, path)
+
+
+def load_columns(path):
+    with np.load(path) as data:
+        return {name: data[name] for name in data.files}
+
+
+def read_npz(filename):
+    """All rows written in npz format for filename, as columns with socket names decoded.
+
+    Reads the rolled-up segments and the chunk files of a segment that was still
+    open when the writer stopped without close().
+    """
+    filename = Path(filename)
+    paths = sorted(filename.parent.glob(f"{filename.stem}.*.npz"))
+    segments = {path.name for path in paths if ".part" not in path.name}
+    chunks = []
+    for path in paths:
+        segment_name = path.name.split(".part")[0] + ".npz"
+        if ".part" in path.name and segment_name in segments:
+            continue  # left behind by a roll-up interrupted after the segment was written
+        chunks.append(load_columns(path))
+    if not chunks:
+        return None
+    columns = merge_columns(chunks)
+    columns['socket'] = columns.pop('socket_names')[columns['socket']]
+    return columns
+
+
+class TelemetryWriter:
+    """Background writer for energy samples.
+
+    Rows are queued by the collection thread and written by a separate thread
+    in batches of batch_size rows or every flush_interval seconds, whichever
+    comes first. Durability is controlled by fsync: "never" leaves it to the OS,
+    "interval" fsyncs at most every fsync_interval seconds and on shutdown,
+    "shutdown" only fsyncs on close.
+
+    "csv" appends to filename as before and rotates it to <stem>.<date>.csv once
+    it grows past max_bytes or is older than max_age seconds (None disables
+    either). "npz" writes each batch once, as an immutable compressed chunk
+    <stem>.<n>.part<m>.npz (float64 epoch timestamps, sockets as integer codes),
+    and nothing is ever rewritten while a segment is open. When the segment
+    reaches the same limits (or NPZ_SEGMENT_ROWS rows), and on close, its chunks
+    are rolled up into <stem>.<n>.npz. read_npz() reads both. Rotation and close
+    fsync the files and their directory unless fsync is "never".
+    """
+
+    def __init__(self, filename="energy_data.csv", output_format="csv", batch_size=60, flush_interval=10.0,
+                 fsync="shutdown", fsync_interval=60.0, max_bytes=None, max_age=None):
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Unknown output format '{output_format}', expected one of {OUTPUT_FORMATS}")
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy '{fsync}', expected one of {FSYNC_POLICIES}")
+        self.filename = Path(filename)
+        self.output_format = output_format
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+
+        self.rows_written = 0
+        self.flushes = 0
+        self.rotations = 0
+
+        self._queue = Queue()
+        self._file = None
+        self._writer = None
+        self._opened_at = None
+        self._last_fsync = time.monotonic()
+        self._segment = 0
+        self._chunk = 0
+        self._segment_rows = 0
+        self._segment_bytes = 0
+        self._unsynced = []  # npz chunk files written since the last fsync
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def write(self, timestamp, socket_name, power, current, voltage):
+        """Queue one row; never blocks the caller on disk I/O"""
+        self._queue.put((timestamp, socket_name, power, current, voltage))
+
+    def close(self):
+        """Write out everything still queued, fsync if configured, and stop the thread"""
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+
+    # Writer thread
+
+    def _run(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                row = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+            except Empty:
+                row = None
+            if row is _STOP:
+                self._flush(batch)
+                if self.output_format == "npz" and self._opened_at is not None:
+                    self._roll_up(fsync=self.fsync != "never")
+                self._sync(force=self.fsync != "never")
+                self._close_file()
+                return
+            if row is not None:
+                batch.append(row)
+            if len(batch) >= self.batch_size or time.monotonic() >= deadline:
+                self._flush(batch)
+                batch = []
+                deadline = time.monotonic() + self.flush_interval
+
+    def _flush(self, batch):
+        if not batch:
+            return
+        try:
+            self._rotate_if_needed()
+            if self.output_format == "csv":
+                self._write_csv(batch)
+            else:
+                self._write_npz(batch)
+            self.rows_written += len(batch)
+            self.flushes += 1
+            if self.fsync == "interval" and time.monotonic() - self._last_fsync >= self.fsync_interval:
+                self._sync(force=True)
+        except Exception as e:
+            print(f"Error writing telemetry: {e}")
+
+    def _open_csv(self):
+        file_exists = self.filename.exists()
+        self._file = open(self.filename, 'a', newline='')
+        self._writer = csv.writer(self._file)
+        self._opened_at = time.monotonic()
+        # Write header if file is new
+        if not file_exists or self.filename.stat().st_size == 0:
+            self._writer.writerow(HEADER)
+
+    def _write_csv(self, batch):
+        if self._file is None:
+            self._open_csv()
+        self._writer.writerows(batch)
+        self._file.flush()
+
+    def _segment_path(self, index):
+        return self.filename.with_name(f"{self.filename.stem}.{index:06d}.npz")
+
+    def _chunk_path(self, segment, chunk):
+        return self.filename.with_name(f"{self.filename.stem}.{segment:06d}.part{chunk:06d}.npz")
+
+    def _chunk_paths(self, segment):
+        return sorted(self.filename.parent.glob(f"{self.filename.stem}.{segment:06d}.part*.npz"))
+
+    def _write_npz(self, batch):
+        if self._opened_at is None:
+            self._opened_at = time.monotonic()
+            # Continue numbering after any segments (or chunks of one) from an earlier run
+            while self._segment_path(self._segment).exists() or self._chunk_paths(self._segment):
+                self._segment += 1
+            self._chunk = 0
+            self._segment_rows = 0
+            self._segment_bytes = 0
+        path = self._chunk_path(self._segment, self._chunk)
+        save_columns(path, batch_columns(batch))
+        self._chunk += 1
+        self._segment_rows += len(batch)
+        self._segment_bytes += path.stat().st_size
+        if self.fsync != "never":
+            self._unsynced.append(path)
+
+    def _roll_up(self, fsync=False):
+        """Merge the open segment's chunk files into one segment file and delete the chunks"""
+        chunks = self._chunk_paths(self._segment)
+        if chunks:
+            path = self._segment_path(self._segment)
+            save_columns(path, merge_columns([load_columns(chunk) for chunk in chunks]), fsync=fsync)
+            if fsync:
+                self._sync_directory()
+            for chunk in chunks:
+                os.remove(chunk)
+        # The chunks are gone, so there is nothing left of them to fsync
+        self._unsynced = []
+        self._segment += 1
+        self._opened_at = None
+
+    def _rotate_if_needed(self):
+        if self._opened_at is None:
+            return
+        too_old = self.max_age is not None and time.monotonic() - self._opened_at >= self.max_age
+        if self.output_format == "npz":
+            too_big = (self.max_bytes is not None and self._segment_bytes >= self.max_bytes) or \
+                self._segment_rows >= NPZ_SEGMENT_ROWS
+            if too_old or too_big:
+                self._roll_up(fsync=self.fsync != "never")
+                self._last_fsync = time.monotonic()
+                self.rotations += 1
+            return
+        if self._file is None:
+            return
+        too_big = self.max_bytes is not None and self._file.tell() >= self.max_bytes
+        if too_old or too_big:
+            self._sync(force=self.fsync != "never")
+            self._close_file()
+            stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+            os.replace(self.filename, self.filename.with_name(f"{self.filename.stem}.{stamp}{self.filename.suffix}"))
+            if self.fsync != "never":
+                self._sync_directory()
+            self.rotations += 1
+
+    def _sync(self, force=False):
+        if force:
+            if self._file is not None:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+            # Chunk files are written once and never reopened, so fsync them by path
+            for path in self._unsynced:
+                fd = os.open(path, os.O_RDONLY)
+                try:
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+            self._unsynced = []
+            self._sync_directory()
+        self._last_fsync = time.monotonic()
+
+    def _sync_directory(self):
+        """fsync the directory so new and renamed files survive a power cut"""
+        fd = os.open(self.filename.parent, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def _close_file(self):
+        if self._file is not None:
+            self._file.close()
+        self._file = None
+        self._writer = None
+        self._opened_at = None
@@ -0,0 +1,7 @@
+import sys
+from pathlib import Path
+
+# The runtime modules are flat scripts in the repository root and its tool directories, not a package
+ROOT = Path(__file__).resolve().parent.parent
+for directory in (ROOT, ROOT / "autonomic-manager", ROOT / "models", ROOT / "liboqs-scripts"):
+    sys.path.insert(0, str(directory))
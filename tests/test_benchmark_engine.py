@@ -0,0 +1,41 @@
+import pytest
+
+pytest.importorskip("oqs")
+pytest.importorskip("psutil")
+
+from benchmark_engine import completed_algorithms
+
+HEADER = b"Algorithm,Start Time,Sign Median (s)\n"
+
+
+def test_missing_csv_has_no_completed_algorithms(tmp_path):
+    assert completed_algorithms(tmp_path / "missing.csv") == set()
+
+
+def test_complete_rows_are_kept(tmp_path):
+    path = tmp_path / "benchmark.csv"
+    path.write_bytes(HEADER + b"Falcon-512,t0,0.1\nML-DSA-44,t1,0.2\n")
+    assert completed_algorithms(path) == {"Falcon-512", "ML-DSA-44"}
+    assert path.read_bytes() == HEADER + b"Falcon-512,t0,0.1\nML-DSA-44,t1,0.2\n"
+
+
+def test_row_without_newline_is_truncated(tmp_path):
+    path = tmp_path / "benchmark.csv"
+    path.write_bytes(HEADER + b"Falcon-512,t0,0.1\nML-DSA-44,t1,0.2")
+    assert completed_algorithms(path) == {"Falcon-512"}
+    assert path.read_bytes() == HEADER + b"Falcon-512,t0,0.1\n"
+
+
+def test_row_with_missing_fields_is_truncated(tmp_path):
+    path = tmp_path / "benchmark.csv"
+    path.write_bytes(HEADER + b"Falcon-512,t0,0.1\nML-DSA-44,t1\nMAYO-1,t2,0.3\n")
+    # Everything from the first broken row on is rerun
+    assert completed_algorithms(path) == {"Falcon-512"}
+    assert path.read_bytes() == HEADER + b"Falcon-512,t0,0.1\n"
+
+
+def test_partial_header_is_left_alone(tmp_path):
+    path = tmp_path / "benchmark.csv"
+    path.write_bytes(b"Algorithm,Start")
+    assert completed_algorithms(path) == set()
+    assert path.read_bytes() == b"Algorithm,Start"
@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+pd = pytest.importorskip("pandas")
+tree = pytest.importorskip("sklearn.tree")
+
+from compiled_tree import CompiledTree
+
+FEATURES = ['Residual_Power', 'Max_Stack_Usage', 'Max_ROM', 'Min_Throughput']
+CLASSES = np.array(['ASCON', 'GIFT-COFB', 'SPARKLE', 'Xoodyak'])
+
+
+@pytest.fixture(scope="module")
+def fitted():
+    """A deep tree on noisy labels, so there are many nodes and near-threshold values to get wrong"""
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.uniform(0, 100, (2000, len(FEATURES))), columns=FEATURES)
+    score = X['Residual_Power'] + 0.5 * X['Max_ROM'] - 0.3 * X['Min_Throughput'] + rng.normal(0, 10, len(X))
+    y = CLASSES[np.digitize(score, [20, 50, 80])]
+    model = tree.DecisionTreeClassifier(random_state=1).fit(X, y)
+    return model, CompiledTree.from_sklearn(model)
+
+
+def queries():
+    rng = np.random.default_rng(1)
+    return pd.DataFrame(rng.uniform(-10, 110, (5000, len(FEATURES))), columns=FEATURES)
+
+
+def test_batch_predictions_match_sklearn(fitted):
+    model, compiled = fitted
+    X = queries()
+    assert np.array_equal(compiled.predict(X), model.predict(X))
+    assert np.array_equal(compiled.predict(X.to_numpy()), model.predict(X))
+
+
+def test_thresholds_are_compared_in_float32(fitted):
+    model, compiled = fitted
+    # Values just either side of every threshold, where float64 and float32 comparisons differ
+    thresholds = model.tree_.threshold[model.tree_.feature >= 0]
+    features = model.tree_.feature[model.tree_.feature >= 0]
+    X = np.tile(queries().to_numpy()[:len(thresholds)], (3, 1))
+    for block, offset in enumerate((-1e-7, 0.0, 1e-7)):
+        rows = np.arange(len(thresholds)) + block * len(thresholds)
+        X[rows, features] = thresholds * (1 + offset)
+    X = pd.DataFrame(X, columns=FEATURES)
+    assert np.array_equal(compiled.predict(X), model.predict(X))
+
+
+def test_predict_one_matches_batch(fitted):
+    _, compiled = fitted
+    X = queries().iloc[:500]
+    batch = compiled.predict(X)
+    assert [compiled.predict_one(row) for row in X.to_numpy().tolist()] == batch.tolist()
+
+
+def test_save_load_round_trip(fitted, tmp_path):
+    model, compiled = fitted
+    compiled.save(tmp_path / "dtc.npz")
+    loaded = CompiledTree.load(tmp_path / "dtc.npz")
+    X = queries()
+    assert np.array_equal(loaded.predict(X), model.predict(X))
+    assert loaded.feature_names_in_.tolist() == FEATURES
+
+
+def test_columns_are_matched_by_name(fitted):
+    model, compiled = fitted
+    X = queries()
+    assert np.array_equal(compiled.predict(X[FEATURES[::-1]]), model.predict(X))
+    with pytest.raises(ValueError):
+        compiled.predict(X.drop(columns=['Max_ROM']))
+    with pytest.raises(ValueError):
+        compiled.predict_one([1.0, 2.0, 3.0])
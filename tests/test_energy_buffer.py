@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from energy_buffer import EnergyRingBuffer
+
+
+def filled(capacity, count, power=lambda t: 2.0):
+    """A buffer holding samples at t = 0, 1, ..., count - 1, wrapped when count > capacity"""
+    buffer = EnergyRingBuffer(capacity)
+    for t in range(count):
+        buffer.append(float(t), power(t), 0.1, 5.0, wall_time=1000.0 + t)
+    return buffer
+
+
+def test_append_keeps_the_newest_samples_in_order():
+    buffer = filled(8, 13)
+    assert len(buffer) == 8
+    assert buffer.latest('time', 8).tolist() == [5.0, 6.0, 7.0, 8.0, 9.0, 10.0, 11.0, 12.0]
+    assert buffer.latest('time', 3).tolist() == [10.0, 11.0, 12.0]
+    assert buffer.last('wall_time') == 1012.0
+    assert buffer.last_time() == 12.0
+
+
+def test_timestamps_must_be_monotonic():
+    buffer = filled(4, 2)
+    with pytest.raises(ValueError):
+        buffer.append(0.5, 1.0, 0.1, 5.0)
+
+
+@pytest.mark.parametrize("count", [5, 8, 11, 13, 16])
+def test_search_matches_a_sorted_copy_across_the_wrap(count):
+    buffer = filled(8, count)
+    times = buffer.latest('time', len(buffer))
+    for timestamp in np.arange(-1.0, count + 1.0, 0.5):
+        for side in ('left', 'right'):
+            assert buffer.search(timestamp, side) == np.searchsorted(times, timestamp, side=side)
+
+
+def test_window_spans_the_wrap():
+    buffer = filled(8, 13)
+    # t = 7 is the last slot of the backing array and t = 8 the first, so [7, 11] crosses the wrap
+    assert buffer.window('time', 7.0, 11.0).tolist() == [7.0, 8.0, 9.0, 10.0, 11.0]
+    assert buffer.window('time', 10.5).tolist() == [11.0, 12.0]
+    assert buffer.window('time', 20.0).tolist() == []
+
+
+def test_energy_wh_integrates_and_clips_to_the_window():
+    buffer = filled(8, 13, power=lambda t: 3600.0 * t)
+    # Power is linear, so the trapezoids are exact: the integral of t from 5 to 12 s, in Wh
+    assert buffer.energy_wh(5.0) == pytest.approx((12 ** 2 - 5 ** 2) / 2)
+    # The sample at 8 s is moved to the window start and keeps its power: (8 + 9) / 2 * 0.5 + (9 + 10) / 2 * 1
+    assert buffer.energy_wh(8.5, 10.5) == pytest.approx(13.75)
+    assert filled(8, 1).energy_wh(0.0) == 0.0
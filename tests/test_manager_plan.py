@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("oqs")
+pd = pytest.importorskip("pandas")
+tree = pytest.importorskip("sklearn.tree")
+
+from compiled_tree import CompiledTree
+from manager import LABEL_ALGORITHMS, PLAN_FEATURES, AutonomicManager
+from model_cache import model_cache
+
+
+@pytest.fixture
+def exported_tree(tmp_path):
+    """A tree over the dataset's features that picks SPARKLE above 50 % residual power and ASCON below"""
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.uniform(0, 100, (200, len(PLAN_FEATURES))), columns=PLAN_FEATURES)
+    y = np.where(X['Residual_Power'] > 50, 'SPARKLE', 'ASCON')
+    path = tmp_path / "dtc.npz"
+    CompiledTree.from_sklearn(tree.DecisionTreeClassifier(random_state=1).fit(X, y)).save(path)
+    yield str(path)
+    model_cache.invalidate(str(path))
+
+
+def test_plan_runs_against_exported_tree(exported_tree):
+    am = AutonomicManager("test", "Falcon-512", 0.037, 117.5, capacity=2000, classifier_filename=exported_tree)
+    am.plan()
+    assert am.algorithm == LABEL_ALGORITHMS['SPARKLE']
+
+    am.battery_capacity = 100  # 5 % of the initial capacity
+    am.plan()
+    assert am.algorithm == LABEL_ALGORITHMS['ASCON']
+
+
+def test_plan_features_follow_the_dataset_columns():
+    am = AutonomicManager("test", "Falcon-512", 0.037, 117.5, capacity=2000, security_level=4)
+    row = am.plan_row(PLAN_FEATURES)
+    assert len(row) == 7
+    assert row[0] == 100.0
+    assert row[4:] == [1.0, 0.0, 0.0]  # level 4 requires High
+
+
+def test_unknown_label_keeps_the_current_algorithm():
+    am = AutonomicManager("test", "Falcon-512", 0.037, 117.5)
+    am.use_label("not-an-algorithm")
+    assert am.algorithm == "Falcon-512"
@@ -0,0 +1,82 @@
+import sqlite3
+import time
+
+import pytest
+
+from signature_store import SignatureStore, content_digest
+
+ALG = "ML-DSA-44"
+PUBLIC_KEY = b"public key"
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "signatures.sqlite")
+
+
+def test_lookup_is_keyed_by_mode_and_key(path):
+    store = SignatureStore(path)
+    digest = content_digest(b"payload")
+    store.store(digest, ALG, PUBLIC_KEY, "full", b"full signature", True)
+    store.store(digest, ALG, PUBLIC_KEY, "stream", b"stream signature", True)
+
+    assert store.lookup(digest, ALG, PUBLIC_KEY, "full") == (b"full signature", True)
+    assert store.lookup(digest, ALG, PUBLIC_KEY, "stream") == (b"stream signature", True)
+    assert store.lookup(digest, ALG, PUBLIC_KEY, "mmap") is None
+    assert store.lookup(digest, ALG, b"other key", "full") is None
+    assert store.lookup(digest, "Falcon-512", PUBLIC_KEY, "full") is None
+    assert store.stats()['hits'] == 2
+    assert store.stats()['misses'] == 3
+
+
+def test_expire_key_drops_only_that_key(path):
+    store = SignatureStore(path)
+    store.store(b"a", ALG, PUBLIC_KEY, "full", b"signature", True)
+    store.store(b"b", ALG, PUBLIC_KEY, "stream", b"signature", True)
+    store.store(b"a", ALG, b"other key", "full", b"signature", True)
+
+    assert store.expire_key(ALG, PUBLIC_KEY) == 2
+    assert store.lookup(b"a", ALG, PUBLIC_KEY, "full") is None
+    assert store.lookup(b"a", ALG, b"other key", "full") is not None
+
+
+def test_prune_drops_unused_entries(path, monkeypatch):
+    store = SignatureStore(path)
+    monkeypatch.setattr(time, "time", lambda: 1000.0)
+    store.store(b"old", ALG, PUBLIC_KEY, "full", b"signature", True)
+    monkeypatch.setattr(time, "time", lambda: 2000.0)
+    store.store(b"new", ALG, PUBLIC_KEY, "full", b"signature", True)
+
+    assert store.prune(500) == 1
+    assert store.lookup(b"old", ALG, PUBLIC_KEY, "full") is None
+    assert store.lookup(b"new", ALG, PUBLIC_KEY, "full") is not None
+
+
+def test_keys_and_signature_counts_persist(path):
+    store = SignatureStore(path)
+    store.save_key(ALG, PUBLIC_KEY, b"secret key", 123.0)
+    store.save_signatures(ALG, PUBLIC_KEY, 5)
+    store.save_signatures(ALG, PUBLIC_KEY, 3)  # a late, lower count never lowers it
+    store.close()
+
+    store = SignatureStore(path)
+    assert store.load_key(ALG) == (PUBLIC_KEY, b"secret key", 123.0, 5)
+    store.delete_key(ALG, PUBLIC_KEY)
+    assert store.load_key(ALG) is None
+
+
+def test_opens_a_file_from_before_modes_and_counts(path):
+    db = sqlite3.connect(path)
+    db.executescript("""
+        CREATE TABLE signatures (digest BLOB, algorithm TEXT, key_id BLOB, signature BLOB, is_valid INTEGER,
+                                 created REAL, last_used REAL, hits INTEGER, PRIMARY KEY (digest, algorithm, key_id));
+        CREATE TABLE keys (algorithm TEXT PRIMARY KEY, public_key BLOB, secret_key BLOB, created REAL);
+        INSERT INTO keys VALUES ('ML-DSA-44', x'01', x'02', 1.0);
+    """)
+    db.commit()
+    db.close()
+
+    store = SignatureStore(path)
+    assert store.load_key(ALG) == (b"\x01", b"\x02", 1.0, 0)
+    store.store(b"digest", ALG, PUBLIC_KEY, "full", b"signature", True)
+    assert store.lookup(b"digest", ALG, PUBLIC_KEY, "full") == (b"signature", True)
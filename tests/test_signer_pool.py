@@ -0,0 +1,104 @@
+import time
+
+import pytest
+
+pytest.importorskip("oqs")
+
+from signature_store import SignatureStore
+from signer_pool import SignerPool
+
+ALG = "ML-DSA-44"
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SignatureStore(str(tmp_path / "signatures.sqlite"))
+    yield store
+    store.close()
+
+
+def make_pool(store, retired, **limits):
+    """A pool that expires a key's stored signatures when it is rotated, like the manager's"""
+    def on_retire(alg, public_key):
+        retired.append((alg, public_key))
+        store.expire_key(alg, public_key)
+    return SignerPool(key_store=store, on_retire=on_retire, **limits)
+
+
+def sign(pool, alg, count):
+    with pool.acquire(alg) as pooled:
+        for _ in range(count):
+            pooled.verify(b"message", pooled.sign(b"message"))
+        return pooled.public_key
+
+
+def test_reuses_the_keypair(store):
+    pool = make_pool(store, [])
+    assert sign(pool, ALG, 1) == sign(pool, ALG, 1)
+    assert pool.stats()['keygens'] == 1
+    assert pool.stats()['hits'] == 1
+
+
+def test_rotates_after_max_signatures_and_expires_stored_signatures(store):
+    retired = []
+    pool = make_pool(store, retired, max_signatures=3)
+    first = sign(pool, ALG, 3)
+    store.store(b"digest", ALG, first, "full", b"signature", True)
+
+    second = sign(pool, ALG, 1)
+    assert second != first
+    assert retired == [(ALG, first)]
+    assert pool.stats()['rotations'] == 1
+    assert store.lookup(b"digest", ALG, first, "full") is None
+    assert store.load_key(ALG)[0] == second
+
+
+def test_rotates_after_max_key_age(store):
+    retired = []
+    pool = make_pool(store, retired, max_key_age=0)
+    first = sign(pool, ALG, 1)
+    assert sign(pool, ALG, 1) != first
+    assert retired == [(ALG, first)]
+
+
+def test_eviction_keeps_the_saved_key_and_its_signatures(store):
+    retired = []
+    pool = make_pool(store, retired, max_entries=1)
+    first = sign(pool, ALG, 2)
+    store.store(b"digest", ALG, first, "full", b"signature", True)
+
+    sign(pool, "Falcon-512", 1)
+    assert pool.stats()['evictions'] == 1
+    assert pool.stats()['algorithms'] == ["Falcon-512"]
+    assert retired == []
+    assert store.lookup(b"digest", ALG, first, "full") == (b"signature", True)
+
+    # The evicted key comes back from the store with its count
+    with pool.acquire(ALG) as pooled:
+        assert pooled.public_key == first
+        assert pooled.signatures == 2
+
+
+def test_signature_count_survives_a_restart(store):
+    retired = []
+    first = sign(make_pool(store, retired, max_signatures=3), ALG, 2)
+    assert store.load_key(ALG)[3] == 2
+
+    pool = make_pool(store, retired, max_signatures=3)
+    assert sign(pool, ALG, 1) == first
+    assert retired == []
+
+    # The third signature used up the key, so the next process must not restore it
+    restarted = make_pool(store, retired, max_signatures=3)
+    assert sign(restarted, ALG, 1) != first
+    assert retired == [(ALG, first)]
+
+
+def test_restore_rotates_a_saved_key_past_max_key_age(store):
+    retired = []
+    first = sign(make_pool(store, retired), ALG, 1)
+    public_key, secret_key, _, signatures = store.load_key(ALG)
+    store.save_key(ALG, public_key, secret_key, time.time() - 3600, signatures)
+
+    assert sign(make_pool(store, retired, max_key_age=60), ALG, 1) != first
+    assert retired == [(ALG, first)]